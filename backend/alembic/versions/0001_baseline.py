@@ -0,0 +1,103 @@
+"""baseline schema
+
+Tables as originally created by Base.metadata.create_all (seeder.py).
+Databases that already have them should run `alembic stamp 0001_baseline` once.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("is_premium", sa.Boolean()),
+        sa.Column("api_key", sa.String(), nullable=True, unique=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "tracked_stores",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("url", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column("last_checked", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_tracked_stores_id", "tracked_stores", ["id"])
+    op.create_index("ix_tracked_stores_url", "tracked_stores", ["url"])
+
+    op.create_table(
+        "sales_data",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("store_id", sa.Integer(), sa.ForeignKey("tracked_stores.id")),
+        sa.Column("product_title", sa.String()),
+        sa.Column("product_id", sa.String()),
+        sa.Column("variant_id", sa.String(), nullable=True),
+        sa.Column("price", sa.Float()),
+        sa.Column("quantity_sold", sa.Integer()),
+        sa.Column("timestamp", sa.DateTime()),
+    )
+    op.create_index("ix_sales_data_id", "sales_data", ["id"])
+
+    op.create_table(
+        "global_stores",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("url", sa.String()),
+        sa.Column("logo_url", sa.String(), nullable=True),
+        sa.Column("niche", sa.String()),
+        sa.Column("country", sa.String()),
+        sa.Column("currency", sa.String()),
+        sa.Column("monthly_revenue", sa.Float()),
+        sa.Column("orders_est", sa.Integer()),
+        sa.Column("product_count", sa.Integer()),
+        sa.Column("traffic", sa.Integer()),
+        sa.Column("traffic_growth", sa.Float()),
+        sa.Column("active_ads", sa.Integer()),
+        sa.Column("main_traffic_source", sa.String()),
+        sa.Column("pixels", sa.String(), nullable=True),
+        sa.Column("creation_date", sa.DateTime()),
+    )
+    op.create_index("ix_global_stores_id", "global_stores", ["id"])
+    op.create_index("ix_global_stores_name", "global_stores", ["name"])
+    op.create_index("ix_global_stores_url", "global_stores", ["url"], unique=True)
+    op.create_index("ix_global_stores_niche", "global_stores", ["niche"])
+    op.create_index("ix_global_stores_country", "global_stores", ["country"])
+
+    op.create_table(
+        "global_products",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("store_id", sa.Integer(), sa.ForeignKey("global_stores.id")),
+        sa.Column("title", sa.String()),
+        sa.Column("handle", sa.String()),
+        sa.Column("image_url", sa.String()),
+        sa.Column("price", sa.Float()),
+        sa.Column("revenue_est", sa.Float()),
+        sa.Column("ads_count", sa.Integer()),
+        sa.Column("traffic_growth", sa.Float()),
+        sa.Column("is_winner", sa.Boolean()),
+        sa.Column("is_new", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_global_products_id", "global_products", ["id"])
+    op.create_index("ix_global_products_title", "global_products", ["title"])
+
+def downgrade():
+    op.drop_table("global_products")
+    op.drop_table("global_stores")
+    op.drop_table("sales_data")
+    op.drop_table("tracked_stores")
+    op.drop_table("users")
@@ -0,0 +1,47 @@
+"""composite indexes for search filter/sort combinations
+
+Mirrors the __table_args__ indexes on GlobalStore and GlobalProduct.
+Check plans with: python -m benchmarks.query_plans
+
+Revision ID: 0002_search_composite_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002_search_composite_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+STORE_INDEXES = [
+    ("ix_global_stores_revenue_id", ["monthly_revenue", "id"]),
+    ("ix_global_stores_niche_revenue_id", ["niche", "monthly_revenue", "id"]),
+    ("ix_global_stores_country_revenue_id", ["country", "monthly_revenue", "id"]),
+    ("ix_global_stores_niche_country_revenue_id", ["niche", "country", "monthly_revenue", "id"]),
+    ("ix_global_stores_traffic_id", ["traffic", "id"]),
+    ("ix_global_stores_active_ads_id", ["active_ads", "id"]),
+    ("ix_global_stores_creation_date_id", ["creation_date", "id"]),
+]
+
+PRODUCT_INDEXES = [
+    ("ix_global_products_revenue_id", ["revenue_est", "id"]),
+    ("ix_global_products_ads_id", ["ads_count", "id"]),
+    ("ix_global_products_price_id", ["price", "id"]),
+    ("ix_global_products_created_at_id", ["created_at", "id"]),
+    ("ix_global_products_winner_revenue_id", ["is_winner", "revenue_est", "id"]),
+    ("ix_global_products_new_revenue_id", ["is_new", "revenue_est", "id"]),
+    ("ix_global_products_store_revenue", ["store_id", "revenue_est"]),
+]
+
+def upgrade():
+    for name, columns in STORE_INDEXES:
+        op.create_index(name, "global_stores", columns, if_not_exists=True)
+    for name, columns in PRODUCT_INDEXES:
+        op.create_index(name, "global_products", columns, if_not_exists=True)
+
+def downgrade():
+    for name, _ in reversed(PRODUCT_INDEXES):
+        op.drop_index(name, table_name="global_products", if_exists=True)
+    for name, _ in reversed(STORE_INDEXES):
+        op.drop_index(name, table_name="global_stores", if_exists=True)
@@ -0,0 +1,56 @@
+"""leaderboard tables for the search presets
+
+Top-N ids per (kind, niche, country, preset, sort_key) slice, maintained by
+app.services.leaderboards. They are filled on the next app startup
+(ensure_leaderboards) or by running the seeder.
+
+Revision ID: 0003_leaderboards
+Revises: 0002_search_composite_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_leaderboards"
+down_revision = "0002_search_composite_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "leaderboard_slices",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("niche", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("preset", sa.String(), nullable=False),
+        sa.Column("sort_key", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer()),
+        sa.Column("refreshed_at", sa.DateTime()),
+    )
+    op.create_index(
+        "ux_leaderboard_slices_key", "leaderboard_slices",
+        ["kind", "niche", "country", "preset", "sort_key"], unique=True
+    )
+
+    op.create_table(
+        "leaderboard_entries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("niche", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("preset", sa.String(), nullable=False),
+        sa.Column("sort_key", sa.String(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ux_leaderboard_entries_rank", "leaderboard_entries",
+        ["kind", "niche", "country", "preset", "sort_key", "rank"], unique=True
+    )
+
+def downgrade():
+    op.drop_index("ux_leaderboard_entries_rank", table_name="leaderboard_entries")
+    op.drop_table("leaderboard_entries")
+    op.drop_index("ux_leaderboard_slices_key", table_name="leaderboard_slices")
+    op.drop_table("leaderboard_slices")
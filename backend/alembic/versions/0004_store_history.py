@@ -0,0 +1,38 @@
+"""store history time series
+
+Daily / weekly / monthly metric buckets per GlobalStore, read by
+/api/analysis/store. Filled by the tracking scheduler's daily snapshot.
+
+Revision ID: 0004_store_history
+Revises: 0003_leaderboards
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_store_history"
+down_revision = "0003_leaderboards"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "store_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("store_id", sa.Integer(), sa.ForeignKey("global_stores.id"), nullable=False),
+        sa.Column("granularity", sa.String(), nullable=False),
+        sa.Column("bucket", sa.Date(), nullable=False),
+        sa.Column("revenue", sa.Float()),
+        sa.Column("orders", sa.Integer()),
+        sa.Column("traffic", sa.Integer()),
+        sa.Column("active_ads", sa.Integer()),
+        sa.Column("samples", sa.Integer()),
+    )
+    op.create_index(
+        "ux_store_history_store_bucket", "store_history",
+        ["store_id", "bucket", "granularity"], unique=True
+    )
+
+def downgrade():
+    op.drop_index("ux_store_history_store_bucket", table_name="store_history")
+    op.drop_table("store_history")
@@ -0,0 +1,36 @@
+"""canonical domain column on global_stores
+
+Adds global_stores.canonical_domain, backfills it with the shared normalizer
+(app.services.domains.canonical_domain) and indexes it uniquely. When several
+rows normalize to the same domain, the lowest id keeps it and the others stay
+NULL (reported during the upgrade) until they are merged.
+
+Revision ID: 0005_store_canonical_domain
+Revises: 0004_store_history
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.store_domains import INDEX_NAME, backfill_canonical_domains, report_conflicts
+
+revision = "0005_store_canonical_domain"
+down_revision = "0004_store_history"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # The app may already have added the column at startup (app.store_domains)
+    inspector = sa.inspect(op.get_bind())
+    if not any(c["name"] == "canonical_domain" for c in inspector.get_columns("global_stores")):
+        with op.batch_alter_table("global_stores") as batch:
+            batch.add_column(sa.Column("canonical_domain", sa.String(), nullable=True))
+
+    report_conflicts(backfill_canonical_domains(op.get_bind()))
+
+    if not any(i["name"] == INDEX_NAME for i in inspector.get_indexes("global_stores")):
+        op.create_index(INDEX_NAME, "global_stores", ["canonical_domain"], unique=True)
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name="global_stores")
+    with op.batch_alter_table("global_stores") as batch:
+        batch.drop_column("canonical_domain")
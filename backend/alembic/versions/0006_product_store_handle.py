@@ -0,0 +1,45 @@
+"""unique (store_id, handle) on global_products
+
+Upsert key for app.services.bulk_ingest. Duplicate (store_id, handle) rows
+(the same Shopify product ingested twice) would block the index; the upgrade
+does not pick a winner itself but stops and lists them, so they can be
+merged or removed by hand and the upgrade re-run.
+
+Revision ID: 0006_product_store_handle
+Revises: 0005_store_canonical_domain
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0006_product_store_handle"
+down_revision = "0005_store_canonical_domain"
+branch_labels = None
+depends_on = None
+
+# Conflicting groups listed in the error
+REPORT_LIMIT = 20
+
+DUPLICATES_SQL = (
+    "SELECT store_id, handle, count(*) AS n, min(id), max(id) FROM global_products"
+    " WHERE store_id IS NOT NULL AND handle IS NOT NULL"
+    " GROUP BY store_id, handle HAVING count(*) > 1"
+)
+
+def upgrade():
+    conn = op.get_bind()
+    total = conn.exec_driver_sql(f"SELECT count(*) FROM ({DUPLICATES_SQL}) AS duplicates").scalar()
+    if total:
+        rows = conn.exec_driver_sql(f"{DUPLICATES_SQL} ORDER BY n DESC, store_id LIMIT {REPORT_LIMIT}").all()
+        listed = "\n".join(
+            f"  store_id={store_id} handle={handle!r}: {n} rows (ids {low}..{high})"
+            for store_id, handle, n, low, high in rows
+        )
+        raise RuntimeError(
+            f"global_products has {total} duplicate (store_id, handle) groups; merge or delete them, "
+            f"then re-run the upgrade. First {len(rows)}:\n{listed}\n"
+            f"Full list: {DUPLICATES_SQL}"
+        )
+    op.create_index("ux_global_products_store_handle", "global_products", ["store_id", "handle"], unique=True)
+
+def downgrade():
+    op.drop_index("ux_global_products_store_handle", table_name="global_products")
@@ -11,10 +11,25 @@ from app.shopify.exporter import ShopifyExporter
 from app.services.sentry_setup import init_sentry
 from app.services.stripe_service import StripeService
 from app.scraper.detector import ShopifyDetector  # Added import
+from app.services.http_client import close_async_client
+from app.services.batch_scan import get_batch_scanner
+from app.scraper.browser_pool import close_browser_pool
+from app.services.tracking_scheduler import get_tracking_scheduler
+from app.services.store_history import STORE_HISTORY_ENABLED, get_history_scheduler
+from app.database import get_db, get_async_db, engine, start_query_stats, stop_query_stats, pool_status
+from app.search_index import ensure_search_indexes
+from app.store_domains import ensure_canonical_domains
+from app.services.leaderboards import ensure_leaderboards
+from app.models import TrackedStore, SalesData
+from fastapi import Depends
+from sqlalchemy import func, desc, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
 import json
+import time
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 from pydantic import BaseModel
 
 # Initialize Sentry
@@ -31,6 +46,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request DB instrumentation: query count and time spent in the database
+DB_METRICS_LOG = os.getenv("DB_METRICS_LOG", "true").lower() == "true"
+
+@app.middleware("http")
+async def db_metrics(request: Request, call_next):
+    stats, token = start_query_stats()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        stop_query_stats(token)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    response.headers["X-DB-Queries"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = f"{stats.ms:.2f}"
+    if DB_METRICS_LOG and stats.count:
+        print(
+            f"[db] {request.method} {request.url.path} {response.status_code} "
+            f"queries={stats.count} db={stats.ms:.1f}ms total={elapsed_ms:.1f}ms pool {pool_status()}"
+        )
+    return response
+
 # Static Files
 from fastapi.staticfiles import StaticFiles
 import os
@@ -56,6 +92,35 @@ app.include_router(store_ai.router)
 from app.routers import ads_generator
 app.include_router(ads_generator.router)
 
+# Background tracking of TrackedStore rows. Off by default: every worker process
+# runs startup(), so with several uvicorn/gunicorn workers each store would be
+# tracked once per worker. Set to true on exactly one process.
+TRACKING_SCHEDULER_ENABLED = os.getenv("TRACKING_SCHEDULER_ENABLED", "false").lower() == "true"
+
+@app.on_event("startup")
+async def startup():
+    # canonical_domain on stores tables created before it (idempotent)
+    ensure_canonical_domains(engine)
+    # Full-text indexes for product/store keyword search (idempotent)
+    ensure_search_indexes(engine)
+    # Precomputed top-N slices for the search presets (built on first run)
+    ensure_leaderboards(engine)
+    if TRACKING_SCHEDULER_ENABLED:
+        get_tracking_scheduler().start()
+    # Daily StoreHistory rollups (the analysis charts), independent of tracking
+    if STORE_HISTORY_ENABLED:
+        get_history_scheduler().start()
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    if TRACKING_SCHEDULER_ENABLED:
+        await get_tracking_scheduler().stop()
+    if STORE_HISTORY_ENABLED:
+        await get_history_scheduler().stop()
+    await get_batch_scanner().close()
+    await close_browser_pool()
+    await close_async_client()
+
 class TrackStoreRequest(BaseModel):
     url: str
 
@@ -70,16 +135,39 @@ def health_check():
 # --- Phase 3: Analytics Endpoints ---
 
 @app.get("/get-store-analytics")
-def get_store_analytics():
+def get_store_analytics(db: Session = Depends(get_db)):
     """
     Returns aggregated sales metrics.
     """
     # Real Data State (Empty until Store Tracked)
+    revenue_expr = func.sum(SalesData.price * SalesData.quantity_sold)
+    total_revenue, orders = db.query(revenue_expr, func.count(SalesData.id)).one()
+    total_revenue = total_revenue or 0.0
+
+    # Momentum: units sold in the last 24h vs the 24h before
+    now = datetime.utcnow()
+    def units_between(start, end):
+        return db.query(func.coalesce(func.sum(SalesData.quantity_sold), 0)).filter(
+            SalesData.timestamp >= start, SalesData.timestamp < end
+        ).scalar()
+    last_day = units_between(now - timedelta(days=1), now)
+    previous_day = units_between(now - timedelta(days=2), now - timedelta(days=1))
+    momentum = round((last_day - previous_day) / previous_day * 100) if previous_day else 0
+
+    top = db.query(
+        SalesData.product_title,
+        func.sum(SalesData.quantity_sold).label("units_sold"),
+        func.max(SalesData.price).label("price")
+    ).group_by(SalesData.product_title).order_by(desc(revenue_expr)).limit(5).all()
+
     return {
-        "total_revenue": 0.00,
-        "average_order_value": 0.00,
-        "sales_momentum": 0,
-        "top_products": []
+        "total_revenue": round(total_revenue, 2),
+        "average_order_value": round(total_revenue / orders, 2) if orders else 0.00,
+        "sales_momentum": momentum,
+        "top_products": [
+            {"title": t.product_title, "units_sold": t.units_sold, "price": f"{t.price:.2f}"}
+            for t in top
+        ]
     }
 
 async def sales_generator():
@@ -108,12 +196,19 @@ async def export_product(product_data: dict):
 
 # --- Final Phase: Track Store Endpoint ---
 @app.post("/track-new-store")
-async def track_new_store(request: TrackStoreRequest):
+async def track_new_store(request: TrackStoreRequest, db: AsyncSession = Depends(get_async_db)):
     detector = ShopifyDetector()
-    is_shopify = detector.is_shopify(request.url)
+    is_shopify = await detector.is_shopify(request.url)
     
     if is_shopify:
-        # In real app: Add to DB
+        # Picked up by the tracking scheduler on its next tick (last_checked is empty)
+        existing = await db.scalar(select(TrackedStore).filter(TrackedStore.url == request.url).limit(1))
+        if existing is None:
+            db.add(TrackedStore(url=request.url, status="active"))
+            await db.commit()
+        elif existing.status == "paused":
+            existing.status = "active"
+            await db.commit()
         return {"status": "success", "message": f"Successfully tracked {request.url}"}
     else:
         return {"status": "error", "message": "Not a valid Shopify store or unreachable."}
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Float, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from .database import Base
+from .services.domains import canonical_domain
 
 class User(Base):
     __tablename__ = "users"
@@ -49,6 +50,7 @@ class GlobalStore(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     url = Column(String, unique=True, index=True)
+    canonical_domain = Column(String, nullable=True) # canonical_domain(url), set with url
     logo_url = Column(String, nullable=True)
     niche = Column(String, index=True) # e.g., 'Fashion', 'Tech'
     country = Column(String, index=True) # e.g., 'US', 'FR'
@@ -67,6 +69,26 @@ class GlobalStore(Base):
 
     products = relationship("GlobalProduct", back_populates="store")
 
+    # Search indexes: (filter..., sort key, id) so both offset and keyset pages
+    # are read in index order. Revenue is the default sort, so it gets the
+    # niche/country variants; the other sorts are sort-only.
+    __table_args__ = (
+        Index("ix_global_stores_revenue_id", "monthly_revenue", "id"),
+        Index("ix_global_stores_niche_revenue_id", "niche", "monthly_revenue", "id"),
+        Index("ix_global_stores_country_revenue_id", "country", "monthly_revenue", "id"),
+        Index("ix_global_stores_niche_country_revenue_id", "niche", "country", "monthly_revenue", "id"),
+        Index("ix_global_stores_traffic_id", "traffic", "id"),
+        Index("ix_global_stores_active_ads_id", "active_ads", "id"),
+        Index("ix_global_stores_creation_date_id", "creation_date", "id"),
+        # Exact store lookup by domain (analysis, tracking, batch scans)
+        Index("ux_global_stores_canonical_domain", "canonical_domain", unique=True),
+    )
+
+    @validates("url")
+    def _set_canonical_domain(self, key, url):
+        self.canonical_domain = canonical_domain(url) or None
+        return url
+
 class GlobalProduct(Base):
     __tablename__ = "global_products"
 
@@ -87,3 +109,77 @@ class GlobalProduct(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     store = relationship("GlobalStore", back_populates="products")
+
+    # Search indexes: one per sort key (with id for keyset paging), preset
+    # flags ahead of the default revenue sort, and store_id for the store join
+    # and per-store best-seller lookups.
+    __table_args__ = (
+        Index("ix_global_products_revenue_id", "revenue_est", "id"),
+        Index("ix_global_products_ads_id", "ads_count", "id"),
+        Index("ix_global_products_price_id", "price", "id"),
+        Index("ix_global_products_created_at_id", "created_at", "id"),
+        Index("ix_global_products_winner_revenue_id", "is_winner", "revenue_est", "id"),
+        Index("ix_global_products_new_revenue_id", "is_new", "revenue_est", "id"),
+        Index("ix_global_products_store_revenue", "store_id", "revenue_est"),
+        # Upsert key for bulk ingestion (a Shopify handle is unique per store)
+        Index("ux_global_products_store_handle", "store_id", "handle", unique=True),
+    )
+
+# --- Precomputed leaderboards ---
+# Top-N ids per (niche, country, preset, sort key) slice, so the first pages
+# of the common search presets are read by rank instead of sorting the table.
+# "*" in niche/country/preset means "any". Maintained by app.services.leaderboards.
+
+class LeaderboardSlice(Base):
+    __tablename__ = "leaderboard_slices"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False) # products, stores
+    niche = Column(String, nullable=False)
+    country = Column(String, nullable=False)
+    preset = Column(String, nullable=False)
+    sort_key = Column(String, nullable=False)
+    total = Column(Integer, default=0) # rows matching the slice (served as the search total)
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_leaderboard_slices_key", "kind", "niche", "country", "preset", "sort_key", unique=True),
+    )
+
+class LeaderboardEntry(Base):
+    __tablename__ = "leaderboard_entries"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    niche = Column(String, nullable=False)
+    country = Column(String, nullable=False)
+    preset = Column(String, nullable=False)
+    sort_key = Column(String, nullable=False)
+    rank = Column(Integer, nullable=False) # 1-based
+    entity_id = Column(Integer, nullable=False) # GlobalProduct.id or GlobalStore.id
+
+    __table_args__ = (
+        Index("ux_leaderboard_entries_rank", "kind", "niche", "country", "preset", "sort_key", "rank", unique=True),
+    )
+
+# --- Store history (time series) ---
+# One row per store per bucket. Daily snapshots of the store's estimates are
+# compacted into weekly and then monthly buckets as they age; values are
+# averages over `samples` daily snapshots. Maintained by app.services.store_history.
+
+class StoreHistory(Base):
+    __tablename__ = "store_history"
+
+    id = Column(Integer, primary_key=True)
+    store_id = Column(Integer, ForeignKey("global_stores.id"), nullable=False)
+    granularity = Column(String, nullable=False) # day, week, month
+    bucket = Column(Date, nullable=False) # first day of the period
+    revenue = Column(Float, default=0.0) # monthly revenue estimate
+    orders = Column(Integer, default=0)
+    traffic = Column(Integer, default=0)
+    active_ads = Column(Integer, default=0)
+    samples = Column(Integer, default=1) # daily snapshots averaged into this row
+
+    __table_args__ = (
+        Index("ux_store_history_store_bucket", "store_id", "bucket", "granularity", unique=True),
+    )
@@ -0,0 +1,121 @@
+import base64
+import json
+import os
+import time
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# How long a filter set's total count is reused before it is recomputed.
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "1024"))
+
+# --- Keyset (cursor) pagination ---
+# A cursor is an opaque token holding the last row's (sort_key, id) pair, so the
+# next page is "rows after this pair" and hits the sort index instead of
+# skipping OFFSET rows. Listings order NULL sort values last in both
+# directions; the range predicate below only covers non-NULL values, so once
+# it runs dry the page is topped up from the NULL rows (null_tail_filter), and
+# a cursor on a NULL row continues through them in id order.
+
+def encode_cursor(sort_by: str, sort_value, row_id: int) -> str:
+    payload = {"s": sort_by, "id": row_id}
+    if isinstance(sort_value, datetime):
+        payload["dt"] = sort_value.isoformat()
+    else:
+        payload["v"] = sort_value
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str) -> tuple:
+    """
+    Returns (sort_value, id). Rejects cursors from a different sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        value = datetime.fromisoformat(payload["dt"]) if "dt" in payload else payload.get("v")
+        row_id = int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("s") != sort_by:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+    return value, row_id
+
+def keyset_filter(sort_col, id_col, after: tuple, descending: bool = True):
+    """
+    WHERE clause selecting rows strictly after `after` in (sort_col, id_col) order.
+    sort_col may be None when the listing is ordered by id only.
+    """
+    value, row_id = after
+    past_id = id_col < row_id if descending else id_col > row_id
+    if sort_col is None:
+        return past_id
+    if value is None:
+        return and_(sort_col.is_(None), past_id)
+    past_value = sort_col < value if descending else sort_col > value
+    # The redundant bound lets the planner range-scan the (sort_col, id) index;
+    # the OR alone makes SQLite fall back to a multi-index scan + temp sort.
+    bound = sort_col <= value if descending else sort_col >= value
+    return and_(bound, or_(past_value, and_(sort_col == value, past_id)))
+
+def null_tail_filter(sort_col, after: tuple):
+    """
+    WHERE clause for the NULL rows that follow a keyset page which ran out of
+    non-NULL values, or None when there are none to add (no sort column, or
+    the cursor is already past them).
+    """
+    if sort_col is None or after[0] is None:
+        return None
+    return sort_col.is_(None)
+
+# --- Cached totals ---
+
+class CountCache:
+    """
+    Small in-process TTL cache for COUNT(*) results keyed by the filter set,
+    so turning pages doesn't rescan the whole filtered set every time.
+    """
+    def __init__(self, ttl: float = COUNT_CACHE_TTL, max_entries: int = COUNT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+
+    @staticmethod
+    def key_for(namespace: str, filters) -> str:
+        return namespace + ":" + json.dumps(filters.model_dump(), sort_keys=True, default=str)
+
+    def get(self, key: str):
+        hit = self._entries.get(key)
+        if hit and hit[1] > time.monotonic():
+            return hit[0]
+        return None
+
+    def get_or_compute(self, key: str, compute) -> int:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    async def aget_or_compute(self, key: str, compute) -> int:
+        """
+        Async variant: compute is a coroutine function (e.g. an AsyncSession count).
+        """
+        value = self.get(key)
+        if value is None:
+            value = await compute()
+            self.set(key, value)
+        return value
+
+    def set(self, key: str, value: int):
+        now = time.monotonic()
+        if len(self._entries) >= self.max_entries:
+            # Drop expired entries first, then the oldest if still full
+            self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (value, now + self.ttl)
+
+    def clear(self):
+        self._entries.clear()
@@ -3,7 +3,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
 import os
-import requests  # Ensure requests is installed
+from app.services.http_client import get_async_client
 
 router = APIRouter(
     prefix="/api/ads",
@@ -15,6 +15,8 @@ router = APIRouter(
 # For now, we use placeholders or environment variables.
 META_API_BASE_URL = os.getenv("META_API_BASE_URL", "https://graph.facebook.com/v19.0/ads_archive")
 META_ACCESS_TOKEN = os.getenv("META_ACCESS_TOKEN", "") 
+# Meta rarely allows a purely 'Global' query, so "all countries" means these markets
+DEFAULT_AD_COUNTRIES = ['US', 'CA', 'GB', 'AU', 'FR', 'DE']
 
 class AdCreative(BaseModel):
     id: str
@@ -37,7 +39,7 @@ class AdResponse(BaseModel):
     ads: List[AdCreative]
     paging: Optional[dict] = {}
 
-def fetch_real_time_ads(
+async def fetch_real_time_ads(
     keyword: str,
     countries: List[str],
     limit: int = 20,
@@ -68,7 +70,7 @@ def fetch_real_time_ads(
         params['after'] = cursor
     
     try:
-        response = requests.get(META_API_BASE_URL, params=params)
+        response = await get_async_client().get(META_API_BASE_URL, params=params)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -77,7 +79,7 @@ def fetch_real_time_ads(
 
 # --- Search Endpoint ---
 @router.get("/search", response_model=AdResponse)
-def search_ads(
+async def search_ads(
     keyword: Optional[str] = "trends", # Default keyword to ensure results
     platform: Optional[str] = None,
     country: Optional[str] = None, # Default to None (All Countries)
@@ -97,10 +99,10 @@ def search_ads(
     if country and country != "All" and country != "":
         target_countries = [c.strip().upper() for c in country.split(",")]
     else:
-        target_countries = ['US', 'CA', 'GB', 'AU', 'FR', 'DE'] # 'Global' proxy
+        target_countries = DEFAULT_AD_COUNTRIES # 'Global' proxy
     
     # 2. Fetch Real Data
-    api_data = fetch_real_time_ads(keyword, target_countries, limit, cursor)
+    api_data = await fetch_real_time_ads(keyword, target_countries, limit, cursor)
     
     raw_ads = api_data.get("data", [])
     paging = api_data.get("paging", {})
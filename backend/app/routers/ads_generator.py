@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 import random
 import asyncio
+from app.services.http_client import get_async_client
 
 router = APIRouter(
     prefix="/api/ads-gen",
@@ -42,7 +43,7 @@ else:
 
 
 # --- HELPERS ---
-def generate_with_gemini(product: str, vibe: str) -> dict:
+async def generate_with_gemini(product: str, vibe: str) -> dict:
     url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={GEMINI_API_KEY}"
     headers = {"Content-Type": "application/json"}
     
@@ -62,8 +63,7 @@ def generate_with_gemini(product: str, vibe: str) -> dict:
     }
     
     try:
-        import requests
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = await get_async_client().post(url, headers=headers, json=payload, timeout=10)
         if response.status_code == 200:
             data = response.json()
             # Gemini response structure
@@ -85,7 +85,7 @@ def generate_with_gemini(product: str, vibe: str) -> dict:
         print(f"Gemini Exception: {e}")
         return None
 
-def generate_with_openai(product: str, vibe: str) -> dict:
+async def generate_with_openai(product: str, vibe: str) -> dict:
     url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Content-Type": "application/json",
@@ -113,8 +113,7 @@ def generate_with_openai(product: str, vibe: str) -> dict:
     }
     
     try:
-        import requests
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = await get_async_client().post(url, headers=headers, json=payload, timeout=10)
         if response.status_code == 200:
             data = response.json()
             text = data.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -136,13 +135,13 @@ async def generate_ad_copy(req: AdCopyRequest):
     """
     # 1. Try Gemini
     if AI_PROVIDER == "Gemini" and "YOUR_GEMINI_KEY" not in GEMINI_API_KEY:
-        result = generate_with_gemini(req.product_name, req.store_vibe)
+        result = await generate_with_gemini(req.product_name, req.store_vibe)
         if result:
             return AdCopyResponse(**result)
             
     # 2. Try OpenAI (If configured)
     if AI_PROVIDER == "OpenAI" and "sk-" in OPENAI_API_KEY:
-        result = generate_with_openai(req.product_name, req.store_vibe)
+        result = await generate_with_openai(req.product_name, req.store_vibe)
         if result:
             return AdCopyResponse(**result)
         
@@ -69,7 +69,7 @@ async def generate_store_concept(params: dict):
     # 2. Fetch Products (Curated Top 4)
     # Reuse scraper from product_search
     # Try real scrape first, fallback to mock
-    products = fetch_rapidapi_search(niche)
+    products = await fetch_rapidapi_search(niche)
     if not products:
         products = get_mock_results(niche, "Both")
     
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select
 from typing import List, Optional
-from datetime import datetime, timedelta
-import random
+from datetime import date
 
-from app.database import get_db
-from app.models import GlobalStore, GlobalProduct
+from app.database import get_async_db
+from app.models import GlobalStore, GlobalProduct, StoreHistory
+from app.services.response_cache import response_cache
+from app.services.store_history import monthly_series, months_back
+from app.services.domains import canonical_domain, parent_domains
 from pydantic import BaseModel
 
 router = APIRouter(
@@ -14,6 +16,8 @@ router = APIRouter(
     tags=["analysis"]
 )
 
+HISTORY_MONTHS = 6
+
 # --- Schemas ---
 class ProductSchema(BaseModel):
     title: str
@@ -37,7 +41,7 @@ class AnalysisResponse(BaseModel):
     active_ads: int
     average_price: float
     
-    # Charts (Mocked History)
+    # Charts (monthly averages from StoreHistory)
     traffic_history: List[dict] # { date: str, value: int }
     revenue_history: List[dict] # { date: str, value: float }
     
@@ -47,56 +51,85 @@ class AnalysisResponse(BaseModel):
     class Config:
         from_attributes = True
 
+async def find_store_by_domain(db: AsyncSession, domain: str):
+    """
+    GlobalStore for a canonical domain. Every step is an index lookup on
+    canonical_domain: exact match, then a parent domain
+    ("eu.brand.com" -> "brand.com"), then, for a bare name, the first domain
+    whose first label it is ("brand" -> "brand.com", never "brand-x.com").
+    A full domain ("x.com") never resolves to a different one ("x.com.au").
+    """
+    if not domain:
+        return None
+    store = await db.scalar(select(GlobalStore).filter(GlobalStore.canonical_domain == domain).limit(1))
+    if store:
+        return store
+
+    parents = parent_domains(domain)
+    if parents:
+        candidates = (await db.scalars(
+            select(GlobalStore).filter(GlobalStore.canonical_domain.in_(parents))
+        )).all()
+        if candidates:
+            return max(candidates, key=lambda s: len(s.canonical_domain))
+
+    if "." in domain:
+        return None
+    # "brand." prefix as a range ("/" sorts right after ".") so it stays an index seek
+    return await db.scalar(
+        select(GlobalStore)
+        .filter(GlobalStore.canonical_domain > domain + ".", GlobalStore.canonical_domain < domain + "/")
+        .order_by(GlobalStore.canonical_domain)
+        .limit(1)
+    )
+
 # --- Endpoints ---
 
 @router.get("/store", response_model=AnalysisResponse)
-def analyze_store(
+async def analyze_store(
     url: str = Query(..., description="Store URL to analyze"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # 1. Normalize URL (remove https://, www., trailing slash)
-    clean_url = url.replace("https://", "").replace("http://", "").replace("www.", "").strip("/")
+    # 1. Normalize URL (scheme, www., path, punycode)
+    domain = canonical_domain(url)
+
+    cache_key = response_cache.key_for("analysis", domain=domain)
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    # 2. Find Store
-    # Try exact match first, then partial
-    store = db.query(GlobalStore).filter(GlobalStore.url.ilike(f"%{clean_url}%")).first()
+    # 2. Find Store (exact domain first, then parent / prefix)
+    store = await find_store_by_domain(db, domain)
     
     if not store:
         raise HTTPException(status_code=404, detail="Store not found in our database. We are tracking it now, check back in 24h.")
     
     # 3. Get Products (Best Sellers)
-    products = db.query(GlobalProduct)\
-        .filter(GlobalProduct.store_id == store.id)\
-        .order_by(desc(GlobalProduct.revenue_est))\
-        .limit(6)\
-        .all()
+    products = (await db.scalars(
+        select(GlobalProduct)
+        .filter(GlobalProduct.store_id == store.id)
+        .order_by(desc(GlobalProduct.revenue_est))
+        .limit(6)
+    )).all()
         
     avg_price = sum(p.price for p in products) / len(products) if products else 0.0
 
-    # 4. Generate Mock History (Last 6 months)
-    # In a real app, this would come from a 'StoreHistory' table
-    traffic_history = []
-    revenue_history = []
-    current_date = datetime.now()
-    
-    base_traffic = store.traffic
-    base_revenue = store.monthly_revenue
-    
-    for i in range(6):
-        date_str = (current_date - timedelta(days=30 * (5-i))).strftime("%b")
-        # Random fluctuation +/- 20%
-        factor = random.uniform(0.8, 1.2)
-        
-        traffic_history.append({
-            "date": date_str,
-            "value": int(base_traffic * factor * (0.5 + i*0.1)) # Growing trend mock
-        })
-        revenue_history.append({
-            "date": date_str,
-            "value": int(base_revenue * factor * (0.5 + i*0.1))
-        })
-
-    return AnalysisResponse(
+    # 4. History (last 6 months, one range scan over (store_id, bucket))
+    today = date.today()
+    history = (await db.scalars(
+        select(StoreHistory)
+        .filter(StoreHistory.store_id == store.id, StoreHistory.bucket >= months_back(today, HISTORY_MONTHS - 1))
+        .order_by(StoreHistory.bucket)
+    )).all()
+    series = monthly_series(history, HISTORY_MONTHS, today)
+    if not series or series[-1]["month"] != months_back(today, 0):
+        # Current month not snapshotted yet: use the live estimates
+        series.append({"month": months_back(today, 0), "revenue": store.monthly_revenue or 0, "traffic": store.traffic or 0})
+
+    traffic_history = [{"date": point["month"].strftime("%b"), "value": int(point["traffic"])} for point in series]
+    revenue_history = [{"date": point["month"].strftime("%b"), "value": int(point["revenue"])} for point in series]
+
+    response = AnalysisResponse(
         id=store.id,
         name=store.name,
         url=store.url,
@@ -120,69 +153,80 @@ def analyze_store(
             ) for p in products
         ]
     )
+    await response_cache.set(cache_key, response)
+    return response
 # --- Real-Time Scan Endpoint (Phase 13) ---
-from app.services.store_scanner import StoreScanner
+from app.services.scan_pipeline import ScanPipeline
+from app.services.ndjson import ndjson_response
 
 class ScanRequest(BaseModel):
     url: str
 
 @router.post("/scan")
-def scan_store_realtime(req: ScanRequest):
-    scanner = StoreScanner()
-    data = scanner.scan_url(req.url)
-    
-    # --- Phase 14: Ad & Sales Intelligence ---
-    
-    # 1. Real Ad Count (from ads.py)
-    active_ads_count = 0
-    try:
-        from app.routers.ads import fetch_real_time_ads
-        # Search for the Store Name as keyword
-        ad_data = fetch_real_time_ads(keyword=data["title"], limit=10) 
-        # Note: This is an approximation. Ideally we filter by "Page Name" match.
-        active_ads_count = len(ad_data.get("data", []))
-        if active_ads_count == 0:
-             # Fallback: Check for REAL Pixel Signals from the scanner
-             # If they have a Pixel, they likely run ads even if API is restricted or name mismatch.
-             # We assign a baseline of '1' to indicate "Active Ad Operations" for sales math.
-             if data.get("has_fb_pixel") or data.get("has_tiktok_pixel"):
-                 active_ads_count = 1
-                 # Maybe Log this as "inferred"
-                 
-    except Exception as e:
-        print(f"Ad Fetch Error: {e}")
-        # Even on error, check pixels
-        if data.get("has_fb_pixel") or data.get("has_tiktok_pixel"):
-             active_ads_count = 1
-        else:
-             active_ads_count = 0
-
-    data["active_ads"] = active_ads_count
-    
-    # 2. Sales Estimation
-    estimates = scanner.estimate_sales(
-        product_count=data["count"],
-        avg_price=data["avg_price"],
-        active_ads=active_ads_count
-    )
-    data["estimates"] = estimates
-    
-    # 3. Market Share (Heuristic based on Currency)
-    # Start with assumption: Currency = Primary Market
-    currency_map = {
-        "USD": "US", "GBP": "GB", "EUR": "DE", "CAD": "CA", "AUD": "AU"
-    }
-    primary_country = currency_map.get(data["currency"], "US")
-    
-    # Construct "Market Share" list
-    # Real logic: We allocate 70% to primary, 30% split among others
-    data["market_share"] = [
-        {"country": primary_country, "percent": 70},
-        {"country": "US" if primary_country != "US" else "GB", "percent": 20},
-        {"country": "CA" if primary_country != "CA" else "AU", "percent": 10}
-    ]
-
+async def scan_store_realtime(req: ScanRequest):
+    # Homepage, catalog and ad-library stages run concurrently; stage status
+    # and timings come back in data["stages"] / data["timings"]
+    data = await ScanPipeline().run(req.url)
     return {
         "status": "success",
         "data": data
     }
+
+@router.post("/scan/stream")
+async def scan_store_stream(req: ScanRequest):
+    # Same scan as /scan, one NDJSON event per line as each stage lands:
+    # metadata, pixels, catalog_page (per page), catalog, ads, estimates, done.
+    # Closing the connection cancels the stages still running.
+    return ndjson_response(ScanPipeline().stream(req.url))
+
+# --- Batch Scan (bulk competitor import) ---
+from app.services.batch_scan import BatchScanJob, get_batch_scanner, parse_url_csv, BATCH_SCAN_MAX_URLS
+
+class BatchScanRequest(BaseModel):
+    urls: List[str]
+
+def _submit_batch(urls: List[str]) -> dict:
+    if len(urls) > BATCH_SCAN_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_SCAN_MAX_URLS} URLs per batch.")
+    job = BatchScanJob(urls)
+    if not job.targets:
+        raise HTTPException(status_code=400, detail="No valid store URLs in the batch.")
+    scanner = get_batch_scanner()
+    if not scanner.can_accept(job):
+        raise HTTPException(status_code=429, detail="Too many batch scans in progress. Try again later.")
+    scanner.submit(job)
+    return {"status": "success", "data": job.summary()}
+
+def _get_job(job_id: str):
+    job = get_batch_scanner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch scan job not found.")
+    return job
+
+@router.post("/scan/batch")
+async def scan_batch(req: BatchScanRequest):
+    # Deduped by canonical domain; scans run server-side on the shared batch pool.
+    # Poll GET /scan/batch/{job_id} or stream GET /scan/batch/{job_id}/stream.
+    return _submit_batch(req.urls)
+
+@router.post("/scan/batch/csv")
+async def scan_batch_csv(file: UploadFile = File(...)):
+    text = (await file.read()).decode("utf-8", errors="replace")
+    return _submit_batch(parse_url_csv(text))
+
+@router.get("/scan/batch/{job_id}")
+async def scan_batch_status(job_id: str, since: int = Query(0, ge=0)):
+    # since: number of results the client already has (results are append-only)
+    job = _get_job(job_id)
+    return {"status": "success", "data": {**job.summary(), "results": job.results[since:]}}
+
+@router.get("/scan/batch/{job_id}/stream")
+async def scan_batch_stream(job_id: str, since: int = Query(0, ge=0)):
+    # NDJSON: one "result" event per finished scan, then "done" with the summary
+    return ndjson_response(_get_job(job_id).events(since))
+
+@router.delete("/scan/batch/{job_id}")
+async def scan_batch_cancel(job_id: str):
+    _get_job(job_id)
+    job = await get_batch_scanner().cancel(job_id)
+    return {"status": "success", "data": job.summary()}
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from typing import Optional, List
 from pydantic import BaseModel
+from app.services.html_meta import PageMeta, stream_meta
+from app.services.http_client import get_async_client
+from app.services.upstream_cache import UpstreamCache
 import shutil
 import os
 import uuid
 import random
-import requests
-from bs4 import BeautifulSoup
 
 router = APIRouter(
     prefix="/api/search",
@@ -17,6 +18,16 @@ router = APIRouter(
 # Real Data Configuration (Phase 34)
 RAPID_API_KEY = os.getenv("RAPIDAPI_KEY") # Loaded from .env
 USE_REAL_API = bool(RAPID_API_KEY) # Auto-enable if key exists
+RAPIDAPI_SEARCH_URL = os.getenv("RAPIDAPI_SEARCH_URL", "https://aliexpress-datahub.p.rapidapi.com/item_search")
+RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST", "aliexpress-datahub.p.rapidapi.com")
+RAPIDAPI_SORT = "ordersDesc" # Sort by orders for best products
+
+# Every item_search call is billed, so identical searches are served from cache
+# (set RAPIDAPI_CACHE_PATH to a file to keep entries across restarts / workers)
+RAPIDAPI_CACHE_TTL = float(os.getenv("RAPIDAPI_CACHE_TTL", "21600"))
+RAPIDAPI_CACHE_MAX_ENTRIES = int(os.getenv("RAPIDAPI_CACHE_MAX_ENTRIES", "1024"))
+RAPIDAPI_CACHE_PATH = os.getenv("RAPIDAPI_CACHE_PATH", "")
+rapidapi_cache = UpstreamCache("rapidapi", RAPIDAPI_CACHE_TTL, RAPIDAPI_CACHE_MAX_ENTRIES, RAPIDAPI_CACHE_PATH or None)
 
 # --- MODELS ---
 class ProductResult(BaseModel):
@@ -42,9 +53,11 @@ class LinkSearchResponse(BaseModel):
     message: Optional[str] = None
 
 # --- HELPERS ---
-def fetch_rapidapi_search(query: str) -> List[ProductResult]:
+async def fetch_rapidapi_search(query: str, page: int = 1, sort: str = RAPIDAPI_SORT) -> List[ProductResult]:
     """
     Calls AliExpress DataHub API (RapidAPI) to search for products by text.
+    Results are cached per (normalized query, sort, page); concurrent identical
+    searches share one upstream call.
     Attributes:
         query (str): The search keyword (e.g. 'smart watch', 'red dress').
     """
@@ -52,17 +65,26 @@ def fetch_rapidapi_search(query: str) -> List[ProductResult]:
         print("RapidAPI Key missing or invalid.")
         return []
 
-    url = "https://aliexpress-datahub.p.rapidapi.com/item_search"
-    querystring = {"q": query, "page": "1", "sort": "ordersDesc"} # Sort by orders for best products
+    # "  Smart   WATCH" and "smart watch" are the same search
+    query = " ".join(query.lower().split())
+    if not query:
+        return []
+    key = f"{sort}:{page}:{query}"
+    items = await rapidapi_cache.get_or_fetch(key, lambda: _fetch_rapidapi_items(query, page, sort))
+    return [ProductResult(**item) for item in items]
+
+async def _fetch_rapidapi_items(query: str, page: int, sort: str) -> List[dict]:
+    url = RAPIDAPI_SEARCH_URL
+    querystring = {"q": query, "page": str(page), "sort": sort}
     
     headers = {
         "x-rapidapi-key": RAPID_API_KEY,
-        "x-rapidapi-host": "aliexpress-datahub.p.rapidapi.com"
+        "x-rapidapi-host": RAPIDAPI_HOST
     }
     
     print(f"DEBUG: Fetching RapidAPI for query: {query}")
     try:
-        response = requests.get(url, headers=headers, params=querystring, timeout=10)
+        response = await get_async_client().get(url, headers=headers, params=querystring, timeout=10)
         print(f"DEBUG: RapidAPI Status: {response.status_code}")
         
         if response.status_code != 200:
@@ -91,7 +113,8 @@ def fetch_rapidapi_search(query: str) -> List[ProductResult]:
                 sales=item.get('trade', {}).get('tradeDesc', 'Unknown sold'),
                 moq="1 Piece"
             ))
-        return results[:12]
+        # Plain dicts, so the cache can store them as JSON
+        return [r.model_dump() for r in results[:12]]
         
     except Exception as e:
         print(f"RapidAPI Error: {e}")
@@ -206,7 +229,7 @@ async def search_by_image_endpoint(
         return {"results": []}
 
 @router.post("/link", response_model=SearchResponse)
-def search_from_link(req: LinkSearchRequest):
+async def search_from_link(req: LinkSearchRequest):
     """
     Smart Link Search:
     1. Scrapes the Title/Image from the provided URL.
@@ -216,16 +239,17 @@ def search_from_link(req: LinkSearchRequest):
     try:
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
         print("DEBUG: Scraping URL...")
-        res = requests.get(req.url, headers=headers, timeout=10)
-        print(f"DEBUG: Scrape Status Code: {res.status_code}")
-        
-        soup = BeautifulSoup(res.text, 'html.parser')
+        # Only the head (and first image) is read; the rest of the page isn't downloaded
+        page = PageMeta(max_images=1)
+        async with get_async_client().stream("GET", req.url, headers=headers, timeout=10) as res:
+            print(f"DEBUG: Scrape Status Code: {res.status_code}")
+            async for _ in stream_meta(res, page):
+                pass
         
         # 1. Scrape Title
-        title = soup.title.string if soup.title else ""
+        title = page.title or ""
         if not title:
-            og_title = soup.find("meta", property="og:title")
-            if og_title: title = og_title["content"]
+            title = page.og("title")
             
         print(f"DEBUG: Raw Title Found: '{title}'")
         
@@ -237,20 +261,16 @@ def search_from_link(req: LinkSearchRequest):
         # 2. Real API Search
         if USE_REAL_API and search_query:
             print("DEBUG: Calling RapidAPI...")
-            real_results = fetch_rapidapi_search(search_query)
+            real_results = await fetch_rapidapi_search(search_query)
             print(f"DEBUG: RapidAPI returned {len(real_results)} results")
             if real_results:
                  return {"results": real_results}
 
         # 3. Fallback
         print("DEBUG: Falling back to Mock/Image Scrape")
-        image_url = ""
-        og_img = soup.find("meta", property="og:image")
-        if og_img and og_img.get("content"):
-             image_url = og_img["content"]
-        else:
-            img = soup.find("img")
-            if img: image_url = img.get("src", "")
+        image_url = page.og("image")
+        if not image_url and page.images:
+            image_url = page.images[0]
             
         return {"results": get_mock_results("AliExpress", f"Matches for: {clean_title}")}
         
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, asc, func, select
 from typing import List, Optional
 from pydantic import BaseModel
-from ..database import get_db
+from ..database import get_async_db
 from ..models import GlobalProduct, GlobalStore
+from ..pagination import CountCache, encode_cursor, decode_cursor, keyset_filter, null_tail_filter
+from ..search_index import keyword_matches
+from ..services.response_cache import response_cache
+from ..services.leaderboards import leaderboard_page, order_by_ids
 
 router = APIRouter(
     prefix="/api/products",
@@ -20,21 +24,72 @@ class ProductSearchFilter(BaseModel):
     min_ads: Optional[int] = None
     niche: Optional[str] = None
     country: Optional[str] = None
-    sort_by: Optional[str] = "revenue_est" # revenue_est, ads_count, created_at
+    sort_by: Optional[str] = "revenue_est" # revenue_est, ads_count, price_low, created_at, relevance (with keyword)
     preset: Optional[str] = None # recommended, new_shops, active_ads
 
+# sort_by -> (column, descending). Ties are broken by id in the same direction.
+SORT_COLUMNS = {
+    "revenue_est": (GlobalProduct.revenue_est, True),
+    "ads_count": (GlobalProduct.ads_count, True),
+    "price_low": (GlobalProduct.price, False),
+    "created_at": (GlobalProduct.created_at, True),
+}
+
+# Smart presets: preset name -> extra filter
+PRESET_FILTERS = {
+    "recommended": GlobalProduct.is_winner == True,
+    "new_shops": GlobalProduct.is_new == True,
+    "active_ads": GlobalProduct.ads_count > 10, # Example logic
+}
+
+count_cache = CountCache()
+response_cache.on_invalidate(count_cache.clear)
+
+# Only the columns the response uses; store fields come from the same join
+# instead of lazy-loading p.store per row.
+RESULT_COLUMNS = (
+    GlobalProduct.id,
+    GlobalProduct.title,
+    GlobalProduct.price,
+    GlobalProduct.image_url,
+    GlobalProduct.revenue_est,
+    GlobalProduct.ads_count,
+    GlobalProduct.traffic_growth,
+    GlobalProduct.created_at,
+    GlobalStore.name.label("store_name"),
+    GlobalStore.url.label("store_url"),
+    GlobalStore.logo_url.label("store_logo"),
+    GlobalStore.country.label("store_country"),
+)
+
 @router.post("/search")
-def search_products(
+async def search_products(
     filters: ProductSearchFilter,
     page: int = 1,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None, # opaque next_cursor from the previous page
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(GlobalProduct).join(GlobalStore)
+    # Repeated filter sets (dashboard presets) are served from the response cache
+    cache_key = response_cache.key_for(
+        "products", filters, page=page, limit=limit, cursor=cursor, include_total=include_total
+    )
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    # 1. Keyword Search
+    query = select(*RESULT_COLUMNS).join(GlobalStore, GlobalProduct.store_id == GlobalStore.id)
+
+    # 1. Keyword Search (full-text index with prefix matching, ILIKE fallback)
+    rank_col = None
     if filters.keyword:
-        query = query.filter(GlobalProduct.title.ilike(f"%{filters.keyword}%"))
+        matches = keyword_matches("products", filters.keyword)
+        if matches is not None:
+            rank_col = matches.c.rank
+            query = query.join(matches, matches.c.id == GlobalProduct.id).add_columns(rank_col)
+        else:
+            query = query.filter(GlobalProduct.title.ilike(f"%{filters.keyword}%"))
 
     # 2. Price Range
     if filters.min_price is not None:
@@ -57,26 +112,51 @@ def search_products(
         query = query.filter(GlobalStore.country == filters.country)
 
     # 6. Smart Presets
-    if filters.preset == "recommended":
-        query = query.filter(GlobalProduct.is_winner == True)
-    elif filters.preset == "new_shops":
-        query = query.filter(GlobalProduct.is_new == True)
-    elif filters.preset == "active_ads":
-        query = query.filter(GlobalProduct.ads_count > 10) # Example logic
+    if filters.preset in PRESET_FILTERS:
+        query = query.filter(PRESET_FILTERS[filters.preset])
+
+    # Plain niche/country/preset listings: first pages come from the precomputed leaderboard
+    board = None if cursor else await leaderboard_page(db, "products", filters, page, limit)
+
+    # Total (cached per filter set so page turns don't recount)
+    total_count = None
+    if include_total and board is not None:
+        total_count = board.total
+    elif include_total:
+        count_query = select(func.count()).select_from(query.subquery())
+        total_count = await count_cache.aget_or_compute(
+            CountCache.key_for("products", filters), lambda: db.scalar(count_query)
+        )
 
     # 7. Sorting
-    if filters.sort_by == "revenue_est":
-        query = query.order_by(desc(GlobalProduct.revenue_est))
-    elif filters.sort_by == "ads_count":
-        query = query.order_by(desc(GlobalProduct.ads_count))
-    elif filters.sort_by == "price_low":
-        query = query.order_by(asc(GlobalProduct.price))
+    if filters.sort_by == "relevance" and rank_col is not None:
+        # Best full-text match first (lower rank = better)
+        sort_key = "relevance"
+        sort_col, descending = rank_col, False
+    else:
+        sort_key = filters.sort_by if filters.sort_by in SORT_COLUMNS else "created_at"
+        sort_col, descending = SORT_COLUMNS[sort_key]
+    direction = desc if descending else asc
+    query = query.order_by(direction(sort_col).nulls_last(), direction(GlobalProduct.id))
+
+    # Pagination: leaderboard ids, keyset when a cursor is given, offset otherwise
+    if board is not None:
+        rows = (await db.execute(query.filter(GlobalProduct.id.in_(board.ids)))).all()
+        products = order_by_ids(rows, board.ids)
+    elif cursor:
+        after = decode_cursor(cursor, sort_key)
+        products = (await db.execute(query.filter(keyset_filter(sort_col, GlobalProduct.id, after, descending)).limit(limit))).all()
+        tail = None if sort_key == "relevance" else null_tail_filter(sort_col, after)
+        if tail is not None and len(products) < limit:
+            # Past the last non-NULL sort value: continue with the NULL rows
+            products += (await db.execute(query.filter(tail).limit(limit - len(products)))).all()
     else:
-        query = query.order_by(desc(GlobalProduct.created_at))
+        products = (await db.execute(query.offset((page - 1) * limit).limit(limit))).all()
 
-    # Pagination
-    total_count = query.count()
-    products = query.offset((page - 1) * limit).limit(limit).all()
+    next_cursor = None
+    if len(products) == limit:
+        last = products[-1]
+        next_cursor = encode_cursor(sort_key, getattr(last, sort_col.key), last.id)
 
     # Response Formatting
     results = []
@@ -90,15 +170,18 @@ def search_products(
             "ads_active": p.ads_count,
             "trend": p.traffic_growth,
             "store": {
-                "name": p.store.name,
-                "url": p.store.url,
-                "logo": p.store.logo_url,
-                "country": p.store.country
+                "name": p.store_name,
+                "url": p.store_url,
+                "logo": p.store_logo,
+                "country": p.store_country
             }
         })
 
-    return {
+    response = {
         "total": total_count,
         "page": page,
+        "next_cursor": next_cursor,
         "results": results
     }
+    await response_cache.set(cache_key, response)
+    return response
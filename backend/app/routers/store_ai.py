@@ -2,6 +2,8 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import List, Optional
 from app.services.universal_product_scraper import UniversalProductScraper
+from app.services.http_client import get_async_client
+from app.services.ndjson import ndjson_response
 
 router = APIRouter(
     prefix="/api/store-ai",
@@ -17,9 +19,9 @@ class ScanResponse(BaseModel):
     data: dict
 
 @router.post("/scan", response_model=ScanResponse)
-def scan_product(req: ScanRequest):
+async def scan_product(req: ScanRequest):
     scraper = UniversalProductScraper()
-    data = scraper.scrape_url(req.url)
+    data = await scraper.scrape_url(req.url)
     
     if data.get("error"):
         return {"status": "error", "data": {"message": data["error"]}}
@@ -30,6 +32,11 @@ def scan_product(req: ScanRequest):
     
     return {"status": "success", "data": data}
 
+@router.post("/scan/stream")
+async def scan_product_stream(req: ScanRequest):
+    # NDJSON: metadata as soon as the page <head> arrives, then images, then done
+    return ndjson_response(UniversalProductScraper().stream(req.url))
+
 class ImageGenRequest(BaseModel):
     prompt: str
     n: int = 4
@@ -53,7 +60,7 @@ def generate_images(req: ImageGenRequest):
     return {"status": "success", "images": images}
 
 @router.post("/generate-palette")
-def generate_palette(req: ImageGenRequest):
+async def generate_palette(req: ImageGenRequest):
     """
     Generates a color palette using Google Gemini based on the store prompt/niche.
     """
@@ -77,7 +84,6 @@ def generate_palette(req: ImageGenRequest):
     payload = {"contents": [{"parts": [{"text": prompt}]}]}
     
     try:
-        import requests
         import json
         
         # 1. Helper function for cleaning JSON
@@ -85,7 +91,7 @@ def generate_palette(req: ImageGenRequest):
             return text.replace("```json", "").replace("```", "").strip()
 
         print(f"DEBUG: Calling Gemini for Palette: {req.prompt}")
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = await get_async_client().post(url, headers=headers, json=payload, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, asc, func, select
 from typing import List, Optional
 from pydantic import BaseModel
-from ..database import get_db
+from ..database import get_async_db
 from ..models import GlobalStore, GlobalProduct
+from ..pagination import CountCache, encode_cursor, decode_cursor, keyset_filter, null_tail_filter
+from ..search_index import keyword_matches
+from ..services.response_cache import response_cache
+from ..services.leaderboards import leaderboard_page, order_by_ids
 
 router = APIRouter(
     prefix="/api/stores",
@@ -25,23 +29,71 @@ class StoreSearchFilter(BaseModel):
     pixels: Optional[str] = None # Added
     traffic_source: Optional[str] = None
     preset: Optional[str] = None
-    sort_by: Optional[str] = "revenue"
+    sort_by: Optional[str] = "revenue" # revenue, traffic, ads, newest, relevance (with keyword)
+
+# sort_by -> column (all descending). Unknown sorts fall back to id order.
+SORT_COLUMNS = {
+    "revenue": GlobalStore.monthly_revenue,
+    "traffic": GlobalStore.traffic,
+    "ads": GlobalStore.active_ads,
+    "newest": GlobalStore.creation_date,
+}
+
+count_cache = CountCache()
+response_cache.on_invalidate(count_cache.clear)
+
+async def best_products_by_store(db: AsyncSession, store_ids: list) -> dict:
+    """
+    Top product by revenue_est for each store, resolved in one query with
+    ROW_NUMBER() OVER (PARTITION BY store_id ORDER BY revenue_est DESC).
+    """
+    if not store_ids:
+        return {}
+    ranked = select(
+        GlobalProduct.store_id,
+        GlobalProduct.title,
+        GlobalProduct.image_url,
+        GlobalProduct.price,
+        func.row_number().over(
+            partition_by=GlobalProduct.store_id,
+            order_by=(desc(GlobalProduct.revenue_est), asc(GlobalProduct.id))
+        ).label("rank")
+    ).filter(GlobalProduct.store_id.in_(store_ids)).subquery()
+
+    rows = (await db.execute(select(ranked).filter(ranked.c.rank == 1))).all()
+    return {r.store_id: r for r in rows}
 
 @router.post("/search")
-def search_stores(
+async def search_stores(
     filters: StoreSearchFilter,
     page: int = 1,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None, # opaque next_cursor from the previous page
+    include_total: bool = True,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(GlobalStore)
+    # Repeated filter sets (dashboard presets) are served from the response cache
+    cache_key = response_cache.key_for(
+        "stores", filters, page=page, limit=limit, cursor=cursor, include_total=include_total
+    )
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    # 1. Search Tab
+    query = select(GlobalStore)
+
+    # 1. Search Tab (full-text index over name + url, ILIKE fallback)
+    rank_col = None
     if filters.keyword:
-        query = query.filter(
-            (GlobalStore.name.ilike(f"%{filters.keyword}%")) | 
-            (GlobalStore.url.ilike(f"%{filters.keyword}%"))
-        )
+        matches = keyword_matches("stores", filters.keyword)
+        if matches is not None:
+            rank_col = matches.c.rank
+            query = query.join(matches, matches.c.id == GlobalStore.id)
+        else:
+            query = query.filter(
+                (GlobalStore.name.ilike(f"%{filters.keyword}%")) | 
+                (GlobalStore.url.ilike(f"%{filters.keyword}%"))
+            )
 
     # 2. Filters
     if filters.min_revenue is not None:
@@ -70,26 +122,63 @@ def search_stores(
     if filters.traffic_source:
         query = query.filter(GlobalStore.main_traffic_source.ilike(f"%{filters.traffic_source}%"))
 
+    # Plain niche/country listings: first pages come from the precomputed leaderboard
+    board = None if cursor else await leaderboard_page(db, "stores", filters, page, limit)
+
+    # Total (cached per filter set so page turns don't recount)
+    total = None
+    if include_total and board is not None:
+        total = board.total
+    elif include_total:
+        count_query = select(func.count()).select_from(query.subquery())
+        total = await count_cache.aget_or_compute(
+            CountCache.key_for("stores", filters), lambda: db.scalar(count_query)
+        )
+
     # Sorting
-    if filters.sort_by == "revenue":
-        query = query.order_by(desc(GlobalStore.monthly_revenue))
-    elif filters.sort_by == "traffic":
-        query = query.order_by(desc(GlobalStore.traffic))
-    elif filters.sort_by == "ads":
-        query = query.order_by(desc(GlobalStore.active_ads))
-    elif filters.sort_by == "newest":
-        query = query.order_by(desc(GlobalStore.creation_date))
-    
-    total = query.count()
-    stores = query.offset((page - 1) * limit).limit(limit).all()
+    by_relevance = filters.sort_by == "relevance" and rank_col is not None
+    if by_relevance:
+        # Best full-text match first (lower rank = better)
+        sort_key, sort_col, descending = "relevance", rank_col, False
+        query = query.add_columns(rank_col).order_by(asc(rank_col), asc(GlobalStore.id))
+    else:
+        sort_key = filters.sort_by if filters.sort_by in SORT_COLUMNS else "id"
+        sort_col, descending = SORT_COLUMNS.get(sort_key), True
+        if sort_col is not None:
+            query = query.order_by(desc(sort_col).nulls_last(), desc(GlobalStore.id))
+        else:
+            query = query.order_by(desc(GlobalStore.id))
+
+    # Pagination: leaderboard ids, keyset when a cursor is given, offset otherwise
+    if board is not None:
+        rows = (await db.execute(query.filter(GlobalStore.id.in_(board.ids)))).all()
+        rows = order_by_ids(rows, board.ids, key=lambda row: row[0].id)
+    elif cursor:
+        after = decode_cursor(cursor, sort_key)
+        rows = (await db.execute(query.filter(keyset_filter(sort_col, GlobalStore.id, after, descending)).limit(limit))).all()
+        tail = None if by_relevance else null_tail_filter(sort_col, after)
+        if tail is not None and len(rows) < limit:
+            # Past the last non-NULL sort value: continue with the NULL rows
+            rows += (await db.execute(query.filter(tail).limit(limit - len(rows)))).all()
+    else:
+        rows = (await db.execute(query.offset((page - 1) * limit).limit(limit))).all()
+    stores = [row[0] for row in rows]
+
+    next_cursor = None
+    if len(stores) == limit:
+        last = stores[-1]
+        if by_relevance:
+            sort_value = rows[-1][1]
+        else:
+            sort_value = getattr(last, sort_col.key) if sort_col is not None else None
+        next_cursor = encode_cursor(sort_key, sort_value, last.id)
+
+    # Step 5 requirement: Best Selling Product per store (one query for the whole page)
+    best_products = await best_products_by_store(db, [s.id for s in stores])
 
-    # Step 5 requirement: Best Selling Product per store
     results = []
     for s in stores:
-        # Fetch best selling (highest revenue/price) product for this store
-        best_product = db.query(GlobalProduct).filter(
-            GlobalProduct.store_id == s.id
-        ).order_by(desc(GlobalProduct.revenue_est)).first()
+        best_product = best_products.get(s.id)
 
         results.append({
             "id": s.id,
@@ -111,4 +200,6 @@ def search_stores(
             }
         })
 
-    return {"total": total, "results": results}
+    response = {"total": total, "next_cursor": next_cursor, "results": results}
+    await response_cache.set(cache_key, response)
+    return response
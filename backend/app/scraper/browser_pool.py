@@ -0,0 +1,147 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+try:
+    from playwright_stealth import StealthConfig, stealth_async
+except ImportError:
+    # Fallback if stealth not installed, though it should be
+    StealthConfig = None
+    stealth_async = None
+
+BROWSER_POOL_CONTEXTS = int(os.getenv("BROWSER_POOL_CONTEXTS", "2"))
+BROWSER_POOL_PAGES_PER_CONTEXT = int(os.getenv("BROWSER_POOL_PAGES_PER_CONTEXT", "4"))
+# Pages are closed and replaced after this many navigations to cap renderer memory growth.
+BROWSER_PAGE_MAX_USES = int(os.getenv("BROWSER_PAGE_MAX_USES", "50"))
+
+class _PooledPage:
+    def __init__(self, page, context):
+        self.page = page
+        self.context = context
+        self.uses = 0
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.open_pages = 0
+
+class BrowserPool:
+    """
+    One long-lived Chromium process shared by every tracker fetch.
+    Hands out up to contexts * pages_per_context pages at once; idle pages are
+    reused and recycled after max_page_uses navigations.
+    """
+    def __init__(
+        self,
+        max_contexts: int = BROWSER_POOL_CONTEXTS,
+        pages_per_context: int = BROWSER_POOL_PAGES_PER_CONTEXT,
+        max_page_uses: int = BROWSER_PAGE_MAX_USES
+    ):
+        self.max_contexts = max(1, max_contexts)
+        self.pages_per_context = max(1, pages_per_context)
+        self.max_page_uses = max(1, max_page_uses)
+
+        self._playwright = None
+        self._browser = None
+        self._contexts = []
+        self._idle = []
+        self._slots = asyncio.Semaphore(self.max_contexts * self.pages_per_context)
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """
+        Launches Chromium on first use, and again if it crashed or disconnected.
+        """
+        async with self._start_lock:
+            if self._browser is not None and not self._browser.is_connected():
+                # Its contexts and pages went with it
+                print("Browser pool: browser disconnected, relaunching")
+                self._browser = None
+                self._contexts = []
+                self._idle = []
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            if self._browser is None:
+                self._browser = await self._playwright.chromium.launch(headless=True)
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = None
+        self._playwright = None
+        self._contexts = []
+        self._idle = []
+
+    async def _new_context(self) -> _PooledContext:
+        context = await self._browser.new_context()
+        # Stealth patches are init scripts, so registering them on the context
+        # covers every page it ever opens.
+        if StealthConfig:
+            for script in StealthConfig().enabled_scripts:
+                await context.add_init_script(script)
+        pooled = _PooledContext(context)
+        self._contexts.append(pooled)
+        return pooled
+
+    async def _new_page(self) -> _PooledPage:
+        target = next((c for c in self._contexts if c.open_pages < self.pages_per_context), None)
+        if target is None:
+            target = await self._new_context()
+        target.open_pages += 1
+        try:
+            page = await target.context.new_page()
+            if not StealthConfig and stealth_async:
+                await stealth_async(page)
+        except Exception:
+            target.open_pages -= 1
+            raise
+        return _PooledPage(page, target)
+
+    async def _discard(self, slot: _PooledPage):
+        slot.context.open_pages -= 1
+        try:
+            await slot.page.close()
+        except Exception as e:
+            print(f"Browser pool: error closing page: {e}")
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Borrows a page. A page that raised is discarded rather than reused.
+        """
+        await self.start()
+        await self._slots.acquire()
+        slot = None
+        healthy = False
+        try:
+            slot = self._idle.pop() if self._idle else await self._new_page()
+            yield slot.page
+            healthy = True
+        finally:
+            if slot is not None:
+                slot.uses += 1
+                # Pages of a browser that has since been relaunched are not reused
+                if healthy and slot.uses < self.max_page_uses and slot.context in self._contexts:
+                    self._idle.append(slot)
+                else:
+                    await self._discard(slot)
+            self._slots.release()
+
+_pool = None
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Returns the process-wide browser pool. Chromium is only launched on first use.
+    """
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
+
+async def close_browser_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+    _pool = None
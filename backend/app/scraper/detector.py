@@ -1,8 +1,9 @@
-import requests
+import httpx
 from urllib.parse import urlparse
+from app.services.http_client import get_async_client
 
 class ShopifyDetector:
-    def is_shopify(self, url: str) -> bool:
+    async def is_shopify(self, url: str) -> bool:
         """
         Determines if a given URL is a Shopify store.
         """
@@ -13,7 +14,7 @@ class ShopifyDetector:
 
         try:
             # 2. Check Headers and Source
-            response = requests.get(url, timeout=10)
+            response = await get_async_client().get(url, timeout=10)
             
             # Check Headers
             if "X-ShopId" in response.headers:
@@ -23,7 +24,7 @@ class ShopifyDetector:
             if "Shopify.theme" in response.text or "cdn.shopify.com" in response.text:
                 return True
                 
-        except requests.RequestException:
+        except (httpx.HTTPError, httpx.InvalidURL):
             # If request fails, we can't definitively say it's not, but return False for now
             return False
             
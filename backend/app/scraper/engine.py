@@ -2,95 +2,205 @@ import json
 import csv
 import os
 from datetime import datetime
+from app.scraper.snapshot_store import SnapshotFile
+
+REPORT_FIELDS = [
+    'product_id', 'product_title', 'variant_id', 'variant_title',
+    'units_sold_est', 'revenue_est', 'timestamp', 'method'
+]
+
+def iter_snapshot_products(file_path: str, chunk_size: int = 64 * 1024):
+    """
+    Yields the entries of a products.json snapshot's "products" array one at a time.
+    Only the product currently being decoded is held in memory, not the whole document.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            # Drop what we've already consumed before growing the buffer
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        # 1. Seek to the opening bracket of the products array
+        while True:
+            key = buf.find('"products"', pos)
+            if key != -1:
+                bracket = buf.find('[', key)
+                if bracket != -1:
+                    pos = bracket + 1
+                    break
+            if eof:
+                return
+            fill()
+
+        # 2. Decode one product object at a time
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"Unexpected end of snapshot: {file_path}")
+                fill()
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                product, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            pos = end
+            yield product
 
 class SalesEngine:
-    def compare_snapshots(self, file_path_1: str, file_path_2: str) -> str:
+    def build_variant_index(self, products) -> dict:
         """
-        Compares two products.json snapshots and generates a sales report CSV.
-        Returns the path to the generated CSV artifact.
+        Builds variant_id -> (inventory, available, price) for the older snapshot.
+        inventory is None when the store hides inventory_quantity.
         """
-        try:
-            with open(file_path_1, 'r', encoding='utf-8') as f1:
-                data1 = json.load(f1)
-            with open(file_path_2, 'r', encoding='utf-8') as f2:
-                data2 = json.load(f2)
-        except Exception as e:
-            print(f"Error loading files: {e}")
-            return None
-
-        # Create a map of product_id -> product_data for faster lookup
-        products1 = {str(p['id']): p for p in data1.get('products', [])}
-        products2 = {str(p['id']): p for p in data2.get('products', [])}
+        index = {}
+        for p in products:
+            for v in p.get('variants', []):
+                index[v['id']] = (
+                    v.get('inventory_quantity'),
+                    v.get('available', True),
+                    float(v.get('price', 0))
+                )
+        return index
 
-        sales_report = []
+    def iter_sales(self, old_index: dict, products, timestamp: str = None):
+        """
+        Streams the newer snapshot's products against the older snapshot's index
+        and yields one sales row per detected sale.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
 
-        for p_id, p2 in products2.items():
-            p1 = products1.get(p_id)
-            if not p1:
-                continue # New product, can't calc sales yet
+        for p2 in products:
+            p_id = str(p2['id'])
 
-            for v2 in p2['variants']:
-                v1 = next((v for v in p1['variants'] if v['id'] == v2['id']), None)
-                if not v1:
-                    continue
+            for v2 in p2.get('variants', []):
+                old = old_index.get(v2['id'])
+                if old is None:
+                    continue # New product/variant, can't calc sales yet
+                qty1, available1, _ = old
 
                 # Logic 1: Public Inventory
-                if 'inventory_quantity' in v1 and 'inventory_quantity' in v2:
-                    qty1 = v1['inventory_quantity']
+                if qty1 is not None and 'inventory_quantity' in v2:
                     qty2 = v2['inventory_quantity']
                     if qty1 > qty2:
                         sold = qty1 - qty2
-                        revenue = sold * float(v2['price'])
-                        sales_report.append({
+                        yield {
                             'product_id': p_id,
-                            'product_title': p2['title'],
+                            'product_title': p2.get('title'),
                             'variant_id': v2['id'],
-                            'variant_title': v2['title'],
+                            'variant_title': v2.get('title'),
                             'units_sold_est': sold,
-                            'revenue_est': revenue,
-                            'timestamp': datetime.now().isoformat(),
+                            'revenue_est': sold * float(v2['price']),
+                            'timestamp': timestamp,
                             'method': 'inventory_diff'
-                        })
-                
+                        }
+
                 # Logic 2: Hidden Inventory (Status Change)
                 else:
                     # Check if status changed from available to not available
                     # Note: products.json often uses 'available' boolean, but sometimes it depends on inventory_management
-                    available1 = v1.get('available', True) # Default to true if missing? or strict check
                     available2 = v2.get('available', True)
-                    
+
                     if available1 and not available2:
                         # Sold out!
-                        sales_report.append({
+                        yield {
                             'product_id': p_id,
-                            'product_title': p2['title'],
+                            'product_title': p2.get('title'),
                             'variant_id': v2['id'],
-                            'variant_title': v2['title'],
+                            'variant_title': v2.get('title'),
                             'units_sold_est': 1, # Minimal estimate
                             'revenue_est': float(v2['price']),
-                            'timestamp': datetime.now().isoformat(),
+                            'timestamp': timestamp,
                             'method': 'status_change_sold_out'
-                        })
-                    elif v1.get('updated_at') != v2.get('updated_at'):
-                         # Updated but status didn't change to sold out? Maybe price change or simple update.
-                         # Strict diff engine might ignore this to avoid false positives.
-                         pass
-
-        # Generate CSV
-        if not sales_report:
-            print("No sales detected between snapshots.")
-            return None
+                        }
 
+    def write_report(self, sales, csv_path: str) -> int:
+        """
+        Writes sales rows to csv_path as they arrive. The file is only created
+        once the first row shows up. Returns the number of rows written.
+        """
+        rows = 0
+        output_file = None
+        try:
+            for row in sales:
+                if output_file is None:
+                    output_file = open(csv_path, 'w', newline='', encoding='utf-8')
+                    writer = csv.DictWriter(output_file, REPORT_FIELDS)
+                    writer.writeheader()
+                writer.writerow(row)
+                rows += 1
+        finally:
+            if output_file is not None:
+                output_file.close()
+        return rows
+
+    def report_path(self) -> str:
         artifact_name = "Phase2_Artifact.csv"
         # Save in backend root for easy access or artifacts dir?
         # User requested "Phase2_Artifact.csv"
-        csv_path = os.path.join("backend", artifact_name)
-        
-        keys = sales_report[0].keys()
-        with open(csv_path, 'w', newline='', encoding='utf-8') as output_file:
-            dict_writer = csv.DictWriter(output_file, keys)
-            dict_writer.writeheader()
-            dict_writer.writerows(sales_report)
-            
+        return os.path.join("backend", artifact_name)
+
+    def compare_snapshots(self, file_path_1: str, file_path_2: str) -> str:
+        """
+        Compares two products.json snapshots and generates a sales report CSV.
+        Returns the path to the generated CSV artifact.
+        """
+        try:
+            old_index = self.build_variant_index(iter_snapshot_products(file_path_1))
+        except Exception as e:
+            print(f"Error loading files: {e}")
+            return None
+
+        csv_path = self.report_path()
+
+        try:
+            sales = self.iter_sales(old_index, iter_snapshot_products(file_path_2))
+            rows = self.write_report(sales, csv_path)
+        except Exception as e:
+            print(f"Error loading files: {e}")
+            return None
+
+        return self._finish_report(rows, csv_path)
+
+    def compare_crawls(self, snapshot_path: str, older: int = -2, newer: int = -1) -> str:
+        """
+        Same report as compare_snapshots, but diffs two crawls of a columnar
+        SnapshotStore file (defaults to the two most recent) straight from the mmap.
+        """
+        try:
+            with SnapshotFile(snapshot_path) as snap:
+                if len(snap.crawls) < 2:
+                    print(f"Need two crawls to compare, found {len(snap.crawls)}: {snapshot_path}")
+                    return None
+                old_index = snap.crawls[older].variant_index()
+                csv_path = self.report_path()
+                sales = self.iter_sales(old_index, snap.crawls[newer].iter_products())
+                rows = self.write_report(sales, csv_path)
+        except Exception as e:
+            print(f"Error loading files: {e}")
+            return None
+
+        return self._finish_report(rows, csv_path)
+
+    def _finish_report(self, rows: int, csv_path: str) -> str:
+        if not rows:
+            print("No sales detected between snapshots.")
+            return None
+
         print(f"Sales report generated: {csv_path}")
         return csv_path
@@ -0,0 +1,223 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+
+# On-disk layout (one append-only file per store, one block per crawl):
+#
+#   header   <4sHHqQ  magic, version, reserved, crawled_at (epoch s), rows
+#   columns  product_id q[rows] | variant_id q[rows] | price d[rows]
+#            updated_at q[rows] | inventory i[rows] | available B[rows]
+#   padding  to the next 8-byte boundary
+#
+# Only the fields SalesEngine needs are kept, little-endian, so a block can be
+# read straight out of an mmap without parsing anything.
+MAGIC = b"SNAP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHqQ")
+COLUMNS = [
+    ("product_id", "q"),
+    ("variant_id", "q"),
+    ("price", "d"),
+    ("updated_at", "q"),
+    ("inventory", "i"),
+    ("available", "B"),
+]
+# inventory_quantity is hidden by most stores; this marks "not published".
+NO_INVENTORY = -2 ** 31
+
+_SWAP = sys.byteorder != "little"
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+def _epoch(value) -> int:
+    if not value:
+        return 0
+    try:
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except (ValueError, AttributeError):
+        return 0
+
+def _column_sizes(rows: int) -> list:
+    return [rows * array(code).itemsize for _, code in COLUMNS]
+
+def _blocks(buf, path: str):
+    """
+    (offset, crawled_at, rows) of each complete block, stopping at the first
+    corrupt or torn one.
+    """
+    offset = 0
+    total = len(buf)
+    while offset + HEADER.size <= total:
+        magic, version, _, crawled_at, rows = HEADER.unpack_from(buf, offset)
+        if magic != MAGIC or version != VERSION:
+            print(f"Snapshot store corrupt at offset {offset}: {path}")
+            return
+        block = _padded(HEADER.size + sum(_column_sizes(rows)))
+        if offset + block > total:
+            # Torn write from an interrupted crawl; ignore the tail
+            return
+        yield offset, crawled_at, rows
+        offset += block
+
+def _complete_length(f, path: str) -> int:
+    """
+    Size of the readable prefix of an open store file (end of its last complete block).
+    """
+    if not os.fstat(f.fileno()).st_size:
+        return 0
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        end = 0
+        for offset, _, rows in _blocks(m, path):
+            end = offset + _padded(HEADER.size + sum(_column_sizes(rows)))
+        return end
+
+class Crawl:
+    """
+    One crawl block inside a store file. Columns are memoryviews over the mmap.
+    """
+    def __init__(self, buf: memoryview, offset: int, crawled_at: int, rows: int):
+        self.crawled_at = crawled_at
+        self.rows = rows
+        self.columns = {}
+
+        pos = offset + HEADER.size
+        for (name, code), size in zip(COLUMNS, _column_sizes(rows)):
+            if _SWAP:
+                col = array(code, buf[pos:pos + size].tobytes())
+                col.byteswap()
+                self.columns[name] = memoryview(col)
+            else:
+                self.columns[name] = buf[pos:pos + size].cast(code)
+            pos += size
+
+    @property
+    def crawled_at_dt(self) -> datetime:
+        return datetime.fromtimestamp(self.crawled_at)
+
+    def variant_index(self) -> dict:
+        """
+        variant_id -> (inventory, available, price), the shape SalesEngine diffs against.
+        """
+        c = self.columns
+        return {
+            vid: (None if inv == NO_INVENTORY else inv, bool(avail), price)
+            for vid, inv, avail, price in zip(c["variant_id"], c["inventory"], c["available"], c["price"])
+        }
+
+    def iter_products(self):
+        """
+        Rebuilds minimal products.json-style dicts (no titles) grouped by product.
+        Rows are written product by product, so grouping is a single pass.
+        """
+        c = self.columns
+        current = None
+        for pid, vid, price, updated_at, inv, avail in zip(
+            c["product_id"], c["variant_id"], c["price"], c["updated_at"], c["inventory"], c["available"]
+        ):
+            if current is None or current["id"] != pid:
+                if current is not None:
+                    yield current
+                current = {"id": pid, "title": None, "variants": []}
+            variant = {"id": vid, "title": None, "price": price, "available": bool(avail), "updated_at": updated_at}
+            if inv != NO_INVENTORY:
+                variant["inventory_quantity"] = inv
+            current["variants"].append(variant)
+        if current is not None:
+            yield current
+
+    def release(self):
+        for view in self.columns.values():
+            view.release()
+        self.columns = {}
+
+class SnapshotFile:
+    """
+    Read-only mmap of a store file. Use as a context manager so the
+    column views are released before the map is closed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._buf = memoryview(self._mmap) if self._mmap else memoryview(b"")
+        self.crawls = self._scan()
+
+    def _scan(self) -> list:
+        return [Crawl(self._buf, offset, crawled_at, rows) for offset, crawled_at, rows in _blocks(self._buf, self.path)]
+
+    def close(self):
+        for crawl in self.crawls:
+            crawl.release()
+        self.crawls = []
+        self._buf.release()
+        if self._mmap:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class SnapshotStore:
+    """
+    Compact per-store snapshot storage for StealthTracker.
+    Each crawl appends one columnar block to <root_dir>/<domain>.snap.
+    """
+    def __init__(self, root_dir: str = "backend/raw_data"):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def path_for(self, domain: str) -> str:
+        return os.path.join(self.root_dir, f"{domain}.snap")
+
+    def append(self, domain: str, products, crawled_at: datetime = None) -> str:
+        """
+        Appends a crawl of products.json products. Returns the store file path.
+        """
+        cols = {name: array(code) for name, code in COLUMNS}
+        for p in products:
+            for v in p.get("variants", []):
+                inv = v.get("inventory_quantity")
+                cols["product_id"].append(int(p["id"]))
+                cols["variant_id"].append(int(v["id"]))
+                cols["price"].append(float(v.get("price") or 0))
+                cols["updated_at"].append(_epoch(v.get("updated_at")))
+                cols["inventory"].append(NO_INVENTORY if inv is None else int(inv))
+                cols["available"].append(1 if v.get("available", True) else 0)
+
+        rows = len(cols["variant_id"])
+        crawled_at = crawled_at or datetime.now()
+        header = HEADER.pack(MAGIC, VERSION, 0, int(crawled_at.timestamp()), rows)
+        body_size = HEADER.size + sum(_column_sizes(rows))
+
+        path = self.path_for(domain)
+        with open(path, "ab"):
+            pass # create it
+        with open(path, "r+b") as f:
+            # Drop a torn / corrupt tail first: reads stop there, so anything
+            # appended after it would never be seen
+            end = _complete_length(f, path)
+            size = f.seek(0, os.SEEK_END)
+            if end < size:
+                print(f"Snapshot store: dropping {size - end} unreadable bytes at the end of {path}")
+                f.truncate(end)
+            f.seek(end)
+            f.write(header)
+            for name, _ in COLUMNS:
+                col = cols[name]
+                if _SWAP:
+                    col.byteswap()
+                f.write(col.tobytes())
+            f.write(b"\0" * (_padded(body_size) - body_size))
+        return path
+
+    def open(self, domain_or_path: str) -> SnapshotFile:
+        path = domain_or_path if domain_or_path.endswith(".snap") else self.path_for(domain_or_path)
+        return SnapshotFile(path)
@@ -1,69 +1,86 @@
-import asyncio
 import json
 import os
-from datetime import datetime
-from playwright.async_api import async_playwright
-try:
-    from playwright_stealth import stealth_async
-except ImportError:
-    # Fallback if stealth not installed, though it should be
-    stealth_async = None
+from app.scraper.browser_pool import get_browser_pool
+from app.scraper.snapshot_store import SnapshotStore
+from app.services.http_client import get_async_client
 
 class StealthTracker:
-    def __init__(self, raw_data_dir="backend/raw_data"):
+    def __init__(self, raw_data_dir="backend/raw_data", pool=None):
         self.raw_data_dir = raw_data_dir
         os.makedirs(self.raw_data_dir, exist_ok=True)
+        self.store = SnapshotStore(self.raw_data_dir)
+        self.pool = pool or get_browser_pool()
+
+    def snapshot_key(self, url: str) -> str:
+        """
+        Name of the store's snapshot file inside raw_data_dir.
+        """
+        return url.split("//")[-1].rstrip("/").replace("/", "_")
+
+    async def fetch_direct(self, products_url: str):
+        """
+        Fast path: plain HTTP GET of products.json. Most stores serve it without
+        a bot challenge, so no browser is needed. Returns None to fall back.
+        """
+        try:
+            res = await get_async_client().get(products_url)
+            if res.status_code != 200 or "json" not in res.headers.get("content-type", ""):
+                return None
+            data = res.json()
+            return data if isinstance(data, dict) and "products" in data else None
+        except Exception as e:
+            print(f"Direct fetch failed for {products_url}: {e}")
+            return None
+
+    async def fetch_with_browser(self, products_url: str) -> dict:
+        """
+        Slow path: loads products.json in a pooled stealth browser page.
+        """
+        async with self.pool.page() as page:
+            await page.goto(products_url, wait_until="networkidle")
+
+            # Use evaluate to get the raw JSON text from the body if it's rendered as text
+            # Or just grab the text content if the browser renders the JSON
+            json_content = await page.evaluate("document.body.innerText")
+
+            # Validate JSON
+            try:
+                return json.loads(json_content)
+            except json.JSONDecodeError:
+                # Fallback: sometimes it's wrapped in HTML pre tags
+                json_content = await page.locator("pre").inner_text()
+                return json.loads(json_content)
+
+    async def fetch_catalog(self, url: str) -> dict:
+        """
+        Returns the parsed products.json document, trying plain HTTP before the browser.
+        """
+        # Ensure URL is formatted correctly
+        if not url.startswith("http"):
+            url = "https://" + url
+
+        products_url = f"{url.rstrip('/')}/products.json?limit=250"
+        print(f"Fetching: {products_url}")
+
+        data = await self.fetch_direct(products_url)
+        if data is None:
+            data = await self.fetch_with_browser(products_url)
+        return data
 
     async def fetch_products(self, url: str) -> str:
         """
         Fetches products.json from a Shopify store using stealth mode.
-        Returns the path to the saved JSON file.
+        Appends the crawl to the store's columnar snapshot file and returns its path.
         """
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            if stealth_async:
-                await stealth_async(page)
-            
-            # Ensure URL is formatted correctly
-            if not url.startswith("http"):
-                url = "https://" + url
-                
-            products_url = f"{url.rstrip('/')}/products.json?limit=250"
-            print(f"Fetching: {products_url}")
-            
-            try:
-                await page.goto(products_url, wait_until="networkidle")
-                
-                # Extract JSON content
-                content = await page.content()
-                # Use evaluate to get the raw JSON text from the body if it's rendered as text
-                # Or just grab the text content if the browser renders the JSON
-                json_content = await page.evaluate("document.body.innerText")
-                
-                # Validate JSON
-                try:
-                    data = json.loads(json_content)
-                except json.JSONDecodeError:
-                    # Fallback: sometimes it's wrapped in HTML pre tags
-                    json_content = await page.locator("pre").inner_text()
-                    data = json.loads(json_content)
+        try:
+            data = await self.fetch_catalog(url)
 
-                # Save to file
-                domain = url.split("//")[-1].replace("/", "_")
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"{domain}_{timestamp}.json"
-                file_path = os.path.join(self.raw_data_dir, filename)
-                
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
-                
-                print(f"Saved: {file_path}")
-                return file_path
-                
-            except Exception as e:
-                print(f"Error fetching {url}: {e}")
-                return None
-            finally:
-                await browser.close()
+            # Append to the store's snapshot file (only the fields SalesEngine diffs)
+            file_path = self.store.append(self.snapshot_key(url), data.get("products", []))
+
+            print(f"Saved: {file_path}")
+            return file_path
+
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
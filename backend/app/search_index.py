@@ -0,0 +1,143 @@
+import re
+from sqlalchemy import func, inspect, literal_column, select, text
+from sqlalchemy.exc import OperationalError
+from .models import GlobalProduct, GlobalStore
+
+# Keyword search backends:
+#   sqlite   -> FTS5 external-content tables kept in sync by triggers
+#   postgres -> GIN index on to_tsvector('simple', ...)
+# Anything else (or SQLite built without FTS5) falls back to ILIKE.
+#
+# With a full-text backend every keyword word must match the start of a word
+# in the row: "shirt" finds "Shirt" and "shirts" but not "tshirt" (the ILIKE
+# fallback still matches substrings). Substring matching would need a scan, or
+# trigram indexes maintained on every insert, for what is an edge case here.
+SEARCH_TABLES = {
+    "products": {"model": GlobalProduct, "table": "global_products", "columns": ["title"]},
+    "stores": {"model": GlobalStore, "table": "global_stores", "columns": ["name", "url"]},
+}
+
+# Set by ensure_search_indexes(); None means "use ILIKE".
+SEARCH_BACKEND = None
+
+def _tokens(keyword: str) -> list:
+    return re.findall(r"\w+", keyword.lower())
+
+def _pg_document(spec):
+    model = spec["model"]
+    parts = [func.coalesce(getattr(model, c), literal_column("''")) for c in spec["columns"]]
+    doc = parts[0]
+    for part in parts[1:]:
+        doc = doc.op("||")(literal_column("' '")).op("||")(part)
+    return func.to_tsvector(literal_column("'simple'"), doc)
+
+def _pg_document_sql(spec) -> str:
+    # Must render the same expression as _pg_document so the planner matches the index
+    return " || ' ' || ".join(f"coalesce({c}, '')" for c in spec["columns"])
+
+# --- Index management ---
+
+def _ensure_sqlite(conn):
+    for kind, spec in SEARCH_TABLES.items():
+        table = spec["table"]
+        fts = f"{table}_fts"
+        cols = ", ".join(spec["columns"])
+        new_cols = ", ".join(f"new.{c}" for c in spec["columns"])
+        old_cols = ", ".join(f"old.{c}" for c in spec["columns"])
+
+        existing = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE name IN (:fts, :ai, :ad, :au)"
+        ), {"fts": fts, "ai": f"{fts}_ai", "ad": f"{fts}_ad", "au": f"{fts}_au"}).scalars().all()
+
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        ))
+
+        if len(existing) < 4:
+            # New index, or the base table was dropped and recreated: reindex from the content table
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            print(f"Search index rebuilt: {fts}")
+
+def _ensure_postgres(conn):
+    for kind, spec in SEARCH_TABLES.items():
+        table = spec["table"]
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_fts ON {table} "
+            f"USING GIN (to_tsvector('simple', {_pg_document_sql(spec)}))"
+        ))
+        for c in spec["columns"]:
+            # Trigram indexes from earlier versions: no query uses them
+            conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_{c}_trgm"))
+
+def ensure_search_indexes(engine):
+    """
+    Creates (idempotently) the full-text indexes for the current database and
+    selects the keyword search backend. Safe to call on every startup.
+    """
+    global SEARCH_BACKEND
+    dialect = engine.dialect.name
+
+    tables = set(inspect(engine).get_table_names())
+    if not all(spec["table"] in tables for spec in SEARCH_TABLES.values()):
+        print("Search index skipped: tables not created yet.")
+        SEARCH_BACKEND = None
+        return
+
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                _ensure_sqlite(conn)
+            elif dialect == "postgresql":
+                _ensure_postgres(conn)
+            else:
+                SEARCH_BACKEND = None
+                return
+        SEARCH_BACKEND = dialect
+    except OperationalError as e:
+        print(f"Full-text search unavailable, falling back to ILIKE: {e}")
+        SEARCH_BACKEND = None
+
+# --- Query helpers ---
+
+def keyword_matches(kind: str, keyword: str):
+    """
+    Subquery of (id, rank) for rows matching every keyword token as a prefix.
+    Lower rank = better match. Returns None when no full-text backend is
+    available (or the keyword has no word characters); callers then use ILIKE.
+    """
+    spec = SEARCH_TABLES[kind]
+    tokens = _tokens(keyword)
+    if SEARCH_BACKEND is None or not tokens:
+        return None
+
+    if SEARCH_BACKEND == "sqlite":
+        fts = f"{spec['table']}_fts"
+        match = " ".join(f'"{t}"*' for t in tokens)
+        return select(
+            literal_column("rowid").label("id"),
+            literal_column(f"bm25({fts})").label("rank")
+        ).select_from(text(fts)).where(
+            text(f"{fts} MATCH :fts_query").bindparams(fts_query=match)
+        ).subquery(f"{kind}_matches")
+
+    model = spec["model"]
+    document = _pg_document(spec)
+    ts_query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{t}:*" for t in tokens))
+    return select(
+        model.id.label("id"),
+        (-func.ts_rank(document, ts_query)).label("rank")
+    ).where(document.op("@@")(ts_query)).subquery(f"{kind}_matches")
@@ -0,0 +1,240 @@
+import asyncio
+import csv
+import io
+import os
+import time
+import uuid
+from app.services.domains import canonical_domain
+from app.services.scan_pipeline import ScanPipeline
+
+# Bulk competitor import: one job scans a whole URL list server-side.
+# Scans from every job share one worker pool, so throughput is set by
+# BATCH_SCAN_CONCURRENCY rather than by how many jobs / browsers are open.
+BATCH_SCAN_CONCURRENCY = int(os.getenv("BATCH_SCAN_CONCURRENCY", "8"))
+# Minimum gap between two scans of the same host (per host, not per registrable
+# domain: *.myshopify.com stores are separate shops and scan in parallel).
+# Requests within a scan are further capped per host by the shared HTTP client
+# (HTTP_MAX_PER_HOST).
+BATCH_SCAN_HOST_DELAY = float(os.getenv("BATCH_SCAN_HOST_DELAY", "0.5"))
+BATCH_SCAN_MAX_URLS = int(os.getenv("BATCH_SCAN_MAX_URLS", "1000"))
+# Finished jobs kept for polling; the oldest are dropped past this
+BATCH_SCAN_MAX_JOBS = int(os.getenv("BATCH_SCAN_MAX_JOBS", "100"))
+# New jobs are refused (HTTP 429) past this many unfinished jobs, or when their
+# targets would push the scans still pending across all jobs past the second cap
+BATCH_SCAN_MAX_ACTIVE_JOBS = int(os.getenv("BATCH_SCAN_MAX_ACTIVE_JOBS", "20"))
+BATCH_SCAN_MAX_PENDING = int(os.getenv("BATCH_SCAN_MAX_PENDING", "5000"))
+
+# Header names recognised as the URL column of an uploaded CSV
+CSV_URL_COLUMNS = {"url", "domain", "website", "store", "store_url", "site"}
+
+def parse_url_csv(text: str) -> list:
+    """
+    URLs from a CSV export: the column headed url/domain/website/..., or the
+    first column when there is no such header.
+    """
+    rows = [row for row in csv.reader(io.StringIO(text.lstrip("\ufeff"))) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    column = 0
+    header = [cell.strip().lower() for cell in rows[0]]
+    for i, name in enumerate(header):
+        if name in CSV_URL_COLUMNS:
+            column = i
+            rows = rows[1:]
+            break
+    return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+
+class BatchScanJob:
+    def __init__(self, urls: list):
+        self.id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.finished_at = None
+        self.status = "queued"
+        # canonical domain -> first URL given for it
+        self.targets = {}
+        self.duplicates = 0
+        self.invalid = []
+        for url in urls:
+            domain = canonical_domain(url)
+            if not domain or "." not in domain:
+                self.invalid.append(url)
+            elif domain in self.targets:
+                self.duplicates += 1
+            else:
+                self.targets[domain] = url.strip()
+        # Completed scans, in completion order
+        self.results = []
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled")
+
+    def summary(self) -> dict:
+        failed = sum(1 for r in self.results if r["status"] == "error")
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.targets),
+            "completed": len(self.results),
+            "failed": failed,
+            "pending": len(self.targets) - len(self.results),
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    async def _publish(self, result: dict = None, status: str = None):
+        async with self._changed:
+            if result is not None:
+                self.results.append(result)
+            if status is not None:
+                self.status = status
+                if self.finished:
+                    self.finished_at = time.time()
+            self._changed.notify_all()
+
+    async def events(self, since: int = 0):
+        """
+        Yields {"event": "result"} for every completed scan from index since,
+        waiting for new ones, then a final {"event": "done"} with the summary.
+        """
+        index = since
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.results) > index or self.finished)
+                pending = self.results[index:]
+                finished = self.finished
+            for result in pending:
+                yield {"event": "result", "index": index, "data": result}
+                index += 1
+            if finished and index >= len(self.results):
+                break
+        yield {"event": "done", "data": self.summary()}
+
+class BatchScanner:
+    """
+    Runs BatchScanJobs on a shared, bounded pool of scan slots, spacing out
+    scans of the same host by host_delay seconds. Jobs live in memory in this
+    process (poll the worker that created them).
+    """
+    def __init__(
+        self,
+        pipeline: ScanPipeline = None,
+        concurrency: int = BATCH_SCAN_CONCURRENCY,
+        host_delay: float = BATCH_SCAN_HOST_DELAY,
+        max_jobs: int = BATCH_SCAN_MAX_JOBS,
+        max_active_jobs: int = BATCH_SCAN_MAX_ACTIVE_JOBS,
+        max_pending: int = BATCH_SCAN_MAX_PENDING
+    ):
+        self.pipeline = pipeline or ScanPipeline()
+        self.concurrency = max(1, concurrency)
+        self.host_delay = host_delay
+        self.max_jobs = max_jobs
+        self.max_active_jobs = max_active_jobs
+        self.max_pending = max_pending
+
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        # host -> earliest time its next scan may start (only hosts with a
+        # reservation still in the future are kept)
+        self._host_next_scan = {}
+        self.jobs = {}
+
+    def can_accept(self, job: BatchScanJob) -> bool:
+        """
+        False when the pool is saturated (too many unfinished jobs / pending scans).
+        """
+        active = [j for j in self.jobs.values() if not j.finished]
+        pending = sum(len(j.targets) - len(j.results) for j in active)
+        return len(active) < self.max_active_jobs and pending + len(job.targets) <= self.max_pending
+
+    def submit(self, job: BatchScanJob) -> BatchScanJob:
+        self._prune()
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.task.cancel()
+        try:
+            await job.task
+        except asyncio.CancelledError:
+            pass
+        if not job.finished:
+            # Cancelled before its task got to run
+            await job._publish(status="cancelled")
+        return job
+
+    async def close(self):
+        """
+        Cancels running jobs (called on app shutdown).
+        """
+        for job in list(self.jobs.values()):
+            await self.cancel(job.id)
+
+    def _prune(self):
+        # Drop the oldest finished jobs; running ones are never dropped
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in finished[:max(0, len(self.jobs) + 1 - self.max_jobs)]:
+            del self.jobs[job.id]
+
+    async def _run(self, job: BatchScanJob):
+        queue = list(job.targets.items())
+        queue.reverse()
+
+        async def worker():
+            while queue:
+                domain, url = queue.pop()
+                await job._publish(await self._scan(domain, url))
+
+        try:
+            await job._publish(status="running")
+            # No more workers than scan slots: the rest of the list waits in the queue
+            workers = min(self.concurrency, len(queue))
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            await job._publish(status="done")
+        except asyncio.CancelledError:
+            await job._publish(status="cancelled")
+            raise
+
+    async def _wait_for_host(self, domain: str):
+        # Reserve the host's next slot (no await in between, so no lock needed)
+        now = time.monotonic()
+        for host in [h for h, at in self._host_next_scan.items() if at <= now]:
+            del self._host_next_scan[host]
+        start = max(now, self._host_next_scan.get(domain, now))
+        self._host_next_scan[domain] = start + self.host_delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _scan(self, domain: str, url: str) -> dict:
+        await self._wait_for_host(domain)
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                data = await self.pipeline.run(url)
+                status = "error" if data.get("error") else ("partial" if data.get("partial") else "ok")
+                error = data.get("error")
+            except Exception as e:
+                print(f"Batch Scan Error ({url}): {e}")
+                data, status, error = None, "error", str(e)
+            return {
+                "domain": domain, "url": url, "status": status, "error": error,
+                "ms": round((time.perf_counter() - start) * 1000, 1), "data": data,
+            }
+
+_batch_scanner = None
+
+def get_batch_scanner() -> BatchScanner:
+    global _batch_scanner
+    if _batch_scanner is None:
+        _batch_scanner = BatchScanner()
+    return _batch_scanner
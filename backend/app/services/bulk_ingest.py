@@ -0,0 +1,334 @@
+"""
+Bulk loader for the spy database (GlobalStore / GlobalProduct).
+
+Streams records in batches through Core executemany upserts (or COPY into a
+staging table on Postgres + psycopg2) instead of the ORM unit of work.
+Stores upsert on their canonical domain (the normalized url), products on
+(store_id, handle). Run from backend/:
+
+    python -m app.services.bulk_ingest --stores stores.csv --products products.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+from sqlalchemy import Boolean, DateTime, Float, Integer, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.database import engine as default_engine
+from app.models import GlobalStore, GlobalProduct
+from app.services.domains import canonical_domain
+
+BULK_INGEST_BATCH_SIZE = int(os.getenv("BULK_INGEST_BATCH_SIZE", "5000"))
+# Progress is printed every this many rows
+BULK_INGEST_REPORT_EVERY = int(os.getenv("BULK_INGEST_REPORT_EVERY", "100000"))
+
+STORE_CONFLICT = ("canonical_domain",)
+PRODUCT_CONFLICT = ("store_id", "handle")
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+
+class IngestStats:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.rows = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self._reported = 0
+
+    def add(self, rows: int):
+        self.rows += rows
+        self.seconds = time.perf_counter() - self.started
+        if self.rows - self._reported >= BULK_INGEST_REPORT_EVERY:
+            self._reported = self.rows
+            print(f"  {self}")
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.kind}: {self.rows} rows in {self.seconds:.1f}s "
+                f"({self.rows_per_sec:,.0f} rows/s, {self.skipped} skipped)")
+
+# --- Record sources ---
+
+def read_csv(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+def read_ndjson(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def read_records(path: str):
+    """
+    CSV or NDJSON by file extension.
+    """
+    return read_csv(path) if path.lower().endswith(".csv") else read_ndjson(path)
+
+def scan_result_records(result: dict) -> tuple:
+    """
+    (store_record, product_records) from a /api/analysis/scan result.
+    """
+    estimates = result.get("estimates") or {}
+    market_share = result.get("market_share") or []
+    pixels = [name for flag, name in (("has_fb_pixel", "FB"), ("has_google_tag", "Google"), ("has_tiktok_pixel", "TikTok")) if result.get(flag)]
+    store = {
+        "url": result["url"],
+        "name": result.get("title"),
+        "currency": result.get("currency"),
+        "product_count": result.get("count"),
+        "active_ads": result.get("active_ads"),
+        "monthly_revenue": estimates.get("monthly_revenue"),
+        "traffic": (estimates.get("traffic_daily") or 0) * 30,
+        "pixels": ",".join(pixels) or None,
+    }
+    if market_share:
+        store["country"] = market_share[0]["country"]
+    products = [
+        {
+            "store_url": result["url"],
+            "title": p.get("title"),
+            "handle": p.get("handle"),
+            "price": p.get("price"),
+            "image_url": p.get("image"),
+        }
+        for p in result.get("products", []) if p.get("handle")
+    ]
+    return {k: v for k, v in store.items() if v is not None}, products
+
+# --- Loader ---
+
+def _coerce(column, value):
+    if value is None or value == "":
+        return None
+    if isinstance(column.type, Boolean):
+        return value if isinstance(value, bool) else str(value).strip().lower() in TRUE_VALUES
+    if isinstance(column.type, Integer):
+        return int(float(value))
+    if isinstance(column.type, Float):
+        return float(value)
+    if isinstance(column.type, DateTime) and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+def _default(column):
+    default = column.default
+    if default is None:
+        return None
+    return default.arg(None) if default.is_callable else default.arg
+
+class BulkIngestor:
+    def __init__(self, engine=None, batch_size: int = BULK_INGEST_BATCH_SIZE):
+        self.engine = engine or default_engine
+        self.batch_size = batch_size
+        self.dialect = self.engine.dialect.name
+        self.use_copy = self.dialect == "postgresql" and self.engine.dialect.driver == "psycopg2"
+        self._store_ids = {} # canonical_domain -> id
+        self._domains = {} # store_url -> canonical_domain (products repeat their store's url)
+
+    # --- Public API ---
+
+    def ingest_stores(self, records) -> IngestStats:
+        stats = IngestStats("stores")
+        for batch in self._batches(records):
+            rows = {}
+            for record in batch:
+                row = self._normalize(GlobalStore, record)
+                domain = canonical_domain(row.get("url") or "")
+                if not domain:
+                    stats.skipped += 1
+                    continue
+                row["canonical_domain"] = domain
+                rows[domain] = (row, self._present(GlobalStore, record) | {"canonical_domain"}) # last record for a domain wins
+            self._upsert_grouped(GlobalStore, list(rows.values()), STORE_CONFLICT)
+            self._remember_store_ids(list(rows))
+            stats.add(len(rows))
+        stats.seconds = time.perf_counter() - stats.started
+        return stats
+
+    def ingest_products(self, records) -> IngestStats:
+        """
+        Product records carry store_id, or store_url resolved to the store's id.
+        Products of unknown stores are skipped.
+        """
+        stats = IngestStats("products")
+        for batch in self._batches(records):
+            self._resolve_store_ids(r.get("store_url") for r in batch if not r.get("store_id"))
+            rows = {}
+            for record in batch:
+                row = self._normalize(GlobalProduct, record)
+                if row.get("store_id") is None:
+                    row["store_id"] = self._store_ids.get(self._domain(record.get("store_url")))
+                if row.get("store_id") is None or not row.get("handle"):
+                    stats.skipped += 1
+                    continue
+                rows[(row["store_id"], row["handle"])] = (row, self._present(GlobalProduct, record))
+            self._upsert_grouped(GlobalProduct, list(rows.values()), PRODUCT_CONFLICT)
+            stats.add(len(rows))
+        stats.seconds = time.perf_counter() - stats.started
+        return stats
+
+    def ingest_scan_results(self, results) -> tuple:
+        stores, products = [], []
+        for result in results:
+            if result.get("error") and not result.get("count"):
+                continue
+            store, store_products = scan_result_records(result)
+            stores.append(store)
+            products.extend(store_products)
+        return self.ingest_stores(stores), self.ingest_products(products)
+
+    def finish(self):
+        """
+        Core writes bypass the ORM hooks: drop cached search responses and
+        rebuild the leaderboards once the load is done.
+        """
+        from app.services.response_cache import response_cache
+        from app.services.leaderboards import refresh_leaderboards
+        response_cache.invalidate()
+        refresh_leaderboards(self.engine)
+
+    # --- Internals ---
+
+    def _batches(self, records):
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _normalize(self, model, record: dict) -> dict:
+        row = {}
+        for column in model.__table__.columns:
+            if column.name == "id":
+                continue
+            if column.name in record:
+                row[column.name] = _coerce(column, record[column.name])
+            else:
+                row[column.name] = _default(column)
+        return row
+
+    def _present(self, model, record: dict) -> frozenset:
+        """
+        Columns the record actually supplied; only these are overwritten on conflict,
+        so a partial record doesn't reset the other columns to their defaults.
+        """
+        names = set(model.__table__.columns.keys()) - {"id"}
+        return frozenset(names & record.keys())
+
+    def _upsert_grouped(self, model, rows: list, conflict: tuple):
+        """
+        rows are (row, present) pairs. Records supplying different columns are
+        upserted separately, so each one only updates the columns it supplied.
+        """
+        groups = {}
+        for row, present in rows:
+            groups.setdefault(present, []).append(row)
+        for present, group in groups.items():
+            self._upsert(model, group, conflict, present)
+
+    def _upsert(self, model, rows: list, conflict: tuple, present: set):
+        if not rows:
+            return
+        table = model.__table__
+        columns = list(rows[0])
+        update = [c for c in columns if c in present and c not in conflict]
+        with self.engine.begin() as conn:
+            if self.use_copy:
+                self._copy_upsert(conn, table, rows, columns, conflict, update)
+                return
+            if self.dialect == "postgresql":
+                stmt = postgresql.insert(table)
+            elif self.dialect == "sqlite":
+                stmt = sqlite.insert(table)
+            else:
+                conn.execute(insert(table), rows)
+                return
+            if update:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=list(conflict),
+                    set_={c: stmt.excluded[c] for c in update}
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict))
+            conn.execute(stmt, rows)
+
+    def _copy_upsert(self, conn, table, rows: list, columns: list, conflict: tuple, update: list):
+        """
+        COPY the batch into a transaction-scoped staging table, then upsert from it.
+        """
+        staging = f"ingest_{table.name}"
+        cols = ", ".join(columns)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if row[c] is None else row[c] for c in columns])
+        buffer.seek(0)
+
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {cols} FROM {table.name} WITH NO DATA")
+            cursor.copy_expert(f"COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv)", buffer)
+            if update:
+                action = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in update)
+            else:
+                action = "DO NOTHING"
+            cursor.execute(
+                f"INSERT INTO {table.name} ({cols}) SELECT {cols} FROM {staging} "
+                f"ON CONFLICT ({', '.join(conflict)}) {action}"
+            )
+        finally:
+            cursor.close()
+
+    def _remember_store_ids(self, domains: list):
+        with self.engine.connect() as conn:
+            for store_id, domain in conn.execute(
+                select(GlobalStore.id, GlobalStore.canonical_domain).where(GlobalStore.canonical_domain.in_(domains))
+            ):
+                self._store_ids[domain] = store_id
+
+    def _domain(self, url: str) -> str:
+        if not url:
+            return ""
+        domain = self._domains.get(url)
+        if domain is None:
+            if len(self._domains) >= 100000:
+                self._domains.clear()
+            domain = self._domains[url] = canonical_domain(url)
+        return domain
+
+    def _resolve_store_ids(self, urls):
+        missing = {self._domain(u) for u in urls} - set(self._store_ids) - {""}
+        if missing:
+            self._remember_store_ids(list(missing))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", help="CSV / NDJSON of GlobalStore records (url required)")
+    parser.add_argument("--products", help="CSV / NDJSON of GlobalProduct records (store_id or store_url, handle required)")
+    parser.add_argument("--scan-results", help="NDJSON of /api/analysis/scan results")
+    parser.add_argument("--batch-size", type=int, default=BULK_INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    ingestor = BulkIngestor(batch_size=args.batch_size)
+    if args.stores:
+        print(ingestor.ingest_stores(read_records(args.stores)))
+    if args.products:
+        print(ingestor.ingest_products(read_records(args.products)))
+    if args.scan_results:
+        for stats in ingestor.ingest_scan_results(read_ndjson(args.scan_results)):
+            print(stats)
+    ingestor.finish()
+
+if __name__ == "__main__":
+    main()
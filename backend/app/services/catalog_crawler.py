@@ -0,0 +1,160 @@
+import asyncio
+import os
+from app.services.http_client import get_async_client
+from app.services.scan_cache import scan_cache
+
+# Shopify caps products.json at 250 items per page.
+PRODUCTS_PAGE_SIZE = 250
+# How many pages may be in flight at once for a single store.
+MAX_CONCURRENT_PAGES = int(os.getenv("SCAN_MAX_CONCURRENT_PAGES", "4"))
+# Hard stop so a misbehaving store can't keep us paging forever (100 pages = 25k products).
+MAX_CATALOG_PAGES = int(os.getenv("SCAN_MAX_CATALOG_PAGES", "100"))
+
+# Products kept from the head of each page (CatalogStats top_n is at most this)
+PAGE_HEAD = 5
+
+class CatalogPage:
+    """
+    What a scan keeps of one products.json page: its size, price sum and first
+    PAGE_HEAD products. This, not the parsed product list, is what the scan
+    cache holds, so a cached page costs a few hundred bytes.
+    """
+    __slots__ = ("count", "price_total", "priced_count", "head")
+
+    def __init__(self, products: list):
+        self.count = len(products)
+        self.price_total = 0.0
+        self.priced_count = 0
+        self.head = []
+
+        for p in products:
+            # Get price (first variant)
+            variants = p.get("variants", [])
+            price = 0
+            if variants:
+                price = float(variants[0].get("price", 0))
+                self.price_total += price
+                self.priced_count += 1
+
+            if len(self.head) < PAGE_HEAD:
+                images = p.get("images", [])
+                self.head.append({
+                    "id": p.get("id"),
+                    "title": p.get("title"),
+                    "price": price,
+                    "image": images[0].get("src") if images else "",
+                    "handle": p.get("handle")
+                })
+
+class CatalogStats:
+    """
+    Running aggregation over products.json pages.
+    Each page is folded in and dropped, so memory stays flat no matter the catalog size.
+    """
+    def __init__(self, top_n: int = 5):
+        self.top_n = top_n
+        self.count = 0
+        self.pages = 0
+        self.price_total = 0.0
+        self.priced_count = 0
+        self.top_products = []
+
+    def add_page(self, page: int, summary: CatalogPage):
+        self.pages += 1
+        self.count += summary.count
+        self.price_total += summary.price_total
+        self.priced_count += summary.priced_count
+
+        # Keep the head of the first page for the product list
+        # (copies: the page summary may be shared through the scan cache)
+        if page == 1:
+            self.top_products = [dict(p) for p in summary.head[:self.top_n]]
+
+    @property
+    def avg_price(self) -> float:
+        return self.price_total / self.priced_count if self.priced_count else 0.0
+
+class CatalogCrawler:
+    """
+    Walks /products.json?page=1..N with a bounded number of requests in flight.
+    Stops dispatching as soon as a page comes back short (end of catalog) or fails.
+    """
+    def __init__(self, client=None, concurrency: int = MAX_CONCURRENT_PAGES, max_pages: int = MAX_CATALOG_PAGES):
+        self.client = client or get_async_client()
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+
+    async def fetch_page(self, base_url: str, page: int):
+        """
+        Returns the CatalogPage for one page, or None if the page could not be read.
+        """
+        # Unchanged pages come back from the scan cache (or cost a 304)
+        return await scan_cache.fetch(
+            self.client, f"{base_url}/products.json", self.parse_page,
+            params={"limit": PRODUCTS_PAGE_SIZE, "page": page}
+        )
+
+    @staticmethod
+    def parse_page(res):
+        if res.status_code != 200:
+            return None
+        return CatalogPage(res.json().get("products", []))
+
+    async def crawl(self, base_url: str, on_page) -> int:
+        """
+        Streams every catalog page into on_page(page_number, CatalogPage), in
+        page order (a page fetched ahead of a slower lower one waits for it), so
+        the pages handed over are always 1..N without a gap.
+        Returns the number of the last page that belongs to the catalog; raises
+        RuntimeError when a failed page cut the catalog short (the pages before
+        it stay counted).
+        """
+        next_page = 1
+        last_page = self.max_pages
+        end = None # short page = end of catalog
+        failed = None # lowest page that could not be read
+        ready = {} # page -> CatalogPage, waiting for the pages before it
+        delivered = 0
+
+        def deliver():
+            nonlocal delivered
+            while delivered + 1 in ready and delivered + 1 <= last_page:
+                delivered += 1
+                summary = ready.pop(delivered)
+                if summary.count:
+                    on_page(delivered, summary)
+
+        async def worker():
+            nonlocal next_page, last_page, end, failed
+            while next_page <= last_page:
+                page = next_page
+                next_page += 1
+
+                try:
+                    summary = await self.fetch_page(base_url, page)
+                except Exception as e:
+                    print(f"Catalog page {page} error: {e}")
+                    summary = None
+
+                if summary is None:
+                    failed = page if failed is None else min(failed, page)
+                    last_page = min(last_page, page - 1)
+                    continue
+
+                if summary.count < PRODUCTS_PAGE_SIZE:
+                    # Short page = end of catalog, stop handing out higher pages
+                    end = page if end is None else min(end, page)
+                    last_page = min(last_page, page)
+
+                ready[page] = summary
+                deliver()
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        if failed is not None and failed > 1 and (end is None or end > failed):
+            raise RuntimeError(f"catalog page {failed} could not be read; counted pages 1-{failed - 1} only")
+        return last_page
+
+    async def collect_stats(self, base_url: str, top_n: int = 5) -> CatalogStats:
+        stats = CatalogStats(top_n=top_n)
+        await self.crawl(base_url, stats.add_page)
+        return stats
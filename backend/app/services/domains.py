@@ -0,0 +1,40 @@
+from urllib.parse import urlsplit
+
+# Shared URL -> domain normalizer. GlobalStore.canonical_domain is filled with
+# it, so every lookup that normalizes the same way hits the unique index.
+
+STRIP_PREFIXES = ("www.",)
+
+def canonical_domain(url: str) -> str:
+    """
+    "HTTPS://www.Shop.example.com:443/products/x?y=1" -> "shop.example.com".
+    Lowercases, drops scheme, credentials, port, path, query and a leading
+    "www.", and encodes internationalized names as punycode ("xn--...").
+    Returns "" when no host can be found.
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    if "://" not in url:
+        url = "//" + url.lstrip("/")
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+    host = host.strip().rstrip(".").lower()
+    for prefix in STRIP_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        # Labels the IDNA codec rejects (e.g. over-long); keep them as typed
+        pass
+    return host
+
+def parent_domains(domain: str) -> list:
+    """
+    "eu.shop.example.com" -> ["shop.example.com", "example.com"] (longest first).
+    """
+    labels = domain.split(".")
+    return [".".join(labels[i:]) for i in range(1, len(labels) - 1)]
@@ -0,0 +1,181 @@
+import codecs
+import re
+from html.parser import HTMLParser
+
+# Lightweight page metadata extraction for the scanners.
+# Scans only need <title>, <html lang>, a few <meta> tags, the first images
+# and some script signatures, so instead of building a full document tree the
+# page is tokenized incrementally and tokenizing stops as soon as </head> (and
+# the wanted images) have been seen. Pages whose <title> only turns up after
+# <body> (some Shopify themes, broken templates) are tokenized on until the
+# title is found or TITLE_SCAN_LIMIT characters have been read. Signatures (pixels, currency) are matched
+# in the same pass, slice by slice, without lowercasing a copy of the whole page.
+
+# Signature -> scan result flag
+PIXEL_SIGNATURES = {
+    "fbevents.js": "has_fb_pixel",
+    "fbq(": "has_fb_pixel",
+    "googletagmanager": "has_google_tag",
+    "gtag(": "has_google_tag",
+    "ttq.load": "has_tiktok_pixel",
+}
+PIXEL_FLAGS = sorted(set(PIXEL_SIGNATURES.values()))
+# Looking for: "currency":"GBP" or Shopify.currency = {"active":"GBP"}
+CURRENCY_RE = re.compile(r'"currency":"([A-Z]{3})"')
+# Enough characters to carry a signature split across two chunks
+SIGNATURE_OVERLAP = 32
+# Pixel signatures are case-insensitive; only this much text is lowercased at a time
+SIGNATURE_SLICE = 64 * 1024
+# Tokenizer input size, so it can stop close to </head>
+FEED_SLICE = 16 * 1024
+# How far past the head to look for a missing <title>
+TITLE_SCAN_LIMIT = 512 * 1024
+
+class PageMeta(HTMLParser):
+    """
+    Incremental metadata extractor. Call feed() with successive text chunks;
+    once `done` is set the rest of the document is only scanned for
+    signatures (when signatures=True), not tokenized.
+        title, lang      <title> text (outside <svg>) and <html lang>
+        meta             <meta property|name> -> content (lowercased names, first wins)
+        images           up to max_images distinct <img src> (srcs containing a
+                         skip_images fragment are ignored)
+        pixels, currency signature matches (signatures=True)
+    """
+    def __init__(self, max_images: int = 0, skip_images: tuple = (), signatures: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.max_images = max_images
+        self.skip_images = skip_images
+        self.signatures = signatures
+        self.title = None
+        self.lang = None
+        self.meta = {}
+        self.images = []
+        self.pixels = dict.fromkeys(PIXEL_FLAGS, False)
+        self.currency = None
+        self.head_done = False
+        self._in_title = False
+        self._title_parts = []
+        self._svg_depth = 0
+        self._fed = 0
+        self._tail = ""
+
+    @property
+    def head_final(self) -> bool:
+        """
+        Title and head <meta> tags won't change any more: the head is over and
+        either a title was found or the scan limit for one has been reached.
+        """
+        return self.head_done and (self.title is not None or self._fed >= TITLE_SCAN_LIMIT)
+
+    @property
+    def done(self) -> bool:
+        """
+        Nothing left to tokenize for.
+        """
+        return self.head_final and len(self.images) >= self.max_images
+
+    @property
+    def complete(self) -> bool:
+        """
+        Nothing left to read at all (tokenizing done, every signature found).
+        """
+        return self.done and (not self.signatures or (self.currency is not None and all(self.pixels.values())))
+
+    def feed(self, data: str):
+        if self.signatures:
+            self._scan_signatures(data)
+        for start in range(0, len(data), FEED_SLICE):
+            if self.done:
+                break
+            piece = data[start:start + FEED_SLICE]
+            self._fed += len(piece)
+            super().feed(piece)
+
+    def _scan_signatures(self, data: str):
+        text = self._tail + data
+        if self.currency is None:
+            match = CURRENCY_RE.search(text)
+            if match:
+                self.currency = match.group(1)
+        for start in range(0, len(text), SIGNATURE_SLICE):
+            missing = [s for s, flag in PIXEL_SIGNATURES.items() if not self.pixels[flag]]
+            if not missing:
+                break
+            piece = text[start:start + SIGNATURE_SLICE + SIGNATURE_OVERLAP].lower()
+            for signature in missing:
+                if signature in piece:
+                    self.pixels[PIXEL_SIGNATURES[signature]] = True
+        self._tail = text[-SIGNATURE_OVERLAP:]
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "html":
+            attrs = dict(attrs)
+            if self.lang is None and attrs.get("lang"):
+                self.lang = attrs["lang"]
+        elif tag == "title":
+            # An inline <svg><title> is an icon label, not the page title
+            self._in_title = self.title is None and not self._svg_depth
+        elif tag == "svg":
+            self._svg_depth += 1
+        elif tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            if name and attrs.get("content") is not None:
+                self.meta.setdefault(name, attrs["content"])
+        elif tag == "body":
+            # </head> is optional
+            self.head_done = True
+        elif tag == "img":
+            self._add_image(dict(attrs).get("src"))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag != "svg":
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = "".join(self._title_parts)
+        elif tag == "head":
+            self.head_done = True
+        elif tag == "svg" and self._svg_depth:
+            self._svg_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def _add_image(self, src: str):
+        if not src or len(self.images) >= self.max_images:
+            return
+        if any(fragment in src for fragment in self.skip_images) or src in self.images:
+            return
+        self.images.append(src)
+
+    def og(self, name: str) -> str:
+        return self.meta.get(f"og:{name}", "")
+
+def extract_meta(text: str, **options) -> PageMeta:
+    """
+    PageMeta for an already downloaded document.
+    """
+    page = PageMeta(**options)
+    page.feed(text)
+    return page
+
+async def stream_meta(response, page: PageMeta):
+    """
+    Feeds a streamed httpx response into page chunk by chunk, yielding the
+    number of body bytes read so far after each one (callers can react to
+    page.head_final mid-download). Stops reading once page.complete.
+    """
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        page.feed(decoder.decode(chunk))
+        yield size
+        if page.complete:
+            return
+    page.feed(decoder.decode(b"", final=True))
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import httpx
+
+# Shared outbound HTTP client.
+# One pooled AsyncClient per worker process so concurrent scans reuse
+# keep-alive connections instead of opening a fresh socket per request.
+# Every outbound call (stores, RapidAPI, Meta, Gemini/OpenAI) goes through it;
+# blocking `requests` calls inside async handlers would stall the event loop.
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Requests in flight to any single host, so one slow upstream can't take the whole pool
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+# HTTP/2 needs the optional `h2` package (httpx[http2]); without it we stay on HTTP/1.1 keep-alive
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+_client = None
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """
+    Response body that frees its host slot once the body is read or closed.
+    """
+    def __init__(self, stream, release):
+        self.stream = stream
+        self.release = release
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self.release()
+
+class _HostSlot:
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0 # requests holding or waiting for the semaphore
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Caps concurrent requests per host on top of the pool-wide limits
+    (httpx only has the global ones). Extra requests wait for a slot.
+    A host's semaphore is dropped once no request holds or waits for it.
+    """
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int = HTTP_MAX_PER_HOST):
+        self.transport = transport
+        self.max_per_host = max_per_host
+        self._slots = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = self._slots[host] = _HostSlot(self.max_per_host)
+        slot.users += 1
+        try:
+            await slot.semaphore.acquire()
+        except BaseException:
+            self._leave(host, slot)
+            raise
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                slot.semaphore.release()
+                self._leave(host, slot)
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    def _leave(self, host: str, slot: _HostSlot):
+        slot.users -= 1
+        if slot.users == 0 and self._slots.get(host) is slot:
+            del self._slots[host]
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+def create_async_client(transport: httpx.AsyncBaseTransport = None) -> httpx.AsyncClient:
+    """
+    A pooled AsyncClient with the shared limits and timeouts. transport
+    replaces the network transport (e.g. a stand-in for benchmarks); the
+    per-host limit is applied on top of it either way.
+    """
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            http2=HTTP2_ENABLED and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        follow_redirects=True,
+        transport=HostLimitedTransport(transport),
+    )
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide AsyncClient, creating it on first use.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_async_client()
+    return _client
+
+async def close_async_client():
+    """
+    Closes the shared client (called on app shutdown).
+    """
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
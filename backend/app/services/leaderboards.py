@@ -0,0 +1,424 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import asc, delete, desc, event, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+from app.models import GlobalStore, GlobalProduct, LeaderboardSlice, LeaderboardEntry
+from app.services.response_cache import response_cache
+
+# Precomputed top-N rankings per niche x country x preset x sort key.
+# Searches whose filters are only niche/country/preset/sort read the page's ids
+# by rank instead of sorting the filtered table; everything else (keywords,
+# ranges, cursors, pages past the top N) uses the live query.
+LEADERBOARDS_ENABLED = os.getenv("LEADERBOARDS_ENABLED", "true").lower() == "true"
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+# Seconds between a commit and the background refresh of the slices it touched,
+# so a burst of writes shares one refresh and writers never wait for it
+LEADERBOARD_REFRESH_DELAY = float(os.getenv("LEADERBOARD_REFRESH_DELAY", "2"))
+ALL = "*"
+
+# Set by ensure_leaderboards(); until then searches use the live query.
+LEADERBOARDS_READY = False
+
+LeaderboardPage = namedtuple("LeaderboardPage", ["ids", "total"])
+
+# Filter fields a slice can answer; any other field set means "live query".
+SLICE_FIELDS = {"niche", "country", "preset", "sort_by"}
+
+# Columns whose change can move a row within or between slices
+PRODUCT_RANK_COLUMNS = ("store_id", "revenue_est", "ads_count", "price", "created_at", "is_winner", "is_new")
+STORE_RANK_COLUMNS = ("niche", "country", "monthly_revenue", "traffic", "active_ads", "creation_date")
+
+def _specs() -> dict:
+    # Sort keys and presets belong to the routers (imported here, not at the
+    # top, because the routers import this module)
+    from app.routers import products, stores
+    return {
+        "products": {
+            "model": GlobalProduct,
+            "sorts": products.SORT_COLUMNS,
+            "default_sort": "created_at",
+            "presets": products.PRESET_FILTERS,
+        },
+        "stores": {
+            "model": GlobalStore,
+            "sorts": {key: (col, True) for key, col in stores.SORT_COLUMNS.items()},
+            "default_sort": None, # unknown sorts fall back to id order
+            "presets": {},
+        },
+    }
+
+def _slice_where(table, kind: str, key: tuple) -> tuple:
+    niche, country, preset, sort_key = key
+    return (
+        table.kind == kind, table.niche == niche, table.country == country,
+        table.preset == preset, table.sort_key == sort_key,
+    )
+
+# --- Serving ---
+
+def slice_for(kind: str, filters):
+    """
+    (niche, country, preset, sort_key) of the slice that answers this filter
+    set, or None when it needs the live query.
+    """
+    spec = _specs()[kind]
+    values = filters.model_dump()
+    if any(v not in (None, "") for k, v in values.items() if k not in SLICE_FIELDS):
+        return None
+    niche, country = values.get("niche") or ALL, values.get("country") or ALL
+    if ALL in (values.get("niche"), values.get("country")):
+        return None
+    sort_key = values.get("sort_by")
+    if sort_key not in spec["sorts"]:
+        sort_key = spec["default_sort"]
+        if sort_key is None:
+            return None
+    # Unknown presets apply no filter in the search either
+    preset = values.get("preset") if values.get("preset") in spec["presets"] else ALL
+    return niche, country, preset, sort_key
+
+async def leaderboard_page(db, kind: str, filters, page: int, limit: int):
+    """
+    Ids (in rank order) and slice total for an offset page, or None when the
+    page isn't covered by a precomputed slice.
+    """
+    if not (LEADERBOARDS_ENABLED and LEADERBOARDS_READY) or page < 1 or page * limit > LEADERBOARD_SIZE:
+        return None
+    key = slice_for(kind, filters)
+    if key is None:
+        return None
+
+    total = await db.scalar(select(LeaderboardSlice.total).where(*_slice_where(LeaderboardSlice, kind, key)))
+    if total is None:
+        return None
+    offset = (page - 1) * limit
+    ids = (await db.scalars(
+        select(LeaderboardEntry.entity_id)
+        .where(*_slice_where(LeaderboardEntry, kind, key))
+        .where(LeaderboardEntry.rank > offset, LeaderboardEntry.rank <= offset + limit)
+        .order_by(LeaderboardEntry.rank)
+    )).all()
+    return LeaderboardPage(list(ids), total)
+
+def order_by_ids(rows: list, ids: list, key=lambda row: row.id) -> list:
+    """
+    Puts rows fetched with id IN (...) back into leaderboard order.
+    """
+    by_id = {key(row): row for row in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+# --- Refreshing ---
+# A full rebuild walks each (preset, sort key) ordering once and deals rows out
+# to every niche x country slice (and its "*" rollups) they belong to, stopping
+# as soon as each slice has its top N. Totals come from one GROUP BY per preset.
+# An incremental refresh gives each stale (niche, country) slice its own
+# filtered count and LIMIT N query, then derives the "*" rollups from the
+# stored per-pair slices.
+
+def _rollups(niche, country) -> list:
+    niches = (niche, ALL) if niche else (ALL,)
+    countries = (country, ALL) if country else (ALL,)
+    return [(n, c) for n in niches for c in countries]
+
+def _scoped(spec: dict, preset: str, *columns):
+    query = select(*columns).select_from(spec["model"])
+    if spec["model"] is GlobalProduct:
+        query = query.join(GlobalStore, GlobalProduct.store_id == GlobalStore.id)
+    if preset != ALL:
+        query = query.where(spec["presets"][preset])
+    return query
+
+def _slice_totals(db, spec: dict, preset: str, targets: set) -> dict:
+    totals = dict.fromkeys(targets, 0)
+    rows = db.execute(
+        _scoped(spec, preset, GlobalStore.niche, GlobalStore.country, func.count())
+        .group_by(GlobalStore.niche, GlobalStore.country)
+    )
+    for niche, country, count in rows:
+        for key in _rollups(niche, country):
+            if key in totals:
+                totals[key] += count
+    return totals
+
+def _key_filters(niche: str, country: str) -> list:
+    filters = []
+    if niche != ALL:
+        filters.append(GlobalStore.niche == niche)
+    if country != ALL:
+        filters.append(GlobalStore.country == country)
+    return filters
+
+def _scoped_totals(db, spec: dict, preset: str, targets: set) -> dict:
+    return {key: db.scalar(_scoped(spec, preset, func.count()).where(*_key_filters(*key))) for key in targets}
+
+def _scoped_top(db, ordered, targets: set, totals: dict) -> dict:
+    return {
+        key: list(db.scalars(ordered.where(*_key_filters(*key)).limit(LEADERBOARD_SIZE))) if totals[key] else []
+        for key in targets
+    }
+
+def _collect_top(db, ordered, targets: set, totals: dict) -> dict:
+    want = {key: min(LEADERBOARD_SIZE, totals[key]) for key in targets}
+    top = {key: [] for key in targets}
+    pending = sum(1 for n in want.values() if n)
+    if not pending:
+        return top
+    result = db.execute(ordered.execution_options(yield_per=2000))
+    try:
+        for entity_id, niche, country in result:
+            for key in _rollups(niche, country):
+                ids = top.get(key)
+                if ids is not None and len(ids) < want[key]:
+                    ids.append(entity_id)
+                    if len(ids) == want[key]:
+                        pending -= 1
+            if not pending:
+                break
+    finally:
+        result.close()
+    return top
+
+def _concrete(table, niche: str, country: str) -> list:
+    # Per-pair slices (no "*") that a rollup slice is made of
+    filters = [table.niche != ALL, table.country != ALL]
+    if niche != ALL:
+        filters.append(table.niche == niche)
+    if country != ALL:
+        filters.append(table.country == country)
+    return filters
+
+def _derived_totals(db, kind: str, preset: str, sort_key: str, keys: set) -> dict:
+    return {
+        key: db.scalar(
+            select(func.coalesce(func.sum(LeaderboardSlice.total), 0))
+            .where(LeaderboardSlice.kind == kind, LeaderboardSlice.preset == preset, LeaderboardSlice.sort_key == sort_key)
+            .where(*_concrete(LeaderboardSlice, *key))
+        )
+        for key in keys
+    }
+
+def _derived_top(db, kind: str, model, preset: str, sort_key: str, order: tuple, keys: set, totals: dict) -> dict:
+    # A rollup's top N is within the union of its pairs' top N lists; re-rank those ids
+    top = {}
+    for key in keys:
+        candidates = (
+            select(LeaderboardEntry.entity_id)
+            .where(LeaderboardEntry.kind == kind, LeaderboardEntry.preset == preset, LeaderboardEntry.sort_key == sort_key)
+            .where(*_concrete(LeaderboardEntry, *key))
+        )
+        top[key] = list(db.scalars(
+            select(model.id).where(model.id.in_(candidates)).order_by(*order).limit(LEADERBOARD_SIZE)
+        )) if totals[key] else []
+    return top
+
+def _has_unfiled_stores(db) -> bool:
+    # Stores without a niche/country only count towards "*" rollups
+    return db.scalar(
+        select(GlobalStore.id).where(or_(GlobalStore.niche.is_(None), GlobalStore.country.is_(None))).limit(1)
+    ) is not None
+
+def _write_slices(db, kind: str, preset: str, sort_key: str, totals: dict, top: dict) -> int:
+    entries, slices = [], []
+    for niche, country in totals:
+        key = (niche, country, preset, sort_key)
+        db.execute(delete(LeaderboardEntry).where(*_slice_where(LeaderboardEntry, kind, key)))
+        db.execute(delete(LeaderboardSlice).where(*_slice_where(LeaderboardSlice, kind, key)))
+        fields = {"kind": kind, "niche": niche, "country": country, "preset": preset, "sort_key": sort_key}
+        entries.extend({**fields, "rank": rank, "entity_id": entity_id} for rank, entity_id in enumerate(top[(niche, country)], 1))
+        slices.append({**fields, "total": totals[(niche, country)], "refreshed_at": datetime.utcnow()})
+    if entries:
+        db.execute(insert(LeaderboardEntry), entries)
+    if slices:
+        db.execute(insert(LeaderboardSlice), slices)
+    return len(slices)
+
+def _refresh_kind(db, kind: str, spec: dict, targets: set, scoped: bool = False) -> int:
+    model = spec["model"]
+    refreshed = 0
+    # Incremental: the stale pairs are queried directly and their "*" rollups
+    # rebuilt from the stored per-pair slices, so nothing scans the whole table.
+    # Unfiled stores have no per-pair slice; with any of those rollups are queried too.
+    derive = scoped and not _has_unfiled_stores(db)
+    direct = {key for key in targets if ALL not in key} if derive else targets
+    rollups = targets - direct
+    for preset in (ALL, *spec["presets"]):
+        totals = (_scoped_totals if scoped else _slice_totals)(db, spec, preset, direct)
+        for sort_key, (col, descending) in spec["sorts"].items():
+            # Same order (and id tie-break) as the search endpoint
+            direction = desc if descending else asc
+            order = (direction(col).nulls_last(), direction(model.id))
+            if scoped:
+                top = _scoped_top(db, _scoped(spec, preset, model.id).order_by(*order), direct, totals)
+            else:
+                ordered = _scoped(spec, preset, model.id, GlobalStore.niche, GlobalStore.country)
+                top = _collect_top(db, ordered.order_by(*order), direct, totals)
+            refreshed += _write_slices(db, kind, preset, sort_key, totals, top)
+
+            if rollups:
+                rolled = _derived_totals(db, kind, preset, sort_key, rollups)
+                rolled_top = _derived_top(db, kind, model, preset, sort_key, order, rollups, rolled)
+                refreshed += _write_slices(db, kind, preset, sort_key, rolled, rolled_top)
+    return refreshed
+
+def refresh_leaderboards(bind, stale: dict = None):
+    """
+    Recomputes leaderboard slices. stale maps kind -> {(niche, country), ...}
+    and refreshes only the slices containing those pairs (plus their "*"
+    rollups); None rebuilds everything.
+    """
+    start = time.perf_counter()
+    specs = _specs()
+    refreshed = 0
+    scoped = stale is not None
+    with Session(bind=bind) as db:
+        if stale is None:
+            pairs = set(db.execute(select(GlobalStore.niche, GlobalStore.country).distinct()).all())
+            stale = {kind: pairs for kind in specs}
+            # Slices for niches/countries that no longer exist go too
+            db.execute(delete(LeaderboardEntry))
+            db.execute(delete(LeaderboardSlice))
+
+        for kind, pairs in stale.items():
+            targets = {key for niche, country in pairs for key in _rollups(niche, country)}
+            if targets:
+                refreshed += _refresh_kind(db, kind, specs[kind], targets, scoped)
+        db.commit()
+
+    # Searches served before the refresh may have been cached
+    response_cache.invalidate()
+    print(f"Leaderboards: refreshed {refreshed} slices in {time.perf_counter() - start:.2f}s")
+
+def ensure_leaderboards(engine):
+    """
+    Enables leaderboard serving once its tables exist, building every slice
+    on first run. Safe to call on every startup.
+    """
+    global LEADERBOARDS_READY
+    if not LEADERBOARDS_ENABLED or "leaderboard_slices" not in inspect(engine).get_table_names():
+        print("Leaderboards skipped: disabled or tables not created yet.")
+        LEADERBOARDS_READY = False
+        return
+    with Session(bind=engine) as db:
+        empty = db.scalar(select(LeaderboardSlice.id).limit(1)) is None
+    if empty:
+        refresh_leaderboards(engine)
+    LEADERBOARDS_READY = True
+
+# --- Incremental refresh on ORM writes ---
+# after_flush records which (niche, country) pairs a transaction touched;
+# after_commit queues them and a background thread refreshes just those slices
+# LEADERBOARD_REFRESH_DELAY seconds later. Core bulk writes bypass the ORM and
+# must call refresh_leaderboards() themselves.
+
+class RefreshQueue:
+    """
+    Stale slices from committed transactions, per bind, merged until the
+    debounce timer fires. A None entry means "rebuild everything".
+    """
+    def __init__(self, delay: float = LEADERBOARD_REFRESH_DELAY):
+        self.delay = delay
+        self._lock = threading.Lock()
+        # One refresh at a time (they write the same tables)
+        self._refresh_lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def add(self, bind, stale: dict = None):
+        with self._lock:
+            if bind not in self._pending:
+                self._pending[bind] = None if stale is None else {kind: set(pairs) for kind, pairs in stale.items()}
+            elif stale is None or self._pending[bind] is None:
+                self._pending[bind] = None
+            else:
+                for kind, pairs in stale.items():
+                    self._pending[bind].setdefault(kind, set()).update(pairs)
+            if self._timer is None:
+                # Not a daemon: a script that commits and exits still gets its refresh
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.start()
+
+    def flush(self):
+        """
+        Runs every pending refresh now (also called by the timer).
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        with self._refresh_lock:
+            for bind, stale in pending.items():
+                try:
+                    refresh_leaderboards(bind, stale)
+                except Exception as e:
+                    # The next refresh or startup rebuild catches up
+                    print(f"Leaderboard refresh failed: {e}")
+
+refresh_queue = RefreshQueue()
+
+def _history(obj, attr: str) -> set:
+    hist = inspect(obj).attrs[attr].history
+    return {v for v in (*hist.added, *hist.unchanged, *hist.deleted)}
+
+def _changed(obj, columns: tuple) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[c].history.has_changes() for c in columns)
+
+def _pairs(obj) -> set:
+    niches = _history(obj, "niche") or {None}
+    countries = _history(obj, "country") or {None}
+    return {(n, c) for n in niches for c in countries}
+
+@event.listens_for(Session, "after_flush")
+def _collect_stale_slices(session, flush_context):
+    stale = {"products": set(), "stores": set()}
+    store_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        is_dirty = obj not in session.new and obj not in session.deleted
+        if isinstance(obj, GlobalStore):
+            if is_dirty and not _changed(obj, STORE_RANK_COLUMNS):
+                continue
+            pairs = _pairs(obj)
+            stale["stores"].update(pairs)
+            # Product slices only move when a store appears, goes or changes niche/country
+            if not is_dirty or _changed(obj, ("niche", "country")):
+                stale["products"].update(pairs)
+        elif isinstance(obj, GlobalProduct):
+            if is_dirty and not _changed(obj, PRODUCT_RANK_COLUMNS):
+                continue
+            store_ids.update(i for i in _history(obj, "store_id") if i is not None)
+
+    if store_ids:
+        stale["products"].update(session.execute(
+            select(GlobalStore.niche, GlobalStore.country).where(GlobalStore.id.in_(store_ids))
+        ).all())
+
+    if stale["products"] or stale["stores"]:
+        pending = session.info.setdefault("leaderboard_stale", {"products": set(), "stores": set()})
+        for kind, pairs in stale.items():
+            pending[kind].update(pairs)
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    # query(...).update()/delete() and ORM bulk statements: affected rows unknown
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, (GlobalStore, GlobalProduct)):
+            orm_execute_state.session.info["leaderboard_rebuild"] = True
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    rebuild = session.info.pop("leaderboard_rebuild", False)
+    stale = session.info.pop("leaderboard_stale", None)
+    if not LEADERBOARDS_ENABLED or not (rebuild or stale):
+        return
+    # Never make the writer wait for (or fail on) the refresh
+    refresh_queue.add(session.get_bind(), None if rebuild else stale)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("leaderboard_stale", None)
+    session.info.pop("leaderboard_rebuild", None)
@@ -0,0 +1,22 @@
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+# Newline-delimited JSON streams (same framing as /stream-sales): one event
+# object per line, flushed as soon as it is produced.
+
+async def ndjson_lines(events):
+    async for event in events:
+        yield json.dumps(jsonable_encoder(event)) + "\n"
+
+def ndjson_response(events) -> StreamingResponse:
+    """
+    Streams an async iterator of dicts. When the client disconnects the
+    iterator is closed, so its cleanup (e.g. cancelling scan stages) runs.
+    """
+    return StreamingResponse(
+        ndjson_lines(events),
+        media_type="application/x-ndjson",
+        # Stop nginx from buffering the stream into one response
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
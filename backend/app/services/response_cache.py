@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import GlobalStore, GlobalProduct
+
+# Read-through cache for search / analysis responses.
+#   memory -> per-process TTL + LRU dict (default)
+#   redis  -> shared between workers and the seeder (needs `redis` and REDIS_URL)
+#   off    -> disabled
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Writes to these models make every cached response stale
+# (product results embed store columns and store results embed a best product).
+CACHED_MODELS = (GlobalStore, GlobalProduct)
+
+class MemoryBackend:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # invalidate() runs from sync session hooks, possibly on threadpool threads
+        self._lock = threading.Lock()
+
+    async def get(self, key: str):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            if hit[1] <= time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return hit[0]
+
+    async def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+class RedisBackend:
+    """
+    Redis (or any Redis-protocol server) backend. Values are stored as JSON with
+    a TTL; Redis' own maxmemory policy handles eviction.
+    """
+    def __init__(self, url: str, ttl: float):
+        import redis
+        import redis.asyncio as redis_async
+        self.ttl = max(1, int(ttl))
+        self.client = redis_async.from_url(url)
+        # Invalidation runs from sync code (session hooks, seeders)
+        self.sync_client = redis.from_url(url)
+
+    async def get(self, key: str):
+        raw = await self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value):
+        await self.client.set(key, json.dumps(jsonable_encoder(value)), ex=self.ttl)
+
+    def invalidate(self, prefix: str):
+        keys = list(self.sync_client.scan_iter(match=prefix + "*", count=500))
+        if keys:
+            self.sync_client.delete(*keys)
+
+class ResponseCache:
+    """
+    Caches whole endpoint responses keyed by namespace + normalized filters +
+    page/cursor. Invalidated when GlobalStore/GlobalProduct rows are committed.
+    With the memory backend only the current process is invalidated; other
+    workers serve at most RESPONSE_CACHE_TTL seconds of stale data.
+    """
+    def __init__(self, backend: str = RESPONSE_CACHE_BACKEND, ttl: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, prefix: str = "respcache:"):
+        self.prefix = prefix
+        self.backend = None
+        self._listeners = []
+        if backend == "redis":
+            try:
+                self.backend = RedisBackend(REDIS_URL, ttl)
+            except ImportError:
+                print("Response cache: redis not installed, using in-process cache.")
+        if self.backend is None and backend != "off":
+            self.backend = MemoryBackend(ttl, max_entries)
+
+    def key_for(self, namespace: str, filters=None, **params) -> str:
+        """
+        Stable key: unset filters are dropped and strings trimmed, so
+        {"keyword": " Lamp "} and {"keyword": "Lamp", "niche": None} share an entry.
+        """
+        values = filters.model_dump() if filters is not None else {}
+        values.update(params)
+        normalized = {
+            k: v.strip() if isinstance(v, str) else v
+            for k, v in values.items() if v is not None and v != ""
+        }
+        if isinstance(normalized.get("keyword"), str):
+            normalized["keyword"] = normalized["keyword"].lower()
+        return f"{self.prefix}{namespace}:" + json.dumps(normalized, sort_keys=True, default=str)
+
+    async def get(self, key: str):
+        if self.backend is None:
+            return None
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            print(f"Response cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, value):
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            print(f"Response cache write failed: {e}")
+
+    def on_invalidate(self, callback):
+        """
+        Registers a callable run on every invalidation (e.g. CountCache.clear).
+        """
+        self._listeners.append(callback)
+
+    def invalidate(self, namespace: str = None):
+        """
+        Drops cached responses for one namespace, or all of them.
+        """
+        prefix = self.prefix + (f"{namespace}:" if namespace else "")
+        if self.backend is not None:
+            try:
+                self.backend.invalidate(prefix)
+            except Exception as e:
+                print(f"Response cache invalidation failed: {e}")
+        for callback in self._listeners:
+            callback()
+
+response_cache = ResponseCache()
+
+# --- Invalidation on ORM writes ---
+# after_flush notes that a session touched a cached model; the cache is
+# cleared once that transaction commits. Core bulk inserts bypass the ORM and
+# must call response_cache.invalidate() themselves.
+
+@event.listens_for(Session, "after_flush")
+def _mark_catalog_write(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, CACHED_MODELS):
+            session.info["response_cache_stale"] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("response_cache_stale", False):
+        response_cache.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("response_cache_stale", None)
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    # session.query(...).delete()/update() and ORM-enabled insert()/update()
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, CACHED_MODELS):
+            orm_execute_state.session.info["response_cache_stale"] = True
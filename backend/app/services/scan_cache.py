@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode, urlsplit
+from app.services.domains import canonical_domain
+
+# Parsed results of store pages (homepage, products.json pages, product pages),
+# keyed by scheme + canonical domain + port + path, so the same competitor scanned by many users
+# is downloaded and parsed once per TTL. Past the TTL an entry is revalidated
+# with a conditional GET (If-None-Match / If-Modified-Since): a 304 renews it
+# without re-parsing. Eviction is least-recently-used, bounded by the memory
+# held by the cached values (not by response bytes: parse functions keep a small
+# projection of each page, e.g. catalog_crawler.CatalogPage).
+SCAN_CACHE_TTL = float(os.getenv("SCAN_CACHE_TTL", "900"))
+# How long an expired entry with an ETag / Last-Modified is kept for revalidation
+SCAN_CACHE_STALE_TTL = float(os.getenv("SCAN_CACHE_STALE_TTL", "86400"))
+SCAN_CACHE_MAX_BYTES = int(os.getenv("SCAN_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 0 disables
+# Ports left out of cache keys
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def object_size(value) -> int:
+    """
+    Approximate memory held by a cached value: the object plus everything it
+    references through dicts, lists, tuples, sets and __slots__ / __dict__.
+    """
+    size = 0
+    seen = set()
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__slots__"):
+            stack.extend(getattr(obj, name, None) for name in obj.__slots__)
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+    return size
+
+class ScanCacheEntry:
+    __slots__ = ("value", "etag", "last_modified", "size", "expires_at", "stored_at")
+
+    def __init__(self, value, etag: str, last_modified: str, size: int, ttl: float):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.monotonic()
+
+class ScanCache:
+    def __init__(self, ttl: float = SCAN_CACHE_TTL, max_bytes: int = SCAN_CACHE_MAX_BYTES,
+                 stale_ttl: float = SCAN_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        """
+        "https://www.Shop.com/products.json" + {"page": 2} -> "https://shop.com/products.json?page=2".
+        Scheme and non-default port are kept: "http://shop.com:8080" is a different server.
+        """
+        parts = urlsplit(url if "://" in url else "https://" + url)
+        scheme = parts.scheme.lower()
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        netloc = canonical_domain(url)
+        if port and port != DEFAULT_PORTS.get(scheme):
+            netloc += f":{port}"
+        query = parts.query
+        if params:
+            query = "&".join(q for q in (query, urlencode(sorted(params.items()))) if q)
+        return f"{scheme}://{netloc}{parts.path or '/'}" + (f"?{query}" if query else "")
+
+    def lookup(self, key: str):
+        """
+        The entry for key (fresh or revalidatable), or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.fresh:
+            can_revalidate = entry.etag or entry.last_modified
+            if not can_revalidate or entry.expires_at + self.stale_ttl <= time.monotonic():
+                self._drop(key)
+                return None
+        self._entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def validators(entry) -> dict:
+        """
+        Conditional request headers for a stale entry ({} when there is none).
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, key: str, response, value):
+        """
+        Caches the parsed value of a 200 response (unless it says no-store),
+        counted at its in-memory size.
+        """
+        if response.status_code != 200 or "no-store" in response.headers.get("cache-control", ""):
+            return
+        size = object_size(value)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = ScanCacheEntry(
+            value, response.headers.get("etag"), response.headers.get("last-modified"), size, self.ttl
+        )
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def renew(self, entry, response):
+        """
+        A 304 for entry: fresh for another TTL, with any updated validators.
+        """
+        entry.expires_at = time.monotonic() + self.ttl
+        entry.etag = response.headers.get("etag", entry.etag)
+        entry.last_modified = response.headers.get("last-modified", entry.last_modified)
+        self.revalidated += 1
+
+    async def fetch(self, client, url: str, parse, headers: dict = None, params: dict = None):
+        """
+        parse(response) for url, served from cache while fresh and revalidated
+        once stale. Only 200 responses are stored; anything else is parsed
+        (so parse decides how errors surface) and not cached.
+        """
+        key = self.key(url, params)
+        entry = self.lookup(key)
+        if entry is not None and entry.fresh:
+            self.hits += 1
+            return entry.value
+
+        res = await client.get(url, headers={**(headers or {}), **self.validators(entry)}, params=params)
+        if res.status_code == 304 and entry is not None:
+            self.renew(entry, res)
+            return entry.value
+
+        self.misses += 1
+        value = parse(res)
+        self.store(key, res, value)
+        return value
+
+    def invalidate_domain(self, url: str):
+        # Every scheme / port of the domain
+        domain = canonical_domain(url)
+        for key in [k for k in self._entries if k.split("://", 1)[-1].split("/", 1)[0].split(":")[0] == domain]:
+            self._drop(key)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries), "bytes": self.bytes, "hits": self.hits,
+            "revalidated": self.revalidated, "misses": self.misses,
+        }
+
+scan_cache = ScanCache()
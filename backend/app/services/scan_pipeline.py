@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+from collections import namedtuple
+from app.routers.ads import fetch_real_time_ads, DEFAULT_AD_COUNTRIES
+from app.services.catalog_crawler import CatalogStats
+from app.services.domains import canonical_domain
+from app.services.store_scanner import StoreScanner
+
+# Full store scan for /api/analysis/scan. The homepage fetch, the catalog crawl
+# and the ad-library lookup run at the same time, each under its own timeout,
+# so a scan takes as long as its slowest stage rather than the sum of all three.
+# A failed or timed-out stage leaves its fields at their defaults (a cut-short
+# catalog keeps the pages it got) and the scan is marked partial.
+SCAN_HOMEPAGE_TIMEOUT = float(os.getenv("SCAN_HOMEPAGE_TIMEOUT", "8"))
+SCAN_CATALOG_TIMEOUT = float(os.getenv("SCAN_CATALOG_TIMEOUT", "20"))
+SCAN_ADS_TIMEOUT = float(os.getenv("SCAN_ADS_TIMEOUT", "8"))
+
+# Start with assumption: Currency = Primary Market
+CURRENCY_COUNTRIES = {"USD": "US", "GBP": "GB", "EUR": "DE", "CAD": "CA", "AUD": "AU"}
+# Subdomains that aren't part of the brand name
+GENERIC_LABELS = {"shop", "store", "en", "us", "uk", "eu", "m"}
+SECOND_LEVEL_LABELS = {"co", "com", "net", "org"}
+
+StageOutcome = namedtuple("StageOutcome", ["stage", "status", "ms", "value", "error"])
+
+def brand_keyword(base_url: str) -> str:
+    """
+    "https://shop.gymshark.com" -> "gymshark": the ad-library search term,
+    known before the homepage title is.
+    """
+    labels = canonical_domain(base_url).split(".")
+    # "brand.co.uk" / "brand.com.au": two-part public suffix
+    suffix = 2 if len(labels) > 2 and labels[-2] in SECOND_LEVEL_LABELS and len(labels[-1]) == 2 else 1
+    names = [label for label in labels[:-suffix] if label not in GENERIC_LABELS] or labels
+    return names[-1]
+
+def market_share(currency: str) -> list:
+    # Real logic: We allocate 70% to primary, 30% split among others
+    primary_country = CURRENCY_COUNTRIES.get(currency, "US")
+    return [
+        {"country": primary_country, "percent": 70},
+        {"country": "US" if primary_country != "US" else "GB", "percent": 20},
+        {"country": "CA" if primary_country != "CA" else "AU", "percent": 10}
+    ]
+
+async def _timed(stage: str, coro, timeout: float) -> StageOutcome:
+    start = time.perf_counter()
+    try:
+        value = await asyncio.wait_for(coro, timeout)
+        status, error = "ok", None
+    except asyncio.TimeoutError:
+        value, status, error = None, "timeout", f"timed out after {timeout:g}s"
+    except Exception as e:
+        value, status, error = None, "error", str(e) or type(e).__name__
+    return StageOutcome(stage, status, round((time.perf_counter() - start) * 1000, 1), value, error)
+
+class ScanPipeline:
+    def __init__(self, scanner: StoreScanner = None):
+        self.scanner = scanner or StoreScanner()
+
+    async def _ads(self, keyword: str) -> int:
+        # Search for the Store Name as keyword
+        # Note: This is an approximation. Ideally we filter by "Page Name" match.
+        ad_data = await fetch_real_time_ads(keyword=keyword, countries=DEFAULT_AD_COUNTRIES, limit=10)
+        if ad_data.get("error"):
+            raise RuntimeError(ad_data["error"])
+        return len(ad_data.get("data", []))
+
+    async def stream(self, url: str):
+        """
+        Yields events as the scan progresses, for progressive / streamed results:
+            metadata, pixels    homepage stage (title/currency/language, pixel flags)
+            catalog_page        each products.json page as it is folded in
+            catalog, ads        end of those stages
+            estimates           sales estimates + market share, once all stages are in
+            done                the complete scan result (same as run())
+        Every event is {"event", "data"}; stage events add "status", "ms" and "error".
+        """
+        start = time.perf_counter()
+        base_url, result = self.scanner.new_result(url)
+        stats = CatalogStats(top_n=5)
+        queue = asyncio.Queue()
+
+        def on_page(page: int, summary):
+            stats.add_page(page, summary)
+            queue.put_nowait({"event": "catalog_page", "data": {
+                "page": page, "page_products": summary.count, **self.scanner.catalog_fields(stats),
+            }})
+
+        async def run_stage(stage: str, coro, timeout: float):
+            queue.put_nowait(await _timed(stage, coro, timeout))
+
+        tasks = [
+            asyncio.ensure_future(run_stage("homepage", self.scanner.fetch_homepage(base_url), SCAN_HOMEPAGE_TIMEOUT)),
+            asyncio.ensure_future(run_stage("catalog", self.scanner.crawl_catalog(base_url, on_page), SCAN_CATALOG_TIMEOUT)),
+            asyncio.ensure_future(run_stage("ads", self._ads(brand_keyword(base_url)), SCAN_ADS_TIMEOUT)),
+        ]
+        outcomes = {}
+        try:
+            while len(outcomes) < len(tasks):
+                item = await queue.get()
+                if not isinstance(item, StageOutcome):
+                    yield item
+                    continue
+                outcomes[item.stage] = item
+                stage = {"status": item.status, "ms": item.ms, "error": item.error}
+                if item.stage == "homepage":
+                    found = item.value or {}
+                    result.update(found)
+                    yield {"event": "metadata", **stage, "data": {k: result[k] for k in ("url", "title", "currency", "language")}}
+                    if found:
+                        yield {"event": "pixels", "data": {k: v for k, v in found.items() if k.startswith("has_")}}
+                elif item.stage == "catalog":
+                    result.update(self.scanner.catalog_fields(stats))
+                    yield {"event": "catalog", **stage, "data": self.scanner.catalog_fields(stats)}
+                else:
+                    result["active_ads"] = item.value or 0
+                    yield {"event": "ads", **stage, "data": {"active_ads": result["active_ads"]}}
+        finally:
+            # The consumer went away (e.g. client disconnected): stop the other stages
+            for task in tasks:
+                task.cancel()
+
+        self._finish(result, outcomes)
+        result["timings"]["total"] = round((time.perf_counter() - start) * 1000, 1)
+        yield {"event": "estimates", "data": {k: result[k] for k in ("active_ads", "estimates", "market_share")}}
+        yield {"event": "done", "status": "partial" if result["partial"] else "ok", "ms": result["timings"]["total"],
+               "error": result["error"], "data": result}
+
+    async def run(self, url: str) -> dict:
+        async for event in self.stream(url):
+            if event["event"] == "done":
+                return event["data"]
+
+    def _finish(self, result: dict, outcomes: dict):
+        # --- Phase 14: Ad & Sales Intelligence ---
+
+        # 1. Real Ad Count; without one, fall back to REAL Pixel Signals from the scanner.
+        # If they have a Pixel, they likely run ads even if API is restricted or name mismatch.
+        # We assign a baseline of '1' to indicate "Active Ad Operations" for sales math.
+        if not result.get("active_ads") and (result.get("has_fb_pixel") or result.get("has_tiktok_pixel")):
+            result["active_ads"] = 1
+
+        # 2. Sales Estimation
+        result["estimates"] = self.scanner.estimate_sales(
+            product_count=result["count"],
+            avg_price=result["avg_price"],
+            active_ads=result["active_ads"]
+        )
+
+        # 3. Market Share (Heuristic based on Currency)
+        result["market_share"] = market_share(result["currency"])
+
+        result["stages"] = {stage: o.status for stage, o in outcomes.items()}
+        result["timings"] = {stage: o.ms for stage, o in outcomes.items()}
+        result["partial"] = any(o.status != "ok" for o in outcomes.values())
+        # Only a store we couldn't read counts as a failed scan; a missing ad count doesn't
+        failures = [f"{stage}: {outcomes[stage].error}" for stage in ("homepage", "catalog") if outcomes[stage].status != "ok"]
+        result["error"] = "; ".join(failures) or None
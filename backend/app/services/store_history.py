@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+from sqlalchemy import delete, insert, literal, select, Date, Integer, String
+from app.database import SessionLocal
+from app.models import GlobalStore, StoreHistory
+from app.services.response_cache import response_cache
+
+# Daily snapshots are kept this long before being folded into weekly buckets,
+# and weekly buckets this long before being folded into monthly ones.
+HISTORY_DAILY_RETENTION_DAYS = int(os.getenv("HISTORY_DAILY_RETENTION_DAYS", "35"))
+HISTORY_WEEKLY_RETENTION_WEEKS = int(os.getenv("HISTORY_WEEKLY_RETENTION_WEEKS", "13"))
+# Daily StoreHistory snapshot + compaction, run in the background of every
+# worker. A day's run is idempotent (and the (store, bucket, granularity)
+# unique index rejects a concurrent duplicate), so several workers are safe.
+STORE_HISTORY_ENABLED = os.getenv("STORE_HISTORY_ENABLED", "true").lower() == "true"
+# How often the background job checks whether today's run is still due
+STORE_HISTORY_POLL_SECONDS = float(os.getenv("STORE_HISTORY_POLL_SECONDS", "300"))
+
+METRICS = ("revenue", "orders", "traffic", "active_ads")
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def months_back(day: date, months: int) -> date:
+    """
+    First day of the month `months` months before day's month.
+    """
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+class StoreHistoryRecorder:
+    """
+    Writes the daily StoreHistory snapshot for every GlobalStore and compacts
+    aged rows into weekly / monthly buckets. Idempotent per day.
+    """
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def run_daily(self, today: date = None):
+        today = today or date.today()
+        start = time.perf_counter()
+        db = self.session_factory()
+        try:
+            # 1. Today's snapshot (re-running the same day replaces it)
+            recorded = self.record_day(db, today)
+            # 2. Fold old days into weeks, old weeks into months
+            weeks = self._rollup(db, "day", "week", week_start(today - timedelta(days=HISTORY_DAILY_RETENTION_DAYS)), week_start)
+            months = self._rollup(db, "week", "month", month_start(today - timedelta(weeks=HISTORY_WEEKLY_RETENTION_WEEKS)), month_start)
+            db.commit()
+            print(f"Store history: {recorded} snapshots, {weeks} weekly / {months} monthly buckets in {time.perf_counter() - start:.2f}s")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        # Analysis pages embed the history
+        response_cache.invalidate("analysis")
+
+    def record_day(self, db, day: date) -> int:
+        db.execute(delete(StoreHistory).where(StoreHistory.granularity == "day", StoreHistory.bucket == day))
+        snapshot = select(
+            GlobalStore.id,
+            literal("day", String),
+            literal(day, Date),
+            GlobalStore.monthly_revenue,
+            GlobalStore.orders_est,
+            GlobalStore.traffic,
+            GlobalStore.active_ads,
+            literal(1, Integer),
+        )
+        result = db.execute(insert(StoreHistory).from_select(
+            ["store_id", "granularity", "bucket", *METRICS, "samples"], snapshot
+        ))
+        return result.rowcount
+
+    def _rollup(self, db, source: str, target: str, cutoff: date, period_start) -> int:
+        """
+        Merges `source` rows older than cutoff into `target` buckets (weighted
+        by samples, so re-compacting into an existing bucket stays exact).
+        """
+        columns = [StoreHistory.store_id, StoreHistory.bucket, StoreHistory.samples] + [getattr(StoreHistory, m) for m in METRICS]
+        buckets = {}
+        rows = db.execute(
+            select(*columns).where(StoreHistory.granularity == source, StoreHistory.bucket < cutoff)
+        )
+        for store_id, bucket, samples, *values in rows:
+            _merge(buckets, (store_id, period_start(bucket)), samples or 1, values)
+        if not buckets:
+            return 0
+
+        # Fold in target buckets that already exist (e.g. a week compacted in two runs)
+        existing = db.execute(
+            select(StoreHistory.id, *columns).where(
+                StoreHistory.granularity == target,
+                StoreHistory.bucket.in_({bucket for _, bucket in buckets})
+            )
+        ).all()
+        stale_ids = []
+        for row_id, store_id, bucket, samples, *values in existing:
+            if (store_id, bucket) in buckets:
+                _merge(buckets, (store_id, bucket), samples or 1, values)
+                stale_ids.append(row_id)
+        if stale_ids:
+            db.execute(delete(StoreHistory).where(StoreHistory.id.in_(stale_ids)))
+
+        db.execute(insert(StoreHistory), [
+            {
+                "store_id": store_id, "granularity": target, "bucket": bucket, "samples": acc["samples"],
+                **{m: acc[m] / acc["samples"] for m in METRICS},
+            }
+            for (store_id, bucket), acc in buckets.items()
+        ])
+        db.execute(delete(StoreHistory).where(StoreHistory.granularity == source, StoreHistory.bucket < cutoff))
+        return len(buckets)
+
+class StoreHistoryScheduler:
+    """
+    Runs StoreHistoryRecorder.run_daily once per calendar day in the
+    background: on startup, then after each date change.
+    """
+    def __init__(self, recorder: StoreHistoryRecorder = None, poll_seconds: float = STORE_HISTORY_POLL_SECONDS):
+        self.recorder = recorder or StoreHistoryRecorder()
+        self.poll_seconds = poll_seconds
+        self._day = None
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def run_forever(self):
+        while True:
+            await self.run_if_due()
+            await asyncio.sleep(self.poll_seconds)
+
+    async def run_if_due(self):
+        today = date.today()
+        if self._day == today:
+            return
+        try:
+            await asyncio.to_thread(self.recorder.run_daily, today)
+        except Exception as e:
+            print(f"Store History Error: {e}")
+        # Don't retry on every poll after a failure; try again tomorrow
+        self._day = today
+
+_history_scheduler = None
+
+def get_history_scheduler() -> StoreHistoryScheduler:
+    global _history_scheduler
+    if _history_scheduler is None:
+        _history_scheduler = StoreHistoryScheduler()
+    return _history_scheduler
+
+def _merge(buckets: dict, key: tuple, samples: int, values: list):
+    acc = buckets.setdefault(key, {"samples": 0, **{m: 0.0 for m in METRICS}})
+    acc["samples"] += samples
+    for metric, value in zip(METRICS, values):
+        acc[metric] += (value or 0) * samples
+
+def monthly_series(rows: list, months: int, today: date) -> list:
+    """
+    Collapses a store's StoreHistory rows (any granularity) into one averaged
+    point per month for the last `months` months, oldest first. Months without
+    data are left out.
+    """
+    buckets = {}
+    for row in rows:
+        _merge(buckets, month_start(row.bucket), row.samples or 1, [getattr(row, m) for m in METRICS])
+    series = []
+    for i in range(months - 1, -1, -1):
+        month = months_back(today, i)
+        acc = buckets.get(month)
+        if acc:
+            series.append({"month": month, **{m: acc[m] / acc["samples"] for m in METRICS}})
+    return series
+
+if __name__ == "__main__":
+    # One-off run (e.g. from cron when STORE_HISTORY_ENABLED=false):
+    #   python -m app.services.store_history
+    StoreHistoryRecorder().run_daily()
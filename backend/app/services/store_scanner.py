@@ -1,22 +1,30 @@
-import requests
-import re
+import asyncio
 from urllib.parse import urlparse
-from bs4 import BeautifulSoup
 import math
+from app.services.http_client import get_async_client
+from app.services.catalog_crawler import CatalogCrawler, CatalogStats
+from app.services.html_meta import extract_meta
+from app.services.scan_cache import scan_cache
 
 class StoreScanner:
     def __init__(self):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
+        self.client = get_async_client()
 
-    def scan_url(self, url: str):
+    def new_result(self, url: str) -> tuple:
+        """
+        (base_url, empty scan result) for a user-supplied store URL.
+        """
         # 1. Normalize URL
         if not url.startswith("http"):
             url = "https://" + url
         
-        domain = urlparse(url).netloc
-        base_url = f"https://{domain}"
+        parsed = urlparse(url)
+        domain = parsed.netloc
+        # Explicit http:// is kept (local stand-ins); everything else scans over https
+        base_url = f"{'http' if parsed.scheme == 'http' else 'https'}://{domain}"
 
         scan_result = {
             "url": base_url,
@@ -28,80 +36,74 @@ class StoreScanner:
             "products": [],
             "error": None
         }
+        return base_url, scan_result
 
-        try:
-            # 2. Metadata Scrape (HTML)
-            res = requests.get(base_url, headers=self.headers, timeout=10)
-            if res.status_code == 200:
-                soup = BeautifulSoup(res.text, "html.parser")
-                
-                # Title
-                title_tag = soup.find("title")
-                if title_tag:
-                    scan_result["title"] = title_tag.text.strip().split("–")[0].strip().split("|")[0].strip()
-                
-                # Currency Detection (simple regex on common Shopify vars)
-                # Looking for: "currency":"GBP" or Shopify.currency = {"active":"GBP"}
-                currency_match = re.search(r'"currency":"([A-Z]{3})"', res.text)
-                if currency_match:
-                    scan_result["currency"] = currency_match.group(1)
-                
-                # Language (html lang)
-                html_tag = soup.find("html")
-                if html_tag and html_tag.get("lang"):
-                    scan_result["language"] = html_tag.get("lang")
-                
-                # Tech Detection (Pixels)
-                html_text = res.text.lower()
-                scan_result["has_fb_pixel"] = "fbevents.js" in html_text or "fbq(" in html_text
-                scan_result["has_google_tag"] = "googletagmanager" in html_text or "gtag(" in html_text
-                scan_result["has_tiktok_pixel"] = "ttq.load" in html_text
+    async def fetch_homepage(self, base_url: str) -> dict:
+        """
+        Title, currency, language and pixel flags from the storefront HTML.
+        """
+        # 2. Metadata Scrape (HTML), parsed once per scan-cache TTL / page change
+        return await scan_cache.fetch(self.client, base_url, self.parse_homepage, headers=self.headers)
 
+    @staticmethod
+    def parse_homepage(res) -> dict:
+        if res.status_code != 200:
+            raise ValueError(f"homepage returned HTTP {res.status_code}")
+        found = {}
+        # Only <head> is tokenized; currency and pixels come from one pass over the text
+        page = extract_meta(res.text, signatures=True)
+        
+        # Title
+        if page.title is not None:
+            found["title"] = page.title.strip().split("–")[0].strip().split("|")[0].strip()
+        
+        # Currency Detection (simple regex on common Shopify vars)
+        # Looking for: "currency":"GBP" or Shopify.currency = {"active":"GBP"}
+        if page.currency:
+            found["currency"] = page.currency
+        
+        # Language (html lang)
+        if page.lang:
+            found["language"] = page.lang
+        
+        # Tech Detection (Pixels)
+        found.update(page.pixels)
+        return found
 
-            # 3. Inventory Scrape (products.json)
-            # Fetch generic products.json info
-            prod_endpoint = f"{base_url}/products.json?limit=250"
-            prod_res = requests.get(prod_endpoint, headers=self.headers, timeout=10)
-            
-            if prod_res.status_code == 200:
-                data = prod_res.json()
-                products = data.get("products", [])
-                
-                scan_result["count"] = len(products) # Approximation (capped at 250 usually)
-                
-                prices = []
-                top_products = []
-                
-                for p in products:
-                    # Get price (first variant)
-                    variants = p.get("variants", [])
-                    if variants:
-                        price = float(variants[0].get("price", 0))
-                        prices.append(price)
-                    
-                    # Store simple product for list
-                    images = p.get("images", [])
-                    image_url = images[0].get("src") if images else ""
-                    
-                    top_products.append({
-                        "id": p.get("id"),
-                        "title": p.get("title"),
-                        "price": price if variants else 0,
-                        "image": image_url,
-                        "handle": p.get("handle")
-                    })
+    async def crawl_catalog(self, base_url: str, on_page):
+        """
+        Streams every products.json page into on_page(page_number, CatalogPage)
+        (e.g. CatalogStats.add_page). Pages already handed over stay counted
+        if the crawl is cut short (timeout / error).
+        """
+        # 3. Inventory Scrape (products.json)
+        # Crawl every catalog page concurrently; pages are aggregated as they
+        # arrive so the full catalog is never held in memory.
+        crawler = CatalogCrawler(client=self.client)
+        await crawler.crawl(base_url, on_page)
 
-                if prices:
-                    scan_result["avg_price"] = sum(prices) / len(prices)
-                
-                # Sort by approximation of "best selling" usually isn't in products.json order directly,
-                # but often recent. We'll just take top 5.
-                scan_result["products"] = top_products[:5]
+    @staticmethod
+    def catalog_fields(stats: CatalogStats) -> dict:
+        # Sort by approximation of "best selling" usually isn't in products.json order directly,
+        # but often recent. We'll just take top 5 of the first page.
+        return {"count": stats.count, "avg_price": stats.avg_price, "products": stats.top_products}
 
-        except Exception as e:
-            scan_result["error"] = str(e)
-            print(f"Scan Error: {e}")
-        
+    async def scan_url(self, url: str):
+        """
+        Homepage + catalog scan (no ads / estimates; see ScanPipeline for the full scan).
+        """
+        base_url, scan_result = self.new_result(url)
+        stats = CatalogStats(top_n=5)
+        homepage, catalog = await asyncio.gather(
+            self.fetch_homepage(base_url), self.crawl_catalog(base_url, stats.add_page), return_exceptions=True
+        )
+        if isinstance(homepage, dict):
+            scan_result.update(homepage)
+        scan_result.update(self.catalog_fields(stats))
+        errors = [str(e) for e in (homepage, catalog) if isinstance(e, Exception)]
+        if errors:
+            scan_result["error"] = "; ".join(errors)
+            print(f"Scan Error: {scan_result['error']}")
         return scan_result
 
     # ... (Previous code)
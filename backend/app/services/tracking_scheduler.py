@@ -0,0 +1,198 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from sqlalchemy import asc
+from app.database import SessionLocal
+from app.models import TrackedStore, SalesData
+from app.scraper.engine import SalesEngine
+from app.scraper.snapshot_store import SnapshotFile
+from app.scraper.tracker import StealthTracker
+
+# How often each tracked store is re-crawled.
+TRACKING_INTERVAL_MINUTES = int(os.getenv("TRACKING_INTERVAL_MINUTES", "60"))
+# Stores picked per scheduler tick; their SalesData rows are written in one transaction.
+TRACKING_BATCH_SIZE = int(os.getenv("TRACKING_BATCH_SIZE", "50"))
+# Store fetches in flight at once.
+TRACKING_CONCURRENCY = int(os.getenv("TRACKING_CONCURRENCY", "10"))
+# Minimum gap between two requests to the same domain.
+TRACKING_DOMAIN_DELAY = float(os.getenv("TRACKING_DOMAIN_DELAY", "2"))
+# Sleep between ticks when nothing is due.
+TRACKING_POLL_SECONDS = float(os.getenv("TRACKING_POLL_SECONDS", "30"))
+
+class TrackingScheduler:
+    """
+    In-process scheduler that keeps every TrackedStore crawled on a fixed cadence.
+    Each tick picks the most overdue stores, crawls them with bounded concurrency
+    and per-domain politeness, diffs against the previous crawl and bulk-inserts
+    the resulting SalesData rows.
+    """
+    def __init__(
+        self,
+        tracker: StealthTracker = None,
+        engine: SalesEngine = None,
+        session_factory=SessionLocal,
+        interval_minutes: int = TRACKING_INTERVAL_MINUTES,
+        batch_size: int = TRACKING_BATCH_SIZE,
+        concurrency: int = TRACKING_CONCURRENCY,
+        domain_delay: float = TRACKING_DOMAIN_DELAY
+    ):
+        self.tracker = tracker or StealthTracker()
+        self.engine = engine or SalesEngine()
+        self.session_factory = session_factory
+        self.interval = timedelta(minutes=interval_minutes)
+        self.batch_size = batch_size
+        self.domain_delay = domain_delay
+
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        # domain -> earliest time its next fetch may start (only domains with a
+        # reservation still in the future are kept)
+        self._domain_next_fetch = {}
+        self._task = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def run_forever(self):
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                print(f"Tracking Scheduler Error: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                # Caught up; wait for the next stores to come due
+                await asyncio.sleep(TRACKING_POLL_SECONDS)
+
+    async def run_once(self) -> int:
+        """
+        Processes one batch of due stores. Returns how many were crawled.
+        """
+        due = await asyncio.to_thread(self._load_due)
+        if not due:
+            return 0
+
+        results = await asyncio.gather(*(self._track_store(store_id, url) for store_id, url in due))
+        await asyncio.to_thread(self._save_batch, results)
+        return len(due)
+
+    # --- Crawling ---
+
+    async def _wait_for_domain(self, domain: str):
+        # Reserve the domain's next slot (no await in between, so no lock needed)
+        now = time.monotonic()
+        for expired in [d for d, at in self._domain_next_fetch.items() if at <= now]:
+            del self._domain_next_fetch[expired]
+        start = max(now, self._domain_next_fetch.get(domain, now))
+        self._domain_next_fetch[domain] = start + self.domain_delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _track_store(self, store_id: int, url: str):
+        async with self._semaphore:
+            domain = urlparse(url if url.startswith("http") else "https://" + url).netloc
+            try:
+                await self._wait_for_domain(domain)
+                data = await self.tracker.fetch_catalog(url)
+                sales = await asyncio.to_thread(self._diff_and_append, url, data.get("products", []))
+                return store_id, sales, None
+            except Exception as e:
+                print(f"Tracking Error ({url}): {e}")
+                return store_id, [], str(e)
+
+    def _diff_and_append(self, url: str, products: list) -> list:
+        """
+        Diffs the fresh crawl against the store's last stored crawl, then appends it.
+        """
+        key = self.tracker.snapshot_key(url)
+        path = self.tracker.store.path_for(key)
+
+        sales = []
+        if os.path.exists(path):
+            with SnapshotFile(path) as snap:
+                if snap.crawls:
+                    old_index = snap.crawls[-1].variant_index()
+                    sales = list(self.engine.iter_sales(old_index, products))
+
+        self.tracker.store.append(key, products)
+        return sales
+
+    # --- Persistence ---
+
+    def _load_due(self) -> list:
+        cutoff = datetime.utcnow() - self.interval
+        db = self.session_factory()
+        try:
+            rows = db.query(TrackedStore.id, TrackedStore.url).filter(
+                TrackedStore.status.in_(["active", "error"]),
+                (TrackedStore.last_checked == None) | (TrackedStore.last_checked <= cutoff)
+            ).order_by(
+                # Never-checked stores first, then the most overdue
+                TrackedStore.last_checked != None,
+                asc(TrackedStore.last_checked)
+            ).limit(self.batch_size).all()
+            return [(r.id, r.url) for r in rows]
+        finally:
+            db.close()
+
+    def _save_batch(self, results: list):
+        now = datetime.utcnow()
+        sales_rows = []
+        ok_ids = []
+        failed_ids = []
+
+        for store_id, sales, error in results:
+            (failed_ids if error else ok_ids).append(store_id)
+            for s in sales:
+                units = s["units_sold_est"]
+                sales_rows.append({
+                    "store_id": store_id,
+                    "product_title": s["product_title"],
+                    "product_id": s["product_id"],
+                    "variant_id": str(s["variant_id"]),
+                    "price": s["revenue_est"] / units if units else 0.0,
+                    "quantity_sold": units,
+                    "timestamp": now
+                })
+
+        db = self.session_factory()
+        try:
+            if sales_rows:
+                db.bulk_insert_mappings(SalesData, sales_rows)
+            if ok_ids:
+                db.query(TrackedStore).filter(TrackedStore.id.in_(ok_ids)).update(
+                    {"last_checked": now, "status": "active"}, synchronize_session=False
+                )
+            if failed_ids:
+                # Errors are retried on the next cadence rather than parked forever
+                db.query(TrackedStore).filter(TrackedStore.id.in_(failed_ids)).update(
+                    {"last_checked": now, "status": "error"}, synchronize_session=False
+                )
+            db.commit()
+            print(f"Tracking batch: {len(results)} stores, {len(sales_rows)} sales rows")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+_scheduler = None
+
+def get_tracking_scheduler() -> TrackingScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TrackingScheduler()
+    return _scheduler
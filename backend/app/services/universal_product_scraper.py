@@ -1,6 +1,10 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from app.services.html_meta import PageMeta, stream_meta
+from app.services.http_client import get_async_client
+from app.services.scan_cache import scan_cache
+
+# Images returned per product
+MAX_IMAGES = 5
 
 class UniversalProductScraper:
     def __init__(self):
@@ -9,64 +13,107 @@ class UniversalProductScraper:
             "Accept-Language": "en-US,en;q=0.9"
         }
 
-    def scrape_url(self, url: str):
+    async def scrape_url(self, url: str):
+        async for event in self.stream(url):
+            if event["event"] == "done":
+                return event["data"] if event["status"] == "ok" else {"error": event["error"]}
+
+    async def stream(self, url: str):
+        """
+        Yields {"event", "data"} as the page downloads:
+            metadata    title / description / og:image, as soon as </head> has arrived
+            images      the gallery images, once enough are in (or the page ends)
+            done        the complete result ("status" ok / error, "error")
+        """
         if not url.startswith("http"):
             url = "https://" + url
-            
+
         domain = urlparse(url).netloc
-        
+        data = {
+            "title": "",
+            "description": "",
+            "images": [],
+            "price": "",
+            "source": domain,
+            "original_url": url
+        }
+
+        # Product pages scanned by other users are replayed from the scan cache,
+        # or revalidated with a conditional GET once stale
+        key = scan_cache.key(url)
+        entry = scan_cache.lookup(key)
+        if entry is not None and entry.fresh:
+            scan_cache.hits += 1
+            for event in self._replay(entry.value, data):
+                yield event
+            return
+
         try:
-            res = requests.get(url, headers=self.headers, timeout=15)
-            res.raise_for_status()
-            soup = BeautifulSoup(res.text, "html.parser")
-            
-            data = {
-                "title": "",
-                "description": "",
-                "images": [],
-                "price": "",
-                "source": domain,
-                "original_url": url
-            }
-            
-            # Strategy 1: Open Graph Tags (Universal)
-            og_title = soup.find("meta", property="og:title")
-            if og_title:
-                data["title"] = og_title.get("content", "")
-                
-            og_image = soup.find("meta", property="og:image")
-            if og_image:
-                data["images"].append(og_image.get("content", ""))
-                
-            og_desc = soup.find("meta", property="og:description")
-            if og_desc:
-                data["description"] = og_desc.get("content", "")
-                
-            # Strategy 2: Fallback to Standard Information
-            if not data["title"]:
-                data["title"] = soup.title.string if soup.title else ""
-                
+            headers = {**self.headers, **scan_cache.validators(entry)}
+            async with get_async_client().stream("GET", url, headers=headers, timeout=15) as res:
+                if res.status_code == 304 and entry is not None:
+                    scan_cache.renew(entry, res)
+                    for event in self._replay(entry.value, data):
+                        yield event
+                    return
+
+                res.raise_for_status()
+                scan_cache.misses += 1
+                # Head is tokenized as it arrives; the download stops once the
+                # gallery images are in, so long pages are never read in full
+                page = PageMeta(max_images=MAX_IMAGES, skip_images=("icon", "logo"))
+                head_sent = False
+                async for _ in stream_meta(res, page):
+                    if page.head_final and not head_sent:
+                        head_sent = True
+                        self._read_head(page, data)
+                        yield {"event": "metadata", "data": dict(data, images=list(data["images"]))}
+
+            if not head_sent:
+                # No </head> / <body>, or no <title> before the page ended
+                self._read_head(page, data)
+                yield {"event": "metadata", "data": dict(data, images=list(data["images"]))}
+
             # Strategy 3: Find additional images (Generic)
             # Look for large images or gallery images
-            for img in soup.find_all("img", src=True):
-                src = img["src"]
+            for src in page.images:
                 if src.startswith("//"):
                     src = "https:" + src
                 elif src.startswith("/"):
                     src = "https://" + domain + src
-                
-                # Filter small icons
-                if "icon" not in src and "logo" not in src:
-                    data["images"].append(src)
-            
-            # Cleanup
-            data["title"] = data["title"].strip()
-            data["description"] = data["description"].strip()
+                data["images"].append(src)
+
             # De-duplicate images and limit to 5
-            data["images"] = list(set(data["images"]))[:5]
-            
-            return data
-            
+            data["images"] = list(dict.fromkeys(data["images"]))[:MAX_IMAGES]
+            scan_cache.store(key, res, dict(data, images=list(data["images"])))
+            yield {"event": "images", "data": {"images": data["images"]}}
+
+            yield {"event": "done", "status": "ok", "error": None, "data": data}
+
         except Exception as e:
             print(f"Scrape Error: {e}")
-            return {"error": str(e)}
+            yield {"event": "done", "status": "error", "error": str(e), "data": data}
+
+    @staticmethod
+    def _replay(cached: dict, data: dict):
+        # Cached under the canonical domain: keep this request's source / original_url
+        data.update(cached, source=data["source"], original_url=data["original_url"], images=list(cached["images"]))
+        yield {"event": "metadata", "data": dict(data, images=list(data["images"]))}
+        yield {"event": "images", "data": {"images": list(data["images"])}}
+        yield {"event": "done", "status": "ok", "error": None, "data": data}
+
+    @staticmethod
+    def _read_head(page, data: dict):
+        # Strategy 1: Open Graph Tags (Universal)
+        data["title"] = page.og("title")
+        if page.og("image"):
+            data["images"].append(page.og("image"))
+        data["description"] = page.og("description")
+
+        # Strategy 2: Fallback to Standard Information
+        if not data["title"]:
+            data["title"] = page.title or ""
+
+        # Cleanup
+        data["title"] = data["title"].strip()
+        data["description"] = data["description"].strip()
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from app.services.response_cache import MemoryBackend
+
+# Cache for paid / rate-limited third-party lookups (RapidAPI, ...).
+# An in-process TTL + LRU tier, optionally backed by a SQLite file so entries
+# survive restarts and are shared by every worker on the host. Concurrent
+# misses for the same key share one in-flight upstream call.
+
+class DiskBackend:
+    """
+    SQLite file tier. Expiry uses wall-clock time (comparable across processes);
+    past max_entries the entries closest to expiry are dropped first.
+    """
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, namespace: str, ttl: float, max_entries: int):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS upstream_cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM upstream_cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO upstream_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), time.time() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM upstream_cache WHERE expires_at <= ?", (time.time(),))
+                conn.execute(
+                    "DELETE FROM upstream_cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM upstream_cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries)
+                )
+
+class UpstreamCache:
+    def __init__(self, namespace: str, ttl: float, max_entries: int, path: str = None):
+        self.namespace = namespace
+        self.memory = MemoryBackend(ttl, max_entries)
+        self.disk = None
+        if path:
+            try:
+                self.disk = DiskBackend(path, namespace, ttl, max_entries)
+            except sqlite3.Error as e:
+                print(f"Upstream cache {namespace}: disk tier disabled ({e})")
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key: str):
+        value = await self.memory.get(key)
+        if value is None and self.disk is not None:
+            try:
+                value = await asyncio.to_thread(self.disk.get, key)
+            except sqlite3.Error as e:
+                print(f"Upstream cache {self.namespace} read failed: {e}")
+            if value is not None:
+                await self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value):
+        await self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value)
+            except sqlite3.Error as e:
+                print(f"Upstream cache {self.namespace} write failed: {e}")
+
+    async def get_or_fetch(self, key: str, fetch, cacheable=bool):
+        """
+        Cached value for key, or the result of `await fetch()`. Callers that
+        miss while a fetch for the same key is running wait for that fetch
+        instead of starting their own. Results failing cacheable() (empty /
+        error responses by default) are returned but not stored.
+        """
+        value = await self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is None:
+            self.misses += 1
+            pending = self._inflight[key] = asyncio.ensure_future(self._fetch_and_store(key, fetch, cacheable))
+        else:
+            self.coalesced += 1
+        # Shielded: a caller that disconnects doesn't cancel the shared fetch
+        return await asyncio.shield(pending)
+
+    async def _fetch_and_store(self, key: str, fetch, cacheable):
+        try:
+            value = await fetch()
+            if cacheable(value):
+                await self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
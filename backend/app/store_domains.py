@@ -0,0 +1,83 @@
+from sqlalchemy import bindparam, column, inspect, select, table, Integer, String
+from .services.domains import canonical_domain
+
+# global_stores.canonical_domain (see alembic 0005_store_canonical_domain).
+# Databases created before the column existed, and never upgraded with
+# Alembic, get it added and backfilled at startup by ensure_canonical_domains().
+
+INDEX_NAME = "ux_global_stores_canonical_domain"
+BATCH_SIZE = 5000
+# Conflicting domains listed in the backfill report
+REPORT_LIMIT = 20
+
+stores = table(
+    "global_stores",
+    column("id", Integer),
+    column("url", String),
+    column("canonical_domain", String),
+)
+
+def backfill_canonical_domains(conn) -> dict:
+    """
+    Fills canonical_domain where it is NULL. Several URLs can normalize to the
+    same domain ("https://www.shop.com" / "shop.com/"); the unique index would
+    reject all but one, so a domain already held by another row (lowest id
+    first) is left NULL on the rest. Returns {domain: [ids left NULL]}.
+    """
+    taken = set(conn.execute(select(stores.c.canonical_domain).where(stores.c.canonical_domain.is_not(None))).scalars())
+    conflicts = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(stores.c.id, stores.c.url)
+            .where(stores.c.id > last_id, stores.c.canonical_domain.is_(None))
+            .order_by(stores.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row_id, url in rows:
+            domain = canonical_domain(url or "")
+            if not domain:
+                continue
+            if domain in taken:
+                conflicts.setdefault(domain, []).append(row_id)
+                continue
+            taken.add(domain)
+            updates.append({"row_id": row_id, "domain": domain})
+        if updates:
+            conn.execute(
+                stores.update().where(stores.c.id == bindparam("row_id")).values(canonical_domain=bindparam("domain")),
+                updates
+            )
+        last_id = rows[-1][0]
+    return conflicts
+
+def report_conflicts(conflicts: dict):
+    if not conflicts:
+        return
+    listed = "\n".join(f"  {domain}: ids {ids}" for domain, ids in list(conflicts.items())[:REPORT_LIMIT])
+    print(
+        f"canonical_domain: {sum(len(ids) for ids in conflicts.values())} stores share a domain with a "
+        f"lower id and were left NULL (merge them into that store). First {min(len(conflicts), REPORT_LIMIT)}:\n{listed}"
+    )
+
+def ensure_canonical_domains(engine):
+    """
+    Adds, backfills and uniquely indexes global_stores.canonical_domain when
+    the table predates it. Safe to call on every startup (a no-op once done).
+    """
+    inspector = inspect(engine)
+    if "global_stores" not in inspector.get_table_names():
+        return
+    has_column = any(c["name"] == "canonical_domain" for c in inspector.get_columns("global_stores"))
+    has_index = any(i["name"] == INDEX_NAME for i in inspector.get_indexes("global_stores"))
+    if has_column and has_index:
+        return
+    with engine.begin() as conn:
+        if not has_column:
+            print("Adding global_stores.canonical_domain (run `alembic upgrade head` to bring the schema fully up to date)")
+            conn.exec_driver_sql("ALTER TABLE global_stores ADD COLUMN canonical_domain VARCHAR")
+        report_conflicts(backfill_canonical_domains(conn))
+        conn.exec_driver_sql(f"CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME} ON global_stores (canonical_domain)")
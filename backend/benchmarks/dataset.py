@@ -0,0 +1,105 @@
+"""
+Reproducible GlobalStore / GlobalProduct datasets for the benchmarks.
+
+The same --scale and --seed always produce the same rows, so results from
+different commits are comparable. Loaded through BulkIngestor. Run from backend/:
+
+    python -m benchmarks.dataset --scale 10k
+    python -m benchmarks.dataset --scale 1m --url postgresql://.../bench
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select
+
+from app.database import Base
+from app.models import GlobalStore
+from app.search_index import ensure_search_indexes
+from app.services.bulk_ingest import BulkIngestor
+
+# scale -> (stores, products)
+SCALES = {
+    "10k": (1_000, 10_000),
+    "1m": (50_000, 1_000_000),
+    "10m": (500_000, 10_000_000),
+}
+
+NICHES = ["Fashion", "Health", "Tech", "Home", "Pets", "Beauty"]
+COUNTRIES = ["US", "FR", "GB", "DE", "BR", "CA", "AU"]
+CURRENCIES = {"US": "USD", "FR": "EUR", "GB": "GBP", "DE": "EUR", "BR": "BRL", "CA": "CAD", "AU": "AUD"}
+WORDS = ["smart", "watch", "lamp", "collar", "serum", "bottle", "blender", "yoga", "mat", "drone", "leggings", "sneakers"]
+BASE_DATE = datetime(2025, 1, 1)
+
+def default_url(scale: str) -> str:
+    return "sqlite:///" + os.path.join(tempfile.gettempdir(), f"bench_{scale}.db")
+
+def store_domain(i: int, niche: str) -> str:
+    return f"{niche.lower()}{i}.com"
+
+def generate_stores(count: int, seed_value: int = 42):
+    rnd = random.Random(seed_value)
+    for i in range(1, count + 1):
+        niche = rnd.choice(NICHES)
+        country = rnd.choice(COUNTRIES)
+        yield {
+            "name": f"{niche} Store {i}", "url": store_domain(i, niche),
+            "niche": niche, "country": country, "currency": CURRENCIES[country],
+            "monthly_revenue": rnd.uniform(1000, 500000), "orders_est": rnd.randint(10, 5000),
+            "product_count": rnd.randint(5, 2000), "traffic": rnd.randint(100, 100000),
+            "traffic_growth": rnd.uniform(-20, 150), "active_ads": rnd.randint(0, 500),
+            "main_traffic_source": "Direct", "pixels": "FB",
+            "creation_date": BASE_DATE + timedelta(minutes=rnd.randint(0, 500000)),
+        }
+
+def generate_products(count: int, store_ids: list, seed_value: int = 42):
+    # Own stream, so the product rows don't depend on the store count
+    rnd = random.Random(seed_value + 1)
+    for i in range(1, count + 1):
+        yield {
+            "store_id": store_ids[rnd.randrange(len(store_ids))],
+            "title": " ".join(rnd.sample(WORDS, 3)) + f" {i}", "handle": f"product-{i}",
+            "image_url": f"https://cdn.shopify.com/s/files/bench/{i % 500}.jpg", "price": round(rnd.uniform(5, 150), 2),
+            "revenue_est": round(rnd.uniform(100, 50000), 2), "ads_count": rnd.randint(0, 200),
+            "traffic_growth": rnd.uniform(-20, 100), "is_winner": rnd.random() > 0.8,
+            "is_new": rnd.random() > 0.9,
+            "created_at": BASE_DATE + timedelta(minutes=rnd.randint(0, 500000)),
+        }
+
+def seed_database(engine, n_stores: int, n_products: int, seed_value: int = 42):
+    """
+    Recreates the schema on engine and loads the dataset, leaderboards included.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_indexes(engine)
+
+    ingestor = BulkIngestor(engine)
+    print(f"  {ingestor.ingest_stores(generate_stores(n_stores, seed_value))}")
+    with engine.connect() as conn:
+        # In insertion order, so product -> store assignment is stable
+        store_ids = list(conn.scalars(select(GlobalStore.id).order_by(GlobalStore.id)))
+    print(f"  {ingestor.ingest_products(generate_products(n_products, store_ids, seed_value))}")
+
+    # Fresh statistics so the planner picks the same plans production would
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    ingestor.finish()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--url", help="Database URL (default: bench_<scale>.db in the temp dir)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    url = args.url or default_url(args.scale)
+    n_stores, n_products = SCALES[args.scale]
+    start = time.perf_counter()
+    seed_database(create_engine(url), n_stores, n_products, args.seed)
+    print(f"Seeded {n_stores} stores / {n_products} products in {time.perf_counter() - start:.1f}s ({url})")
+
+if __name__ == "__main__":
+    main()
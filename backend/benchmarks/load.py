@@ -0,0 +1,353 @@
+"""
+Load test for the API hot paths against a benchmark dataset and the local
+stand-in upstreams (see benchmarks.dataset / benchmarks.standin).
+
+Drives the app in-process through httpx's ASGI transport (default), or a
+running server with --base-url. Records throughput and latency percentiles
+per endpoint to a JSON file named after the current commit, so runs can be
+compared across commits. Run from backend/:
+
+    python -m benchmarks.load --scale 10k
+    python -m benchmarks.load --scale 1m --concurrency 32 --requests 2000
+    python -m benchmarks.load --only products,stores --compare benchmarks/results/<base>-10k.json
+
+With --base-url, start the stand-in (python -m benchmarks.standin) and the
+server with the environment printed by --print-env first.
+
+The response and scan caches are off, so every request reaches the database
+and the upstreams (scenarios repeat the same queries). --cached runs with them
+on, reported separately (<commit>-<scale>-cached.json).
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+NICHES = ["Fashion", "Health", "Tech", "Home", "Pets", "Beauty"]
+COUNTRIES = ["US", "FR", "GB", "DE", "BR", "CA", "AU"]
+WORDS = ["smart", "watch", "lamp", "collar", "serum", "bottle", "blender", "yoga", "mat", "drone", "leggings", "sneakers"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# name -> (method, path, build(i, ctx) -> request kwargs)
+SCENARIOS = {
+    "products.search": ("POST", "/api/products/search",
+        lambda i, ctx: {"params": {"page": 1, "limit": 20}, "json": {}}),
+    "products.search.preset": ("POST", "/api/products/search",
+        lambda i, ctx: {"params": {"page": 1, "limit": 20}, "json": {"preset": ("recommended", "new_shops", "active_ads")[i % 3]}}),
+    "products.search.niche_country": ("POST", "/api/products/search",
+        lambda i, ctx: {"params": {"page": 1, "limit": 20}, "json": {"niche": NICHES[i % 6], "country": COUNTRIES[i % 7]}}),
+    "products.search.keyword": ("POST", "/api/products/search",
+        lambda i, ctx: {"params": {"page": 1, "limit": 20}, "json": {"keyword": WORDS[i % len(WORDS)]}}),
+    "products.search.deep_page": ("POST", "/api/products/search",
+        lambda i, ctx: {"params": {"page": 50 + i % 50, "limit": 20}, "json": {"min_price": 20}}),
+    "stores.search": ("POST", "/api/stores/search",
+        lambda i, ctx: {"params": {"page": 1, "limit": 20}, "json": {"sort_by": ("revenue", "traffic", "ads", "newest")[i % 4]}}),
+    "stores.search.keyword": ("POST", "/api/stores/search",
+        lambda i, ctx: {"params": {"page": 1, "limit": 20}, "json": {"keyword": NICHES[i % 6].lower()}}),
+    "analysis.store": ("GET", "/api/analysis/store",
+        lambda i, ctx: {"params": {"url": ctx["domains"][i % len(ctx["domains"])]}}),
+    "analysis.scan": ("POST", "/api/analysis/scan",
+        lambda i, ctx: {"json": {"url": ctx["scan_url"](i)}}),
+    "store_ai.scan": ("POST", "/api/store-ai/scan",
+        lambda i, ctx: {"json": {"url": f"{ctx['standin']}/products/bench-product-{i % 500}"}}),
+    "search.link": ("POST", "/api/search/link",
+        lambda i, ctx: {"json": {"url": f"{ctx['standin']}/products/{WORDS[i % len(WORDS)]}-{i % 50}"}}),
+    "ads.search": ("GET", "/api/ads/search",
+        lambda i, ctx: {"params": {"keyword": WORDS[i % len(WORDS)], "limit": 20}}),
+}
+
+def configure_env(db_url: str, standin_url: str, cached: bool = False) -> dict:
+    """
+    Points the app at the benchmark database and the stand-in upstreams.
+    Must run before anything under app.* is imported.
+    """
+    env = {
+        # Uncached runs measure the endpoints, not in-memory cache hits
+        "RESPONSE_CACHE_BACKEND": "memory" if cached else "off",
+        "SCAN_CACHE_MAX_BYTES": str(64 * 1024 * 1024) if cached else "0",
+        "DATABASE_URL": db_url,
+        "RAPIDAPI_KEY": "msh-benchmark",
+        "RAPIDAPI_SEARCH_URL": f"{standin_url}/rapidapi/item_search",
+        "META_API_BASE_URL": f"{standin_url}/meta/ads_archive",
+        "META_ACCESS_TOKEN": "benchmark",
+        "TRACKING_SCHEDULER_ENABLED": "false",
+        "DB_METRICS_LOG": "false",
+    }
+    os.environ.update(env)
+    return env
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], stderr=subprocess.DEVNULL) != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def percentile(samples: list, q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not samples:
+        return 0.0
+    return samples[max(0, math.ceil(q / 100 * len(samples)) - 1)]
+
+def summarize(samples: list, errors: int, db_queries: list, seconds: float) -> dict:
+    samples.sort()
+    done = len(samples)
+    return {
+        "requests": done,
+        "errors": errors,
+        "rps": round(done / seconds, 2) if seconds else 0.0,
+        "mean_ms": round(sum(samples) / done, 3) if done else 0.0,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p90_ms": round(percentile(samples, 90), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(samples[-1], 3) if done else 0.0,
+        "db_queries_avg": round(sum(db_queries) / len(db_queries), 2) if db_queries else None,
+    }
+
+async def run_scenario(client, name: str, ctx: dict, requests: int, concurrency: int, warmup: int) -> dict:
+    method, path, build = SCENARIOS[name]
+    for i in range(warmup):
+        await client.request(method, path, **build(i, ctx))
+
+    samples, db_queries = [], []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **build(warmup + i, ctx))
+                failed = response.status_code >= 400
+                if "x-db-queries" in response.headers:
+                    db_queries.append(int(response.headers["x-db-queries"]))
+            except Exception as e:
+                print(f"  {name}: {e!r}")
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, errors, db_queries, time.perf_counter() - start)
+
+def fallback_app(skipped: list):
+    """
+    The API routers that import cleanly, with the same DB instrumentation
+    headers as app.main, for when the full app can't be imported (--allow-partial-app).
+    Routers that fail to import are appended to skipped.
+    """
+    from fastapi import FastAPI, Request
+    from app.database import engine, start_query_stats, stop_query_stats
+    from app.search_index import ensure_search_indexes
+    from app.services.leaderboards import ensure_leaderboards
+
+    app = FastAPI(title="Benchmark app")
+    for module in ("products", "stores", "analysis", "ads", "product_search", "store_ai"):
+        try:
+            app.include_router(importlib.import_module(f"app.routers.{module}").router)
+        except Exception as e:
+            print(f"  SKIPPING router {module}: {e!r}")
+            skipped.append(module)
+
+    @app.middleware("http")
+    async def db_metrics(request: Request, call_next):
+        stats, token = start_query_stats()
+        try:
+            response = await call_next(request)
+        finally:
+            stop_query_stats(token)
+        response.headers["X-DB-Queries"] = str(stats.count)
+        return response
+
+    @app.on_event("startup")
+    async def startup():
+        ensure_search_indexes(engine)
+        ensure_leaderboards(engine)
+
+    return app
+
+def load_app(spec: str, allow_partial: bool = False) -> tuple:
+    """
+    (app, label, skipped routers) for an ASGI import spec. An import failure
+    is fatal unless allow_partial, which falls back to the routers that import.
+    """
+    module, _, attr = spec.partition(":")
+    try:
+        return getattr(importlib.import_module(module), attr or "app"), spec, []
+    except Exception as e:
+        if not allow_partial:
+            raise SystemExit(f"Could not import {spec}: {e!r} (--allow-partial-app benchmarks the routers that import)")
+        print(f"Could not import {spec} ({e!r}); benchmarking a PARTIAL app of the routers that import cleanly.")
+        skipped = []
+        app = fallback_app(skipped)
+        return app, "benchmarks.load:fallback_app", skipped
+
+def sample_domains(db_url: str, limit: int = 1000) -> list:
+    from sqlalchemy import create_engine, inspect, select
+    from app.models import GlobalStore
+    engine = create_engine(db_url)
+    try:
+        if not inspect(engine).has_table(GlobalStore.__tablename__):
+            return []
+        with engine.connect() as conn:
+            return list(conn.scalars(select(GlobalStore.canonical_domain).where(GlobalStore.canonical_domain.isnot(None)).limit(limit)))
+    finally:
+        engine.dispose()
+
+async def run(args, ctx: dict, names: list) -> dict:
+    import httpx
+    from benchmarks.standin import StandInTransport
+
+    results = {}
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=120,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+        async with client:
+            for name in names:
+                results[name] = await run_scenario(client, name, ctx, args.requests, args.concurrency, args.warmup)
+                print(f"  {name:<34} {results[name]['rps']:>9.1f} rps  p50 {results[name]['p50_ms']:>8.2f}ms  p99 {results[name]['p99_ms']:>8.2f}ms")
+        return results
+
+    from app.services import http_client
+    app, ctx["target"], ctx["skipped_routers"] = load_app(args.app, args.allow_partial_app)
+    async with app.router.lifespan_context(app):
+        # Outbound scans of any store domain go to the stand-in
+        http_client._client = http_client.create_async_client(StandInTransport(ctx["standin"]))
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench", timeout=120)
+        async with client:
+            for name in names:
+                results[name] = await run_scenario(client, name, ctx, args.requests, args.concurrency, args.warmup)
+                print(f"  {name:<34} {results[name]['rps']:>9.1f} rps  p50 {results[name]['p50_ms']:>8.2f}ms  p99 {results[name]['p99_ms']:>8.2f}ms")
+    return results
+
+def compare(baseline_path: str, report: dict):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline['meta']['commit']} ({baseline_path})")
+    if baseline["meta"].get("caches", "on") != report["meta"]["caches"]:
+        print(f"WARNING: caches {baseline['meta'].get('caches', 'on')} in the baseline, {report['meta']['caches']} now")
+    print(f"{'endpoint':<34} {'p50 ms':>20} {'p99 ms':>20} {'rps':>20}")
+
+    def delta(old, new):
+        change = (new - old) / old * 100 if old else 0.0
+        return f"{old:>7.1f}->{new:<7.1f}{change:+5.0f}%"
+
+    for name, now in report["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before:
+            print(f"{name:<34} {delta(before['p50_ms'], now['p50_ms']):>20} {delta(before['p99_ms'], now['p99_ms']):>20} {delta(before['rps'], now['rps']):>20}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k", help="Dataset scale: 10k, 1m or 10m")
+    parser.add_argument("--url", help="Benchmark database URL (default: bench_<scale>.db in the temp dir)")
+    parser.add_argument("--reseed", action="store_true", help="Regenerate the dataset even if the database has data")
+    parser.add_argument("--app", default="app.main:app", help="ASGI app to drive in-process")
+    parser.add_argument("--allow-partial-app", action="store_true",
+                        help="If --app fails to import, benchmark the routers that import instead of exiting")
+    parser.add_argument("--cached", action="store_true", help="Run with the response / scan caches on (reported separately)")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--standin-port", type=int, default=0, help="Stand-in port (default: any free port; 9100 with --base-url)")
+    parser.add_argument("--standin-latency-ms", type=float, default=0.0)
+    parser.add_argument("--only", help="Comma-separated scenario name prefixes")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Results file (default: benchmarks/results/<commit>-<scale>.json)")
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    parser.add_argument("--print-env", action="store_true", help="Print the server environment for --base-url runs and exit")
+    args = parser.parse_args()
+
+    from benchmarks import standin
+    db_url = args.url or "sqlite:///" + os.path.join(tempfile.gettempdir(), f"bench_{args.scale}.db")
+    standin_port = args.standin_port or (9100 if args.base_url or args.print_env else 0)
+    standin_url = f"http://127.0.0.1:{standin_port}"
+
+    env = configure_env(db_url, standin_url, args.cached)
+    if args.print_env:
+        print("\n".join(f"{k}={v}" for k, v in env.items()))
+        return
+
+    from benchmarks import dataset
+    if args.scale not in dataset.SCALES:
+        parser.error(f"--scale must be one of {', '.join(dataset.SCALES)}")
+    domains = sample_domains(db_url) if not args.reseed else []
+    if not domains:
+        from sqlalchemy import create_engine
+        n_stores, n_products = dataset.SCALES[args.scale]
+        print(f"Seeding {args.scale} dataset into {db_url} ...")
+        dataset.seed_database(create_engine(db_url), n_stores, n_products, args.seed)
+        domains = sample_domains(db_url)
+
+    server = None
+    if not args.base_url:
+        server, standin_url = standin.serve_in_thread(args.standin_port, args.standin_latency_ms)
+        configure_env(db_url, standin_url, args.cached)
+
+    rnd = random.Random(args.seed)
+    rnd.shuffle(domains)
+    ctx = {
+        "standin": standin_url,
+        "domains": domains,
+        # In-process, every store domain is routed to the stand-in; a remote
+        # server can only reach the stand-in by its own address
+        "scan_url": (lambda i: standin_url) if args.base_url else (lambda i: f"https://{domains[i % len(domains)]}"),
+    }
+    names = [n for n in SCENARIOS if not args.only or any(n.startswith(p) for p in args.only.split(","))]
+
+    print(f"Load test: {len(names)} scenarios x {args.requests} requests, concurrency {args.concurrency} "
+          f"({args.base_url or args.app}, {args.scale}, caches {'on' if args.cached else 'off'})")
+    try:
+        endpoints = asyncio.run(run(args, ctx, names))
+    finally:
+        if server:
+            server.should_exit = True
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "mode": "http" if args.base_url else "in-process",
+            "target": args.base_url or ctx.get("target", args.app),
+            "skipped_routers": ctx.get("skipped_routers", []),
+            "caches": "on" if args.cached else "off",
+            "scale": args.scale,
+            "database": db_url.split("@")[-1],
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "standin_latency_ms": args.standin_latency_ms,
+            "python": platform.python_version(),
+        },
+        "endpoints": endpoints,
+    }
+    path = args.json or os.path.join(RESULTS_DIR, f"{commit}-{args.scale}{'-cached' if args.cached else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Query-plan benchmark for the product/store search filter and sort combinations.
+
+Seeds a scratch database, runs every combination through the real router
+functions and reports p50/p99 latency plus the EXPLAIN plan of each statement.
+Run from backend/:
+
+    python -m benchmarks.query_plans --products 200000 --stores 10000
+    python -m benchmarks.query_plans --fail-on-scan     # exit 1 if a search does a full table scan
+    python -m benchmarks.query_plans --url postgresql://... --json plans.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.database import to_async_url
+from app.routers import products as products_router
+from app.routers import stores as stores_router
+from app.search_index import ensure_search_indexes
+from app.services.leaderboards import ensure_leaderboards
+from app.services.response_cache import response_cache
+from benchmarks.dataset import seed_database
+
+PRODUCT_CASES = [
+    ("default (revenue)", {}),
+    ("sort ads_count", {"sort_by": "ads_count"}),
+    ("sort price_low", {"sort_by": "price_low"}),
+    ("sort created_at", {"sort_by": "created_at"}),
+    ("preset recommended", {"preset": "recommended"}),
+    ("preset new_shops", {"preset": "new_shops"}),
+    ("preset active_ads", {"preset": "active_ads"}),
+    ("niche", {"niche": "Tech"}),
+    ("niche + country", {"niche": "Tech", "country": "US"}),
+    ("price range", {"min_price": 20, "max_price": 60}),
+    ("min revenue + ads", {"min_revenue": 20000, "min_ads": 50}),
+    ("keyword", {"keyword": "smart"}),
+    ("keyword relevance", {"keyword": "smart wat", "sort_by": "relevance"}),
+]
+
+STORE_CASES = [
+    ("default (revenue)", {}),
+    ("sort traffic", {"sort_by": "traffic"}),
+    ("sort ads", {"sort_by": "ads"}),
+    ("sort newest", {"sort_by": "newest"}),
+    ("niche", {"niche": "Tech"}),
+    ("country", {"country": "US"}),
+    ("niche + country", {"niche": "Tech", "country": "US"}),
+    ("min revenue + traffic", {"min_revenue": 100000, "min_traffic": 5000}),
+    ("keyword", {"keyword": "tech"}),
+]
+
+SCANNED_TABLES = ("global_products", "global_stores")
+
+def explain(engine, statements: list) -> list:
+    plans = []
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+            # sqlite: (id, parent, notused, detail); postgres: (line,)
+            plans.append([str(r[-1]) for r in rows])
+    return plans
+
+def full_scans(plan_lines: list) -> list:
+    hits = []
+    for line in plan_lines:
+        for table in SCANNED_TABLES:
+            sqlite_scan = (
+                line.strip().startswith(f"SCAN {table}")
+                and "USING" not in line
+                and "VIRTUAL TABLE" not in line
+            )
+            pg_scan = f"Seq Scan on {table}" in line
+            if sqlite_scan or pg_scan:
+                hits.append(line.strip())
+    return hits
+
+async def run_case(engine, async_engine, Session, kind: str, name: str, filters: dict, iterations: int, limit: int) -> dict:
+    if kind == "products":
+        search, model = products_router.search_products, products_router.ProductSearchFilter
+    else:
+        search, model = stores_router.search_stores, stores_router.StoreSearchFilter
+
+    async def call(cursor=None, include_total=False):
+        # Time the database path, not the response cache
+        response_cache.invalidate("products")
+        response_cache.invalidate("stores")
+        async with Session() as db:
+            return await search(filters=model(**filters), page=1, limit=limit, cursor=cursor,
+                                include_total=include_total, db=db)
+
+    # Capture the SQL of one first-page + one cursor-page call for EXPLAIN
+    captured = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        first = await call()
+        next_cursor = first.get("next_cursor")
+        if next_cursor:
+            await call(cursor=next_cursor)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+    timings = {}
+    modes = [("first_page", {}), ("count", {"include_total": True})]
+    if next_cursor:
+        modes.append(("cursor_page", {"cursor": next_cursor}))
+    for mode, kwargs in modes:
+        samples = []
+        for _ in range(iterations):
+            if mode == "count":
+                # Measure the real COUNT, not the cache
+                products_router.count_cache.clear()
+                stores_router.count_cache.clear()
+            start = time.perf_counter()
+            await call(**kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        timings[mode] = {
+            "p50_ms": round(statistics.median(samples), 3),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+        }
+
+    plans = explain(engine, captured)
+    return {
+        "kind": kind,
+        "case": name,
+        "filters": filters,
+        "timings": timings,
+        "statements": [s for s, _ in captured],
+        "plans": plans,
+        "full_scans": sorted({hit for plan in plans for hit in full_scans(plan)}),
+    }
+
+async def run_cases(engine, url: str, iterations: int, limit: int) -> list:
+    # The routers run on AsyncSession, so drive them through the async driver
+    async_engine = create_async_engine(to_async_url(url))
+    Session = async_sessionmaker(async_engine, expire_on_commit=False)
+    results = []
+    try:
+        for kind, cases in (("products", PRODUCT_CASES), ("stores", STORE_CASES)):
+            for name, filters in cases:
+                results.append(await run_case(engine, async_engine, Session, kind, name, filters, iterations, limit))
+    finally:
+        await async_engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Database URL (default: scratch SQLite file)")
+    parser.add_argument("--stores", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the data already in --url")
+    parser.add_argument("--json", help="Write full results (timings + plans) to this file")
+    parser.add_argument("--show-plans", action="store_true")
+    parser.add_argument("--fail-on-scan", action="store_true", help="Exit 1 if any search does a full table scan")
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.gettempdir(), "query_plans_bench.db")
+    engine = create_engine(url)
+
+    if not args.no_seed:
+        start = time.perf_counter()
+        seed_database(engine, args.stores, args.products)
+        print(f"Seeded {args.stores} stores / {args.products} products in {time.perf_counter() - start:.1f}s ({url})")
+    else:
+        ensure_search_indexes(engine)
+        ensure_leaderboards(engine)
+
+    results = asyncio.run(run_cases(engine, url, args.iterations, args.limit))
+
+    print(f"\n{'endpoint':<9} {'case':<22} {'page1 p50':>10} {'p99':>8} {'cursor p50':>11} {'p99':>8} {'count p50':>10}  scans")
+    for r in results:
+        t = r["timings"]
+        cursor = t.get("cursor_page", {"p50_ms": float("nan"), "p99_ms": float("nan")})
+        print(
+            f"{r['kind']:<9} {r['case']:<22} {t['first_page']['p50_ms']:>10.2f} {t['first_page']['p99_ms']:>8.2f} "
+            f"{cursor['p50_ms']:>11.2f} {cursor['p99_ms']:>8.2f} {t['count']['p50_ms']:>10.2f}  "
+            f"{'; '.join(r['full_scans']) or '-'}"
+        )
+        if args.show_plans:
+            for statement, plan in zip(r["statements"], r["plans"]):
+                print("    " + " ".join(statement.split())[:160])
+                for line in plan:
+                    print("      " + line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": engine.url.render_as_string(hide_password=True), "stores": args.stores,
+                       "products": args.products, "results": results}, f, indent=2, default=str)
+        print(f"\nResults written to {args.json}")
+
+    if args.fail_on_scan and any(r["full_scans"] for r in results):
+        print("\nFull table scans detected.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Local stand-in for the third-party services the API calls, so benchmarks
+never touch the network:
+
+    GET /                   Shopify-like storefront HTML (title, currency, pixels)
+    GET /products.json      paginated catalog (?limit=&page=)
+    GET /products/{handle}  product page with Open Graph tags
+    GET /rapidapi/item_search   AliExpress DataHub search response
+    GET /meta/ads_archive       Meta Ad Library ads_archive response
+
+Responses are derived from the Host header, so every store host gets its own
+stable catalog. Like Shopify, responses carry an ETag and answer a matching
+If-None-Match with 304. STANDIN_LATENCY_MS adds a fixed delay per response to mimic
+a remote upstream. Run standalone from backend/:
+
+    python -m benchmarks.standin --port 9100 --latency-ms 50
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import socket
+import threading
+import time
+import zlib
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, Response
+
+STANDIN_LATENCY_MS = float(os.getenv("STANDIN_LATENCY_MS", "0"))
+WORDS = ["smart", "watch", "lamp", "collar", "serum", "bottle", "blender", "yoga", "mat", "drone", "leggings", "sneakers"]
+
+app = FastAPI(title="Benchmark stand-in")
+app.state.latency_ms = STANDIN_LATENCY_MS
+
+@app.middleware("http")
+async def etags(request: Request, call_next):
+    response = await call_next(request)
+    if request.method != "GET" or response.status_code != 200:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"etag": etag})
+    headers = dict(response.headers)
+    headers["etag"] = etag
+    return Response(body, status_code=200, headers=headers)
+
+def _host(request: Request) -> str:
+    return (request.headers.get("host") or "store.test").split(":")[0]
+
+def _rnd(*parts) -> random.Random:
+    return random.Random(zlib.crc32(":".join(map(str, parts)).encode()))
+
+def catalog_size(host: str) -> int:
+    return 20 + zlib.crc32(host.encode()) % 600
+
+async def _delay(request: Request):
+    if request.app.state.latency_ms:
+        await asyncio.sleep(request.app.state.latency_ms / 1000)
+
+def _product(host: str, index: int) -> dict:
+    rnd = _rnd(host, index)
+    title = " ".join(rnd.sample(WORDS, 3)).title()
+    return {
+        "id": zlib.crc32(f"{host}:{index}".encode()),
+        "title": title,
+        "handle": f"{title.lower().replace(' ', '-')}-{index}",
+        "variants": [{"price": f"{rnd.uniform(5, 150):.2f}"}],
+        "images": [{"src": f"https://cdn.shopify.com/s/files/{index}.jpg"}],
+    }
+
+@app.get("/", response_class=HTMLResponse)
+async def storefront(request: Request):
+    await _delay(request)
+    host = _host(request)
+    rnd = _rnd(host)
+    currency = rnd.choice(["USD", "EUR", "GBP", "CAD", "AUD"])
+    pixels = "<script>fbq('init','1');</script>" if rnd.random() > 0.3 else ""
+    return f"""<!doctype html>
+<html lang="en"><head>
+<title>{host.split('.')[0].title()} | Official Store</title>
+<meta property="og:title" content="{host}">
+<script>var Shopify = Shopify || {{}}; Shopify.theme = {{"name":"Dawn"}}; Shopify.currency = {{"active":"{currency}"}};
+window.meta = {{"currency":"{currency}"}};</script>
+<link rel="stylesheet" href="https://cdn.shopify.com/s/files/theme.css">
+{pixels}
+</head><body><h1>{host}</h1></body></html>"""
+
+@app.get("/products.json")
+async def products_json(request: Request, limit: int = 30, page: int = 1):
+    await _delay(request)
+    host = _host(request)
+    limit = max(1, min(limit, 250))
+    start = (max(page, 1) - 1) * limit
+    end = min(start + limit, catalog_size(host))
+    return {"products": [_product(host, i) for i in range(start, end)]}
+
+@app.get("/products/{handle}", response_class=HTMLResponse)
+async def product_page(request: Request, handle: str):
+    await _delay(request)
+    title = handle.replace("-", " ").title()
+    return f"""<!doctype html>
+<html><head><title>{title}</title>
+<meta property="og:title" content="{title}">
+<meta property="og:image" content="https://cdn.shopify.com/s/files/{handle}.jpg">
+<meta property="og:description" content="The best {title.lower()} around.">
+<meta property="product:price:amount" content="24.99">
+</head><body><img src="/cdn/{handle}-1.jpg"><img src="/cdn/{handle}-2.jpg"></body></html>"""
+
+@app.get("/rapidapi/item_search")
+async def rapidapi_item_search(request: Request, q: str = "", page: int = 1):
+    await _delay(request)
+    rnd = _rnd("rapidapi", q, page)
+    return {"result": {"resultList": [
+        {
+            "itemId": rnd.randint(10**11, 10**12),
+            "title": f"{q.title()} {' '.join(rnd.sample(WORDS, 2))}",
+            "priceInfo": {"price": f"{rnd.uniform(2, 80):.2f}"},
+            "image": "https://ae01.alicdn.com/kf/bench.jpg",
+            "rating": {"starRating": round(rnd.uniform(3.5, 5), 1)},
+            "trade": {"tradeDesc": f"{rnd.randint(10, 9000)} sold"},
+        }
+        for _ in range(20)
+    ]}}
+
+@app.get("/meta/ads_archive")
+async def meta_ads_archive(request: Request, search_terms: str = "", limit: int = 20, after: str = None):
+    await _delay(request)
+    offset = int(after) if after and after.isdigit() else 0
+    rnd = _rnd("meta", search_terms, offset)
+    ads = [
+        {
+            "id": str(rnd.randint(10**14, 10**15)),
+            "ad_creation_time": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T10:00:00+0000",
+            "ad_creative_bodies": [f"Shop {search_terms} today"],
+            "ad_creative_link_captions": ["Shop Now"],
+            "ad_snapshot_url": "https://www.facebook.com/ads/archive/render_ad/",
+            "publisher_platforms": ["facebook", "instagram"],
+        }
+        for _ in range(max(1, min(limit, 100)))
+    ]
+    return {"data": ads, "paging": {"cursors": {"after": str(offset + len(ads))}}}
+
+class StandInTransport(httpx.AsyncBaseTransport):
+    """
+    Sends every request of an httpx client to the stand-in, keeping the
+    original Host header, so scans of arbitrary store domains land on it.
+    """
+    def __init__(self, base_url: str):
+        target = httpx.URL(base_url)
+        self.host, self.port = target.host, target.port
+        self.transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme="http", host=self.host, port=self.port)
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def serve_in_thread(port: int = 0, latency_ms: float = STANDIN_LATENCY_MS):
+    """
+    Starts the stand-in on 127.0.0.1 in a daemon thread.
+    Returns (server, base_url); set server.should_exit = True to stop it.
+    """
+    app.state.latency_ms = latency_ms
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Stand-in server did not start")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=STANDIN_LATENCY_MS)
+    args = parser.parse_args()
+    app.state.latency_ms = args.latency_ms
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
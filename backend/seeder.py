@@ -1,27 +1,16 @@
 import sys
 import os
+import argparse
 
 # Fix Path to allow imports from 'app'
 # We are in /backend, and we want to import 'app' which is in /backend.
 # So we add the current directory to sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import SessionLocal, text, engine, Base
-from app.models import GlobalStore, GlobalProduct
+from app.database import engine, Base
+from sqlalchemy import text
+from app.services.bulk_ingest import BulkIngestor
 import random
-from datetime import datetime
-
-# Initialize Tables (if not already done by main app)
-Base.metadata.create_all(bind=engine)
-
-db = SessionLocal()
-
-# Cleanup old data
-db.execute(text("DELETE FROM global_products"))
-db.execute(text("DELETE FROM global_stores"))
-db.commit()
-
-print("🧹 Old data cleaned.")
 
 # Mock Data Sources
 NICHES = ['Fashion', 'Health', 'Tech', 'Home', 'Pets', 'Beauty']
@@ -35,44 +24,60 @@ IMAGES = [
     'https://images.unsplash.com/photo-1523275335684-37898b6baf30?auto=format&fit=crop&q=80&w=200'
 ]
 
-stores = []
+def generate_stores(count: int):
+    for i in range(count):
+        yield {
+            "name": f"Store_{i}_{random.randint(100,999)}",
+            "url": f"store{i}.com",
+            "logo_url": f"https://ui-avatars.com/api/?name=S{i}&background=random",
+            "niche": random.choice(NICHES),
+            "country": random.choice(COUNTRIES),
+            "monthly_revenue": random.uniform(5000, 500000),
+            "active_ads": random.randint(0, 5000)
+        }
+
+def generate_products(count: int, stores: list):
+    for i in range(count):
+        store = random.choice(stores)
+        yield {
+            "store_url": store["url"],
+            "title": f"Premium {store['niche']} Product {i}",
+            "handle": f"premium-product-{i}",
+            "image_url": random.choice(IMAGES),
+            "price": round(random.uniform(10.0, 150.0), 2),
+            "revenue_est": round(random.uniform(1000.0, 50000.0), 2),
+            "ads_count": random.randint(0, store["active_ads"]),
+            "traffic_growth": round(random.uniform(-20.0, 100.0), 2),
+            "is_winner": random.random() > 0.8,
+            "is_new": random.random() > 0.9
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the spy database with mock stores/products.")
+    parser.add_argument("--stores", type=int, default=50)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Upsert into the existing data instead of wiping it")
+    args = parser.parse_args()
 
-# Create 50 Mock Stores
-for i in range(50):
-    store = GlobalStore(
-        name=f"Store_{i}_{random.randint(100,999)}",
-        url=f"store{i}.com",
-        logo_url=f"https://ui-avatars.com/api/?name=S{i}&background=random",
-        niche=random.choice(NICHES),
-        country=random.choice(COUNTRIES),
-        monthly_revenue=random.uniform(5000, 500000),
-        active_ads=random.randint(0, 5000)
-    )
-    db.add(store)
-    stores.append(store)
+    # Initialize Tables (if not already done by main app)
+    Base.metadata.create_all(bind=engine)
+    # Full-text triggers keep the keyword index in sync while we insert
+    from app.search_index import ensure_search_indexes
+    ensure_search_indexes(engine)
 
-db.commit() # Commit to get IDs
+    if not args.keep:
+        # Cleanup old data
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM global_products"))
+            conn.execute(text("DELETE FROM global_stores"))
+        print("🧹 Old data cleaned.")
 
-# Create 200 Mock Products
-print(f"🏪 Created {len(stores)} stores.")
+    ingestor = BulkIngestor()
 
-for i in range(200):
-    store = random.choice(stores)
-    prod = GlobalProduct(
-        store_id=store.id,
-        title=f"Premium {store.niche} Product {i}",
-        handle=f"premium-product-{i}",
-        image_url=random.choice(IMAGES),
-        price=round(random.uniform(10.0, 150.0), 2),
-        revenue_est=round(random.uniform(1000.0, 50000.0), 2),
-        ads_count=random.randint(0, store.active_ads),
-        traffic_growth=round(random.uniform(-20.0, 100.0), 2),
-        is_winner=random.random() > 0.8,
-        is_new=random.random() > 0.9
-    )
-    db.add(prod)
+    stores = list(generate_stores(args.stores))
+    print(f"🏪 {ingestor.ingest_stores(stores)}")
+    print(f"📦 {ingestor.ingest_products(generate_products(args.products, stores))}")
 
-db.commit()
-print("📦 Created 200 products.")
-print("✅ Seeding Complete!")
-db.close()
+    # Bulk writes bypass the ORM hooks: drop cached responses, rebuild leaderboards
+    ingestor.finish()
+    print("✅ Seeding Complete!")
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Own throwaway database, set before app.database builds its engines
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+from sqlalchemy import create_engine, select
+from app.models import Base, GlobalStore
+from app.services.bulk_ingest import BulkIngestor
+
+def test_partial_record_keeps_columns_it_did_not_supply():
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "ingest.db"))
+    Base.metadata.create_all(engine)
+    ingestor = BulkIngestor(engine)
+    ingestor.ingest_stores([
+        {"url": "https://a.com", "name": "A", "niche": "Tech", "monthly_revenue": 100},
+        {"url": "https://b.com", "name": "B", "niche": "Home", "monthly_revenue": 200},
+    ])
+    # Same batch: a.com supplies a new niche, b.com only its revenue
+    ingestor.ingest_stores([
+        {"url": "https://a.com", "niche": "Fashion"},
+        {"url": "https://b.com", "monthly_revenue": 250},
+    ])
+    with engine.connect() as conn:
+        rows = {r.canonical_domain: r for r in conn.execute(select(GlobalStore.__table__))}
+    assert (rows["a.com"].niche, rows["a.com"].monthly_revenue) == ("Fashion", 100)
+    assert (rows["b.com"].niche, rows["b.com"].monthly_revenue) == ("Home", 250)
+    assert rows["a.com"].name == "A"
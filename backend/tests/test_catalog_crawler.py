@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from app.services.catalog_crawler import CatalogCrawler, CatalogPage, CatalogStats, PRODUCTS_PAGE_SIZE
+
+class FakeCrawler(CatalogCrawler):
+    """
+    Pages 1..last are full (the last one short); delays / failures per page.
+    """
+    def __init__(self, last: int, delays: dict = None, failing: set = ()):
+        super().__init__(client=object(), concurrency=4)
+        self.last = last
+        self.delays = delays or {}
+        self.failing = failing
+
+    async def fetch_page(self, base_url: str, page: int):
+        await asyncio.sleep(self.delays.get(page, 0.001))
+        if page in self.failing:
+            return None
+        count = PRODUCTS_PAGE_SIZE if page < self.last else (1 if page == self.last else 0)
+        return CatalogPage([{"id": page * 1000 + i, "variants": [{"price": "1"}]} for i in range(count)])
+
+def crawl(crawler) -> tuple:
+    pages = []
+    stats = CatalogStats()
+
+    def on_page(page, summary):
+        pages.append(page)
+        stats.add_page(page, summary)
+
+    async def run():
+        return await crawler.crawl("https://shop.com", on_page)
+
+    return asyncio.run(run()), pages, stats
+
+def test_pages_are_handed_over_in_order():
+    last, pages, stats = crawl(FakeCrawler(last=6, delays={2: 0.05}))
+    assert last == 6
+    assert pages == [1, 2, 3, 4, 5, 6]
+    assert stats.count == 5 * PRODUCTS_PAGE_SIZE + 1
+
+def test_failed_page_drops_the_pages_after_it_and_raises():
+    pages = []
+    crawler = FakeCrawler(last=10, delays={4: 0.05}, failing={4})
+    with pytest.raises(RuntimeError, match="page 4"):
+        asyncio.run(crawler.crawl("https://shop.com", lambda page, summary: pages.append(page)))
+    # Pages 5+ may have been fetched meanwhile, but are not counted
+    assert pages == [1, 2, 3]
@@ -0,0 +1,17 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import engine, start_query_stats, stop_query_stats
+
+def test_invalid_statement_raises_operational_error():
+    stats, token = start_query_stats()
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM nonexist"))
+            # The failed statement's timing entry was discarded
+            assert not conn.info.get("query_start")
+            conn.execute(text("SELECT 1"))
+    finally:
+        stop_query_stats(token)
+    assert stats.count == 1
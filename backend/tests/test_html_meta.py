@@ -0,0 +1,28 @@
+from app.services.html_meta import PageMeta, TITLE_SCAN_LIMIT, extract_meta
+
+def test_title_in_body_is_found():
+    html = (
+        "<html><head><meta charset='utf-8'></head><body>"
+        "<svg><title>Cart icon</title></svg>"
+        "<title>Linen Shirt</title><meta property='og:image' content='https://cdn.shop.com/shirt.jpg'>"
+        "<p>rest of the page</p></body></html>"
+    )
+    page = extract_meta(html)
+    assert page.title == "Linen Shirt"
+    assert page.og("image") == "https://cdn.shop.com/shirt.jpg"
+
+def test_head_title_stops_at_body():
+    page = extract_meta("<html><head><title>Shop</title></head><body><title>Other</title><meta property='og:image' content='x'>")
+    assert page.title == "Shop"
+    assert page.done
+
+def test_missing_title_scan_is_capped():
+    page = PageMeta()
+    page.feed("<html><head></head><body>")
+    assert not page.head_final
+    filler = "<p>" + "x" * 1000 + "</p>"
+    while not page.head_final:
+        page.feed(filler * 16)
+    page.feed("<title>Too late</title>")
+    assert page.title is None and page.done
+    assert page._fed < TITLE_SCAN_LIMIT + 64 * 1024
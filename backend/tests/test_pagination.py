@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from sqlalchemy import asc, create_engine, desc, select
+from sqlalchemy.orm import Session
+from app.models import Base, GlobalProduct
+from app.pagination import decode_cursor, encode_cursor, keyset_filter, null_tail_filter
+
+def walk(session, col, descending: bool, limit: int) -> list:
+    # Same paging as the product / store listings
+    direction = desc if descending else asc
+    query = select(GlobalProduct).order_by(direction(col).nulls_last(), direction(GlobalProduct.id))
+    seen, cursor = [], None
+    while True:
+        if cursor:
+            after = decode_cursor(cursor, col.key)
+            rows = session.scalars(query.filter(keyset_filter(col, GlobalProduct.id, after, descending)).limit(limit)).all()
+            tail = null_tail_filter(col, after)
+            if tail is not None and len(rows) < limit:
+                rows += session.scalars(query.filter(tail).limit(limit - len(rows))).all()
+        else:
+            rows = session.scalars(query.limit(limit)).all()
+        seen += [row.id for row in rows]
+        if len(rows) < limit:
+            return seen
+        cursor = encode_cursor(col.key, getattr(rows[-1], col.key), rows[-1].id)
+
+def test_keyset_pages_cover_null_sort_values_once():
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "pages.db"))
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(GlobalProduct(id=i, handle=f"p{i}", price=None if i % 3 == 0 else float(i % 7)) for i in range(1, 41))
+        session.commit()
+        for descending in (True, False):
+            direction = desc if descending else asc
+            expected = session.scalars(
+                select(GlobalProduct.id).order_by(direction(GlobalProduct.price).nulls_last(), direction(GlobalProduct.id))
+            ).all()
+            for limit in (1, 4, 7, 13):
+                assert walk(session, GlobalProduct.price, descending, limit) == expected
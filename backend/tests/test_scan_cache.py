@@ -0,0 +1,40 @@
+import httpx
+from app.services.catalog_crawler import CatalogCrawler, CatalogStats, PRODUCTS_PAGE_SIZE
+from app.services.scan_cache import ScanCache, object_size
+
+def products_page(n: int) -> httpx.Response:
+    products = [
+        {"id": i, "title": f"Product {i}", "handle": f"product-{i}", "body_html": "<p>" + "x" * 2000 + "</p>",
+         "variants": [{"price": "10.00"}], "images": [{"src": f"https://cdn.shop.com/{i}.jpg"}]}
+        for i in range(n)
+    ]
+    return httpx.Response(200, json={"products": products}, headers={"etag": '"v1"'})
+
+def test_catalog_page_is_cached_as_a_projection_at_its_memory_size():
+    cache = ScanCache(max_bytes=1024 * 1024)
+    res = products_page(PRODUCTS_PAGE_SIZE)
+    summary = CatalogCrawler.parse_page(res)
+    cache.store("shop.com/products.json?page=1", res, summary)
+
+    assert cache.bytes == object_size(summary)
+    # A few products' worth, not the ~half-megabyte page
+    assert cache.bytes < len(res.content) // 50
+
+    stats = CatalogStats(top_n=5)
+    stats.add_page(1, summary)
+    assert (stats.count, stats.avg_price) == (PRODUCTS_PAGE_SIZE, 10.0)
+    assert [p["handle"] for p in stats.top_products] == [f"product-{i}" for i in range(5)]
+
+def test_key_separates_scheme_and_port():
+    assert ScanCache.key("https://www.Shop.com:443/products.json", {"page": 2}) == "https://shop.com/products.json?page=2"
+    assert ScanCache.key("shop.com") == "https://shop.com/"
+    assert ScanCache.key("http://shop.com") == "http://shop.com/"
+    assert ScanCache.key("http://shop.com:8080") == "http://shop.com:8080/"
+
+def test_invalidate_domain_drops_every_scheme_and_port():
+    cache = ScanCache()
+    res = httpx.Response(200, json={})
+    for url in ("https://shop.com/", "http://shop.com:8080/a", "https://shop.com.au/", "https://eu.shop.com/"):
+        cache.store(ScanCache.key(url), res, {"url": url})
+    cache.invalidate_domain("www.shop.com")
+    assert sorted(cache._entries) == ["https://eu.shop.com/", "https://shop.com.au/"]
@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from app import search_index
+from app.models import Base, GlobalProduct
+from app.search_index import ensure_search_indexes, keyword_matches
+
+def test_keyword_matches_word_prefixes_not_substrings():
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "search.db"))
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(GlobalProduct(id=i, handle=f"p{i}", title=title) for i, title in enumerate(
+            ["Cotton Shirt", "Shirts 3-pack", "Red tshirt", "Smart Watch", "T-Shirt dress"], start=1
+        ))
+        db.commit()
+    try:
+        ensure_search_indexes(engine)
+        assert search_index.SEARCH_BACKEND == "sqlite"
+        with Session(engine) as db:
+            def ids(keyword):
+                matches = keyword_matches("products", keyword)
+                return sorted(db.scalars(select(matches.c.id)))
+            # Whole words and word prefixes; "tshirt" is one word, so no match
+            assert ids("shirt") == [1, 2, 5]
+            assert ids("SMA wat") == [4]
+            assert ids("tshirt") == [3]
+            assert ids("hirt") == []
+    finally:
+        search_index.SEARCH_BACKEND = None
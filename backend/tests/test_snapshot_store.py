@@ -0,0 +1,22 @@
+import os
+import tempfile
+from datetime import datetime
+
+from app.scraper.snapshot_store import SnapshotStore
+
+def products(price: float) -> list:
+    return [{"id": 1, "variants": [{"id": 10, "price": price, "inventory_quantity": 5}, {"id": 11, "price": price}]}]
+
+def test_append_after_torn_write_is_readable():
+    store = SnapshotStore(tempfile.mkdtemp())
+    path = store.append("shop.com", products(10), crawled_at=datetime(2025, 1, 1))
+    complete = os.path.getsize(path)
+    # Interrupted crawl: half a block at the end of the file
+    store.append("shop.com", products(20), crawled_at=datetime(2025, 1, 2))
+    with open(path, "r+b") as f:
+        f.truncate(complete + (os.path.getsize(path) - complete) // 2)
+
+    store.append("shop.com", products(30), crawled_at=datetime(2025, 1, 3))
+    with store.open("shop.com") as snap:
+        assert [c.crawled_at_dt for c in snap.crawls] == [datetime(2025, 1, 1), datetime(2025, 1, 3)]
+        assert snap.crawls[-1].variant_index() == {10: (5, True, 30.0), 11: (None, True, 30.0)}
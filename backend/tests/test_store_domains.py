@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+from sqlalchemy import create_engine, inspect, text
+from app.store_domains import INDEX_NAME, ensure_canonical_domains
+
+def test_ensure_backfills_a_store_table_that_predates_canonical_domain():
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "old.db"))
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE global_stores (id INTEGER PRIMARY KEY, name VARCHAR, url VARCHAR)"))
+        conn.execute(text(
+            "INSERT INTO global_stores (id, url) VALUES "
+            "(1, 'https://www.shop.com'), (2, 'other.com'), (3, 'http://shop.com/'), (4, '')"
+        ))
+
+    ensure_canonical_domains(engine)
+    ensure_canonical_domains(engine) # already done: no-op
+
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT id, canonical_domain FROM global_stores")).all())
+    # Same domain as store 1: left NULL instead of failing the unique index
+    assert rows == {1: "shop.com", 2: "other.com", 3: None, 4: None}
+    indexes = {i["name"]: i for i in inspect(engine).get_indexes("global_stores")}
+    assert indexes[INDEX_NAME]["unique"]
@@ -0,0 +1,39 @@
+import asyncio
+from datetime import date, timedelta
+
+from app.database import AsyncSessionLocal, Base, SessionLocal, engine
+from app.models import GlobalStore, StoreHistory
+from app.routers.analysis import analyze_store
+from app.services.store_history import StoreHistoryRecorder, months_back
+
+def test_analyze_store_returns_recorded_history():
+    Base.metadata.create_all(engine)
+    today = date.today()
+    with SessionLocal() as db:
+        store = GlobalStore(url="https://history-shop.com", canonical_domain="history-shop.com", name="History",
+                            niche="Tech", country="US", monthly_revenue=1000, traffic=500, active_ads=1)
+        db.add(store)
+        db.commit()
+        store_id = store.id
+
+    recorder = StoreHistoryRecorder()
+    # Two months ago (compacted into week / month buckets by the later runs), then today
+    recorder.run_daily(months_back(today, 2) + timedelta(days=3))
+    with SessionLocal() as db:
+        db.get(GlobalStore, store_id).monthly_revenue = 3000
+        db.commit()
+    recorder.run_daily(today)
+    with SessionLocal() as db:
+        db.get(GlobalStore, store_id).monthly_revenue = 9999 # live value, not yet snapshotted
+        db.commit()
+        assert db.query(StoreHistory).filter(StoreHistory.store_id == store_id).count() == 2
+
+    async def analyze():
+        async with AsyncSessionLocal() as db:
+            return await analyze_store(url="history-shop.com", db=db)
+
+    response = asyncio.run(analyze())
+    assert [point["date"] for point in response.revenue_history] == [
+        months_back(today, 2).strftime("%b"), today.strftime("%b")
+    ]
+    assert [point["value"] for point in response.revenue_history] == [1000, 3000]
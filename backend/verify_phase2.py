@@ -3,6 +3,7 @@ import os
 from app.scraper.detector import ShopifyDetector
 from app.scraper.tracker import StealthTracker
 from app.scraper.engine import SalesEngine
+from app.scraper.browser_pool import close_browser_pool
 
 async def verify_phase_2():
     print("--- Starting Phase 2 Verification ---")
@@ -17,7 +18,7 @@ async def verify_phase_2():
     
     print("\n[Detector Test]")
     for url, expected in stores:
-        result = detector.is_shopify(url)
+        result = await detector.is_shopify(url)
         status = "PASS" if result == expected else "FAIL"
         print(f"Store: {url} | Expected: {expected} | Got: {result} | [{status}]")
 
@@ -30,48 +31,47 @@ async def verify_phase_2():
     
     print(f"Fetching Snapshot 1 from {target_store}...")
     file1 = await tracker.fetch_products(target_store)
+    await close_browser_pool()
     
     if not file1:
         print("Failed to fetch Snapshot 1. Aborting.")
         return
 
     print("Simulating time jump (Mocking data for Snapshot 2)...")
-    # To test the engine without waiting hours, we will create a mock Snapshot 2 based on Snapshot 1
+    # To test the engine without waiting hours, we will append a mock Snapshot 2 based on Snapshot 1
     # We will manually decrement inventory of the first product's first variant
-    import json
-    with open(file1, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    from app.scraper.snapshot_store import SnapshotFile
+    with SnapshotFile(file1) as snap:
+        products = list(snap.crawls[-1].iter_products())
     
     # Modify data
     modified = False
-    if data.get('products'):
-        product = data['products'][0]
+    if products:
+        product = products[0]
         variant = product['variants'][0]
         
         # Scenario A: Inventory Quantity exists
         if 'inventory_quantity' in variant:
-            print(f"Modifying inventory for {product['title']} - {variant['title']}")
+            print(f"Modifying inventory for product {product['id']} - variant {variant['id']}")
             original_qty = variant['inventory_quantity']
             variant['inventory_quantity'] = original_qty - 5 # Sold 5
             modified = True
             
         # Scenario B: No inventory, simulate Sold Out
         else:
-             print(f"Modifying status for {product['title']} - {variant['title']}")
+             print(f"Modifying status for product {product['id']} - variant {variant['id']}")
              variant['available'] = False
              modified = True
     
     if modified:
-        # Save as snapshot 2
-        file2 = file1.replace(".json", "_mock_v2.json")
-        with open(file2, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        # Append as snapshot 2 (second crawl in the same store file)
+        file2 = tracker.store.append(os.path.basename(file1)[:-len(".snap")], products)
             
-        print(f"Created Mock Snapshot 2: {file2}")
+        print(f"Appended Mock Snapshot 2 to: {file2}")
         
         # Run Engine
         print("Running Sales Engine...")
-        report_path = engine.compare_snapshots(file1, file2)
+        report_path = engine.compare_crawls(file2)
         
         if report_path:
              print(f"SUCCESS: Artifact generated at {report_path}")
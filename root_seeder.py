@@ -1,36 +1,28 @@
 import sys
 import os
 
-# Ensure backend can be imported
-sys.path.append(os.getcwd())
+# Ensure backend can be imported (app.* lives in backend/)
+sys.path.append(os.path.join(os.getcwd(), "backend"))
 
-from backend.app.database import SessionLocal, engine, Base
-from backend.app.models import GlobalStore, GlobalProduct
+from app.database import engine, Base
+from app.services.bulk_ingest import BulkIngestor
 from sqlalchemy import text
 import random
 
 # Start fresh
 try:
-    db = SessionLocal()
-    db.execute(text("DROP TABLE IF EXISTS global_products"))
-    db.execute(text("DROP TABLE IF EXISTS global_stores"))
-    db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS global_products"))
+        conn.execute(text("DROP TABLE IF EXISTS global_stores"))
     print("🗑️ Dropped old tables.")
 except Exception as e:
     print(f"⚠️ Drop warning: {e}")
 
 # Initialize Tables
 Base.metadata.create_all(bind=engine)
-
-# Cleanup
-try:
-    db.execute(text("DELETE FROM global_products"))
-    db.execute(text("DELETE FROM global_stores"))
-    db.commit()
-    print("🧹 Database cleaned.")
-except Exception as e:
-    print(f"⚠️ Clean warning: {e}")
-    db.rollback()
+# Full-text triggers keep the keyword index in sync while we insert
+from app.search_index import ensure_search_indexes
+ensure_search_indexes(engine)
 
 # Constants
 NICHES = ['Fashion', 'Health/Beauty', 'Electronics', 'Home/Garden', 'Pets', 'Fitness']
@@ -51,46 +43,46 @@ stores = []
 print("🏗️ Generating 50 Stores...")
 for i in range(50):
     niche = random.choice(NICHES)
-    store = GlobalStore(
-        name=f"{niche} Haven {i}",
-        url=f"www.{niche.lower().replace('/', '')}{i}.com",
-        logo_url=f"https://ui-avatars.com/api/?name={niche[0]}+{i}&background=random&color=fff",
-        niche=niche,
-        country=random.choice(COUNTRIES),
-        monthly_revenue=random.uniform(1000, 500000),
-        orders_est=random.randint(50, 5000),
-        product_count=random.randint(10, 2000),
-        active_ads=random.randint(0, 500),
-        traffic=random.randint(1000, 100000),
-        traffic_growth=round(random.uniform(-20, 150), 2),
-        main_traffic_source=random.choice(['Facebook Ads', 'Google Ads', 'Direct', 'TikTok Ads', 'SEO']),
-        pixels=random.choice(['FB,TikTok', 'FB', 'Google', 'None'])
-    )
-    db.add(store)
-    stores.append(store)
+    stores.append({
+        "name": f"{niche} Haven {i}",
+        "url": f"www.{niche.lower().replace('/', '')}{i}.com",
+        "logo_url": f"https://ui-avatars.com/api/?name={niche[0]}+{i}&background=random&color=fff",
+        "niche": niche,
+        "country": random.choice(COUNTRIES),
+        "monthly_revenue": random.uniform(1000, 500000),
+        "orders_est": random.randint(50, 5000),
+        "product_count": random.randint(10, 2000),
+        "active_ads": random.randint(0, 500),
+        "traffic": random.randint(1000, 100000),
+        "traffic_growth": round(random.uniform(-20, 150), 2),
+        "main_traffic_source": random.choice(['Facebook Ads', 'Google Ads', 'Direct', 'TikTok Ads', 'SEO']),
+        "pixels": random.choice(['FB,TikTok', 'FB', 'Google', 'None'])
+    })
 
-db.commit()
+ingestor = BulkIngestor()
+ingestor.ingest_stores(stores)
 
 print("📦 Generating 300 Products...")
+products = []
 for i in range(300):
-    store = random.choice(stores)
+    index = random.randrange(len(stores))
+    store = stores[index]
     price = round(random.uniform(15.0, 120.0), 2)
-    ads = random.randint(0, store.active_ads)
-    
-    prod = GlobalProduct(
-        store_id=store.id,
-        title=f"Viral {store.niche} Product {i}",
-        handle=f"viral-{store.niche.lower()}-{i}",
-        image_url=random.choice(IMAGES),
-        price=price,
-        revenue_est=price * random.randint(10, 500), # Simple calc
-        ads_count=ads,
-        traffic_growth=round(random.uniform(-10, 150), 2),
-        is_winner=ads > 100 and random.random() > 0.7,
-        is_new=store.id > 40
-    )
-    db.add(prod)
+    ads = random.randint(0, store["active_ads"])
+
+    products.append({
+        "store_url": store["url"],
+        "title": f"Viral {store['niche']} Product {i}",
+        "handle": f"viral-{store['niche'].lower()}-{i}",
+        "image_url": random.choice(IMAGES),
+        "price": price,
+        "revenue_est": price * random.randint(10, 500), # Simple calc
+        "ads_count": ads,
+        "traffic_growth": round(random.uniform(-10, 150), 2),
+        "is_winner": ads > 100 and random.random() > 0.7,
+        "is_new": index >= 40 # the last 10 stores are the "new" ones
+    })
 
-db.commit()
-db.close()
+ingestor.ingest_products(products)
+ingestor.finish()
 print("✅ Seeding Successful!")